@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from Backend.services.model_service import ModelService
+from Backend.routes.predict import model_registry
+from Backend.services.execution_service import worker_services
 from Backend.services.Feature_service import build_features
 from Backend.schemas.patient import PatientData
 
@@ -7,17 +8,22 @@ from Backend.schemas.patient import PatientData
 # Create a router
 router = APIRouter()
 
-# Instantiate your model service (load model once)
-model_service = ModelService(run_id="03949aaab6124cb0800599c1209e45c8")
+# Served by the same registry as Backend/routes/predict.py: the active run,
+# loaded on first use and swapped by /models/reload
 
 @router.post('/predict')
 def predict(patient: PatientData):
+    run = model_registry.active
+    if run is None:
+        raise HTTPException(status_code=503, detail="No model run is active")
     try:
+        hcc_service, _ = worker_services(run)
+
         # Build the full feature vector from the patient object
-        X = build_features(patient)  # pass the whole PatientData object
+        X = build_features(patient).reshape(1, -1)  # pass the whole PatientData object
 
         # Run model inference
-        pred_proba = model_service.predict(X)
+        pred_proba = hcc_service.hcc_predict(X)
 
         # Return probability and binary prediction
         return {
@@ -26,4 +32,4 @@ def predict(patient: PatientData):
         }
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,72 @@
+"""
+Offline cohort scoring, outside the HTTP API.
+
+    python -m Backend.cli score INPUT --out DIR [--chunk-rows N] [--workers N] [--explain] [--run-id ID]
+
+INPUT is a CSV or Parquet file with the PatientData columns (clinical_notes
+optional). DIR receives one part-NNNNN.parquet per chunk with the row
+number, the id column when present, the probability, prediction, toxicity
+per organ system, SHAP values with --explain, and the validation error of
+rows that could not be scored. Running the same command again after an
+interruption continues from the chunks already written.
+"""
+import argparse
+import sys
+
+from Backend import config
+from Backend.services.registry_service import ModelRegistry
+from Backend.services.scoring_service import ScoringJob
+
+
+def score(args) -> int:
+    registry = ModelRegistry(config.MODEL_DIR, pinned_run_id=args.run_id or config.MODEL_RUN_ID)
+    registry.discover()
+    try:
+        run = registry.select()
+    except (FileNotFoundError, KeyError) as e:
+        print(f"No model run to score with: {e}", file=sys.stderr)
+        return 2
+
+    job = ScoringJob(
+        args.input, args.out, run,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        explain=args.explain,
+        id_column=args.id_column,
+        start_method=config.INFERENCE_START_METHOD,
+    )
+    try:
+        result = job.execute(progress=None if args.quiet else sys.stderr)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(
+        f"Scored {result['rows']} rows into {args.out} ({result['chunks']} parts, "
+        f"{result['skipped']} resumed, {result['errors']} invalid rows) with model {run.key}"
+    )
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m Backend.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = commands.add_parser("score", help="score a cohort file into Parquet parts")
+    score_parser.add_argument("input", help="CSV or Parquet file of PatientData columns")
+    score_parser.add_argument("--out", required=True, help="output directory (parts and manifest.json)")
+    score_parser.add_argument("--chunk-rows", type=int, default=10000, help="rows per chunk / output part")
+    score_parser.add_argument("--workers", type=int, default=config.INFERENCE_WORKERS,
+                              help="scoring processes, 0 to score in this process")
+    score_parser.add_argument("--explain", action="store_true", help="add SHAP values (slower)")
+    score_parser.add_argument("--id-column", default="patient_id", help="input column copied to the output")
+    score_parser.add_argument("--run-id", help="model run to use (default: HCC_MODEL_RUN_ID or the latest)")
+    score_parser.add_argument("--quiet", action="store_true", help="no per-chunk progress")
+    score_parser.set_defaults(handler=score)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import os
+import pathlib
+
+# -----------------------------
+# Model artifacts
+# -----------------------------
+# One sub-directory per run_id (or the artifacts directly in MODEL_DIR)
+MODEL_DIR = os.getenv("HCC_MODEL_DIR", str(pathlib.Path(__file__).resolve().parent.parent / "models"))
+
+# Serve this run instead of the most recent one
+MODEL_RUN_ID = os.getenv("HCC_MODEL_RUN_ID") or None
+
+# "eager": load models when workers start and warm new runs before switching
+# "lazy":  load models on the first request that needs them
+MODEL_LOAD = os.getenv("HCC_MODEL_LOAD", "eager")
+
+# "compiled":   flat-array forest walk, bit-identical to sklearn's predict_proba
+# "compiled32": same with float32 thresholds/leaf values (half the memory)
+# "sklearn":    model.predict_proba on a DataFrame
+PREDICT_ENGINE = os.getenv("HCC_PREDICT_ENGINE", "compiled")
+
+# "native": in-project TreeSHAP over a compiled forest (tree ensembles only)
+# "shap":   shap.TreeExplainer for every call
+SHAP_ENGINE = os.getenv("HCC_SHAP_ENGINE", "native")
+
+# -----------------------------
+# NER flags from clinical notes
+# -----------------------------
+# "keyword":     keyword automaton with negation handling (default)
+# "transformer": transformer token classification (needs the transformers package)
+# "prefilter":   transformer, only for notes where the keyword scan finds a mention
+# "remote":      remote NER service (NER_REMOTE_URL), with a local fallback
+# "random":      random flags (demo placeholder)
+NER_ENGINE = os.getenv("HCC_NER_ENGINE", "keyword")
+NER_MODEL_NAME = os.getenv("HCC_NER_MODEL", "OpenMed/OpenMed-NER-PathologyDetect-PubMed-109M")
+
+# Model behind the transformer engines:
+# "hf":     Hugging Face pipeline (needs transformers and torch)
+# "onnx":   ONNX Runtime on CPU, from NER_ONNX_PATH (python -m Backend.services.ner_export)
+# "random": random mentions of the keywords, no model (load tests)
+NER_BACKEND = os.getenv("HCC_NER_BACKEND", "hf")
+NER_ONNX_PATH = os.getenv("HCC_NER_ONNX_PATH", os.path.join(MODEL_DIR, "ner_onnx", "model.int8.onnx"))
+
+# "remote" engine: POST {"notes": [...]} to NER_REMOTE_URL, answered by
+# {"flags": [[...], ...]}. Calls are bounded by NER_REMOTE_TIMEOUT_MS and
+# hedged (sent a second time) after NER_REMOTE_HEDGE_MS (0: never). After
+# NER_REMOTE_FAILURES consecutive failures the circuit breaker skips the
+# service for NER_REMOTE_RESET_S seconds. Meanwhile flags come from the
+# NER_REMOTE_FALLBACK engine and predictions are marked as degraded
+NER_REMOTE_URL = os.getenv("HCC_NER_REMOTE_URL") or None
+NER_REMOTE_TIMEOUT_MS = float(os.getenv("HCC_NER_REMOTE_TIMEOUT_MS", "500"))
+NER_REMOTE_HEDGE_MS = float(os.getenv("HCC_NER_REMOTE_HEDGE_MS", "150"))
+NER_REMOTE_POOL_SIZE = int(os.getenv("HCC_NER_REMOTE_POOL_SIZE", "10"))
+NER_REMOTE_FAILURES = int(os.getenv("HCC_NER_REMOTE_FAILURES", "5"))
+NER_REMOTE_RESET_S = float(os.getenv("HCC_NER_REMOTE_RESET_S", "30"))
+NER_REMOTE_FALLBACK = os.getenv("HCC_NER_REMOTE_FALLBACK", "keyword")
+
+# Transformer chunks (remote engine: notes) from concurrent requests are
+# run together: a batch starts when NER_BATCH_SIZE chunks wait or NER_BATCH_WAIT_MS after the
+# first one arrived (0 runs each request on its own)
+NER_BATCH_SIZE = int(os.getenv("HCC_NER_BATCH_SIZE", "32"))
+NER_BATCH_WAIT_MS = float(os.getenv("HCC_NER_BATCH_WAIT_MS", "10"))
+
+# Transformer results are cached per sentence under a hash of its text, so
+# follow-up notes only send new sentences to the model. NER_CACHE_SIZE
+# entries are kept in memory (0 disables); NER_CACHE_PATH adds a SQLite
+# store that survives restarts
+NER_CACHE_SIZE = int(os.getenv("HCC_NER_CACHE_SIZE", "50000"))
+NER_CACHE_PATH = os.getenv("HCC_NER_CACHE_PATH") or None
+
+# Upper bounds on transformer NER per note: model tokens sent to the model and
+# milliseconds spent. NER stops early, reporting a truncated result, when
+# either runs out (0 means no limit). It always stops once every flag is set
+NER_TOKEN_BUDGET = int(os.getenv("HCC_NER_TOKEN_BUDGET", "0"))
+NER_TIME_BUDGET_MS = float(os.getenv("HCC_NER_TIME_BUDGET_MS", "0"))
+
+# -----------------------------
+# Inference execution
+# -----------------------------
+# "process": bounded process pool, models loaded once per worker process
+# "thread":  bounded thread pool sharing one copy of the models
+# "inline":  run in the request's thread (debugging / single-user demo)
+INFERENCE_EXECUTOR = os.getenv("HCC_INFERENCE_EXECUTOR", "process")
+INFERENCE_WORKERS = int(os.getenv("HCC_INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Requests allowed to wait for a worker before new ones are rejected with 503
+INFERENCE_QUEUE_SIZE = int(os.getenv("HCC_INFERENCE_QUEUE_SIZE", "32"))
+
+# Seconds suggested to clients in the Retry-After header when the queue is full
+INFERENCE_RETRY_AFTER = int(os.getenv("HCC_INFERENCE_RETRY_AFTER", "2"))
+
+# "spawn" avoids forking a process that already runs server threads
+INFERENCE_START_METHOD = os.getenv("HCC_INFERENCE_START_METHOD", "spawn")
+
+# -----------------------------
+# Deferred SHAP explanations
+# -----------------------------
+DEFERRED_EXPLANATION_MAX = int(os.getenv("HCC_DEFERRED_EXPLANATION_MAX", "1024"))
+DEFERRED_EXPLANATION_TTL = float(os.getenv("HCC_DEFERRED_EXPLANATION_TTL", "600"))
+
+# -----------------------------
+# Result cache (per feature vector + model version)
+# -----------------------------
+RESULT_CACHE_SIZE = int(os.getenv("HCC_RESULT_CACHE_SIZE", "10000"))  # 0 disables caching
+RESULT_CACHE_TTL = float(os.getenv("HCC_RESULT_CACHE_TTL", "3600"))
+
+# -----------------------------
+# Storage (saved predictions and outcomes)
+# -----------------------------
+# SQLite file (":memory:" for a throwaway database shared by the pool)
+DB_PATH = os.getenv("HCC_DB_PATH", str(pathlib.Path(__file__).resolve().parent.parent / "data" / "hcc.sqlite"))
+DB_POOL_SIZE = int(os.getenv("HCC_DB_POOL_SIZE", "4"))
+
+# Saves are committed in the background: up to DB_WRITE_BATCH rows, or the
+# rows queued within DB_WRITE_DELAY_MS of the first, per transaction
+DB_WRITE_BATCH = int(os.getenv("HCC_DB_WRITE_BATCH", "500"))
+DB_WRITE_DELAY_MS = float(os.getenv("HCC_DB_WRITE_DELAY_MS", "50"))
+# Saves waiting for a commit; a save waits up to DB_WRITE_QUEUE_TIMEOUT_S
+# for room in the queue, then gets a 503
+DB_WRITE_QUEUE = int(os.getenv("HCC_DB_WRITE_QUEUE", "10000"))
+DB_WRITE_QUEUE_TIMEOUT_S = float(os.getenv("HCC_DB_WRITE_QUEUE_TIMEOUT_S", "5"))
+# Rows that cannot be saved (JSON lines); only logged when empty
+DB_DEAD_LETTER_PATH = os.getenv(
+    "HCC_DB_DEAD_LETTER_PATH",
+    "" if DB_PATH == ":memory:" else str(pathlib.Path(DB_PATH).with_suffix(".dead_letter.jsonl")),
+)
+# Seconds shutdown (and bulk uploads) wait for the queued saves
+DB_FLUSH_TIMEOUT_S = float(os.getenv("HCC_DB_FLUSH_TIMEOUT_S", "30"))
+
+# Bulk uploads (/upload/{table}): rows validated and committed per chunk,
+# and rejected rows listed in the report (the count covers all of them)
+UPLOAD_CHUNK_ROWS = int(os.getenv("HCC_UPLOAD_CHUNK_ROWS", "5000"))
+UPLOAD_MAX_REJECTIONS = int(os.getenv("HCC_UPLOAD_MAX_REJECTIONS", "1000"))
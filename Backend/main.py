@@ -1,10 +1,38 @@
+import sqlite3
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from Backend.routes.predict import router as predict_router
+from fastapi.concurrency import run_in_threadpool
+from Backend import config
+from Backend.routes.predict import (
+    router as predict_router, db_writer, inference_executor, patient_index,
+    performance_monitor, prediction_store
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the inference workers and load their models before serving
+    await run_in_threadpool(inference_executor.warm_up)
+    try:
+        await run_in_threadpool(patient_index.load)
+        await run_in_threadpool(performance_monitor.load)
+    except sqlite3.Error as e:
+        # Loaded on first use instead; /health reports the database error
+        print(f"Warning: patient index / performance monitor not loaded: {e}")
+    yield
+    # Commit the saves still queued before exiting, for a bounded time
+    if not await run_in_threadpool(db_writer.close, config.DB_FLUSH_TIMEOUT_S):
+        print(f"Warning: saves still queued at shutdown were not committed: {db_writer.stats()['queued']}")
+    prediction_store.close()
+    inference_executor.shutdown()
+
 
 app = FastAPI(
     title='HCC Prediction API',
     description='API for predicting HCC outcomes',
-    version='1.0.0'
+    version='1.0.0',
+    lifespan=lifespan
 )
 
 app.include_router(predict_router, prefix='/api/v1', tags=['prediction'])
@@ -12,4 +40,3 @@ app.include_router(predict_router, prefix='/api/v1', tags=['prediction'])
 @app.get('/')
 def health_check():
     return {"status": "ok"}
-
@@ -1,20 +1,43 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 import numpy as np
-import pathlib
-import os
+from typing import Optional
 
 
 from Backend.schemas.patient import PatientData
 from Backend.schemas.Results import ResultsData
 from Backend.schemas.db import DB_Data
-from Backend.schemas.Patientcheck import Patient_check
+from Backend.schemas.Patientcheck import Patient_check, Patient_check_bulk
 from Backend.schemas.Outcome import OutcomeCreate
+from Backend.schemas.batch import BatchPatientData
+from Backend.schemas.explain import ExplainMode
 
-from Backend.services.model_service import HCCModelService, ToxicityModelService
-from Backend.services.Feature_service import build_features
+from Backend.services.Feature_service import build_features, build_features_with_ner
 from Backend.services.explanation_service import ExplanationService
+from Backend.services.batch_service import build_batch_matrix, build_column_matrix
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.model_service import ORGAN_SYSTEMS
+from Backend.services.NLP_service import ner_stats
+from Backend.services.sweep_service import REGIMENS, build_sweep_matrix, rank_sweep, sweep_order
+from Backend.services.importance_service import ShapAggregator
+from Backend.services.storage_service import PredictionStore, WriteBehindWriter, WriteQueueFull
+from Backend.services.patient_index import PatientIdIndex
+from Backend.services.monitoring_service import PerformanceMonitor
+from Backend.services.upload_service import UPLOAD_SCHEMAS, load_file
+from Backend.services.response_service import negotiate, render
+from Backend.services.deferred_service import DeferredExplanationStore
+from Backend.services.cache_service import ResultCache, make_entries
+from Backend.services.execution_service import (
+    ExecutorSaturated, InferenceExecutor, NoActiveModel, explain_task, score_task
+)
+from Backend.services.registry_service import ModelRegistry
+from Backend import config
 
+import os
+import sqlite3
+import tempfile
 import traceback
+from concurrent.futures import Future
 
 
 # -----------------------------
@@ -23,52 +46,336 @@ import traceback
 router = APIRouter()
 
 # -----------------------------
-# Paths to models
+# Model registry
 # -----------------------------
-base_path = pathlib.Path("C:/Users/kilsi/OneDrive/Documents/Curenetics/HCC_APP_Demo/models")
-hcc_model_path = base_path / "random_forest_demo.pkl"
-toxicity_model_path = base_path / "logistic_toxicity_model.pkl"
-toxicity_scaler_path = base_path / "logistic_toxicity_scaler.pkl"
+model_registry = ModelRegistry(config.MODEL_DIR, pinned_run_id=config.MODEL_RUN_ID)
+model_registry.discover()
 
 # -----------------------------
 # Initialize services separately
 # -----------------------------
-hcc_service = HCCModelService(str(hcc_model_path))
-toxicity_service = ToxicityModelService(str(toxicity_model_path), str(toxicity_scaler_path))
+# Models are loaded by the inference executor: once per worker process in
+# "process" mode, or once in this process in "thread" / "inline" mode.
+inference_executor = InferenceExecutor(
+    mode=config.INFERENCE_EXECUTOR,
+    max_workers=config.INFERENCE_WORKERS,
+    max_queue=config.INFERENCE_QUEUE_SIZE,
+    retry_after=config.INFERENCE_RETRY_AFTER,
+    start_method=config.INFERENCE_START_METHOD,
+    eager=config.MODEL_LOAD == "eager",
+)
+try:
+    model_registry.set_active(model_registry.select())
+    inference_executor.activate(model_registry.active)
+except (FileNotFoundError, KeyError) as e:
+    # Serve anyway; /health reports the models as not loaded
+    print(f"Warning: no model run activated: {e}")
+
 explanation_service = ExplanationService()
+deferred_explanations = DeferredExplanationStore(
+    max_entries=config.DEFERRED_EXPLANATION_MAX,
+    ttl_seconds=config.DEFERRED_EXPLANATION_TTL,
+)
+result_cache = ResultCache(
+    max_entries=config.RESULT_CACHE_SIZE,
+    ttl_seconds=config.RESULT_CACHE_TTL,
+)
+# Keys already include the model version; clearing just frees the memory early
+inference_executor.on_reload(lambda model_version: result_cache.clear())
+
+# Cohort SHAP importance of explained /predict and /predict_batch rows, per regimen
+shap_aggregates = ShapAggregator(
+    FEATURE_SCHEMA.names,
+    {label: FEATURE_SCHEMA.index[column] for label, column in REGIMENS.items()},
+    model_version=inference_executor.model_version,
+)
+inference_executor.on_reload(shap_aggregates.reset)
+
+# Saved predictions and outcomes
+prediction_store = PredictionStore(config.DB_PATH, pool_size=config.DB_POOL_SIZE)
+# Known patient_ids: check_data answers without a database round trip
+patient_index = PatientIdIndex(prediction_store.patient_ids)
+# Saved predictions scored against their outcomes as they arrive, per regimen
+performance_monitor = PerformanceMonitor(
+    dict(REGIMENS),
+    loader=lambda: list(prediction_store.outcomes_with_predictions()),
+)
+
+
+def apply_commit(rows_by_table: dict, previous: dict):
+    """
+    Brings the patient index and the performance monitor in line with a
+    committed transaction; previous holds the (saved prediction, outcome)
+    pairs it replaced, read in that transaction.
+    """
+    current = dict(previous)
+    for row in rows_by_table.get("predictions", []):
+        current[row["patient_id"]] = (row, current[row["patient_id"]][1])
+    for row in rows_by_table.get("outcomes", []):
+        current[row["patient_id"]] = (current[row["patient_id"]][0], row["outcome"])
+
+    patient_index.add_many(row["patient_id"] for row in rows_by_table.get("predictions", []))
+    for patient_id, pair in current.items():
+        performance_monitor.replace(previous[patient_id], pair)
+
+
+# Saves are committed in the background, then applied to the index and the monitor; flushed on shutdown
+db_writer = WriteBehindWriter(
+    prediction_store,
+    max_batch=config.DB_WRITE_BATCH,
+    max_delay_ms=config.DB_WRITE_DELAY_MS,
+    max_queue=config.DB_WRITE_QUEUE,
+    put_timeout=config.DB_WRITE_QUEUE_TIMEOUT_S,
+    dead_letter_path=config.DB_DEAD_LETTER_PATH,
+    on_commit=apply_commit,
+)
+
+
+async def run_inference(fn, *args):
+    """
+    Runs a CPU-bound task on the inference executor, mapping a full queue to 503.
+    """
+    try:
+        return await inference_executor.run_task(fn, *args)
+    except ExecutorSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except NoActiveModel as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def score_rows(X: np.ndarray, explain: bool, aggregate: bool = False):
+    """
+    Scores every row of X through the result cache. Only rows that are not
+    cached (or cached without SHAP when explain is True) reach the executor,
+    once per distinct row. With aggregate, the SHAP values computed here are
+    added to the cohort importance, so a patient counts once however often
+    it is submitted.
+
+    Returns:
+        keys: cache key per row
+        entries: cache entry per row (probability, toxicity, SHAP, baseline)
+    """
+    version = inference_executor.model_version
+    if version is None:
+        raise HTTPException(status_code=503, detail="No model run is active")
+    keys = [result_cache.make_key(row, version) for row in X]
+    entries = [result_cache.get(key, need_shap=explain) for key in keys]
+
+    # First row of every distinct key not in the cache
+    miss = {}
+    for i, entry in enumerate(entries):
+        if entry is None:
+            miss.setdefault(keys[i], i)
+    if miss:
+        rows = list(miss.values())
+        scores = await run_inference(score_task, X[rows], explain)
+        scored = dict(zip(miss, make_entries(scores)))
+        for key, entry in scored.items():
+            result_cache.put(key, entry)
+        entries = [scored[key] if entry is None else entry for key, entry in zip(keys, entries)]
+        if explain and aggregate:
+            shap_aggregates.update(X[rows], scores["shap_values"])
+
+    return keys, entries
+
+
+def defer_explanation(X: np.ndarray, keys: list, entries: list, single_row: bool = False,
+                      aggregate: bool = False) -> str:
+    """
+    Starts SHAP for X in the background and returns a handle for /explanations/{id}.
+    Rows whose SHAP values are already cached are served without recomputation.
+    With aggregate, the SHAP values of distinct rows not explained before are
+    added to the cohort importance once ready.
+    """
+    if all(entry["shap_values"] is not None for entry in entries):
+        future = Future()
+        future.set_result((np.vstack([entry["shap_values"] for entry in entries]), entries[0]["baseline"]))
+        return deferred_explanations.add(future, single_row=single_row)
+
+    try:
+        future = inference_executor.submit(explain_task, X)
+    except (ExecutorSaturated, NoActiveModel) as e:
+        return deferred_explanations.add_failed(str(e))
 
+    def cache_shap(done):
+        if done.exception() is None:
+            shap_values, base_value = done.result()
+            for key, row in zip(keys, shap_values):
+                result_cache.add_shap(key, row, base_value)
+
+    # First row of every distinct key that had no SHAP values yet
+    fresh = {}
+    for i, (key, entry) in enumerate(zip(keys, entries)):
+        if entry["shap_values"] is None:
+            fresh.setdefault(key, i)
+    fresh = list(fresh.values())
+
+    def add_to_aggregates(done):
+        if done.exception() is None:
+            shap_aggregates.update(X[fresh], done.result()[0][fresh])
+
+    future.add_done_callback(cache_shap)
+    if aggregate:
+        future.add_done_callback(add_to_aggregates)
+    return deferred_explanations.add(future, single_row=single_row)
+
+
+# The predict routes answer in the format of the Accept header (JSON,
+# MessagePack or Arrow IPC, see response_service); float32=true sends floats
+# in single precision
 @router.post("/predict")
-def predict(patient: PatientData):
+async def predict(patient: PatientData, explain: ExplainMode = ExplainMode.inline, include_data: bool = True,
+                  float32: bool = False, accept: Optional[str] = Header(None)):
     try:
         # Build features
-        X = build_features(patient).reshape(1, -1)
-
-        # HCC prediction
-        proba = hcc_service.hcc_predict(X)
-        prediction = int(proba[0, 1] > 0.5)
-
-        # SHAP explanation
-        shap_values, base_value = hcc_service.explain_prediction(X)
-
-        # Toxicity prediction
-        toxicity_proba = toxicity_service.predict_toxicity(X)
-        toxicity_probs_flat = toxicity_proba[0].tolist()
-        print(toxicity_proba)
-
-        return {
-            "probability": float(proba[0, 1]),
-            "prediction": prediction,
-            "shap_values": shap_values.tolist(),
-            "baseline": base_value,
-            "toxicity_proba": toxicity_probs_flat,  # handles multi-class arrays
-            "data": X.tolist()
+        features, ner_result = await run_in_threadpool(build_features_with_ner, patient)
+        X = features.reshape(1, -1)
+
+        # HCC prediction, SHAP explanation and toxicity prediction
+        inline = explain == ExplainMode.inline
+        keys, entries = await score_rows(X, inline, aggregate=True)
+        entry = entries[0]
+
+        response = {
+            "probability": entry["probability"],
+            "prediction": int(entry["probability"] > 0.5),
+            "shap_values": entry["shap_values"].tolist() if inline else None,
+            "baseline": entry["baseline"] if inline else None,
+            "toxicity_proba": entry["toxicity_proba"].tolist(),  # one probability per organ system
+            "ner_flags": dict(zip(FEATURE_SCHEMA.ner_flags, (int(flag) for flag in ner_result.flags))),
+            "ner": ner_result.status(),
+        }
+        if include_data:
+            response["data"] = X.tolist()
+        if explain == ExplainMode.deferred:
+            response["explanation_id"] = defer_explanation(X, keys, entries, single_row=True, aggregate=True)
+        return render(response, negotiate(accept), float32)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict_batch")
+async def predict_batch(batch: BatchPatientData, explain: ExplainMode = ExplainMode.inline,
+                        float32: bool = False, accept: Optional[str] = Header(None)):
+    try:
+        n_rows = batch.n_rows()
+        if batch.columns is not None:
+            X, valid_idx, errors = await run_in_threadpool(build_column_matrix, batch.columns)
+        else:
+            X, valid_idx, errors = await run_in_threadpool(build_batch_matrix, batch.patients)
+
+        inline = explain == ExplainMode.inline
+        keys, entries = [], []
+        if valid_idx:
+            keys, entries = await score_rows(X, inline, aggregate=True)
+
+        results = [None] * n_rows
+        for i, message in errors.items():
+            results[i] = {"index": i, "error": message}
+
+        for i, entry in zip(valid_idx, entries):
+            results[i] = {
+                "index": i,
+                "probability": entry["probability"],
+                "prediction": int(entry["probability"] > 0.5),
+                "toxicity_proba": entry["toxicity_proba"].tolist(),
+            }
+            if inline:
+                results[i]["shap_values"] = entry["shap_values"].tolist()
+
+        response = {
+            "n_rows": n_rows,
+            "n_scored": len(valid_idx),
+            "n_unique": len(set(keys)),
+            "baseline": entries[0]["baseline"] if entries and inline else None,
+            "results": results
         }
+        if explain == ExplainMode.deferred and valid_idx:
+            # Deferred SHAP rows follow the order of the scored rows
+            response["explanation_id"] = defer_explanation(X, keys, entries, aggregate=True)
+            response["explanation_index"] = valid_idx
+        return render(response, negotiate(accept), float32)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/predict_sweep")
+async def predict_sweep(patient: PatientData, explain: ExplainMode = ExplainMode.none,
+                        float32: bool = False, accept: Optional[str] = Header(None)):
+    try:
+        # NER and feature building run once; only the treatment columns vary
+        X, combos = build_sweep_matrix(await run_in_threadpool(build_features, patient))
+        inline = explain == ExplainMode.inline
+        keys, entries = await score_rows(X, inline)
+
+        scores = {
+            "probability": np.array([entry["probability"] for entry in entries]),
+            "toxicity_proba": np.vstack([entry["toxicity_proba"] for entry in entries]),
+            "shap_values": np.vstack([entry["shap_values"] for entry in entries]) if inline else None,
+        }
+        response = {"results": rank_sweep(combos, scores)}
+        if explain == ExplainMode.deferred:
+            # Deferred SHAP rows follow the ranked order of the results
+            order = sweep_order(scores)
+            response["explanation_id"] = defer_explanation(
+                X[order], [keys[i] for i in order], [entries[i] for i in order]
+            )
+        return render(response, negotiate(accept), float32)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Declared before /explanations/{explanation_id} so "global" is not taken for an id
+@router.get("/explanations/global")
+async def global_explanations(regimen: Optional[str] = None):
+    """
+    Cohort SHAP importance of every explained prediction of the active model,
+    overall ("all") and per regimen. regimen restricts the answer to one group.
+    """
+    try:
+        return shap_aggregates.summary(regimen)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/monitor/performance")
+def model_performance(regimen: Optional[str] = None):
+    """
+    AUC, Brier score, calibration and confusion counts of the saved
+    predictions that have an outcome, overall ("all") and per regimen.
+    """
+    try:
+        return performance_monitor.summary(regimen)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+
+
+@router.get("/explanations/{explanation_id}")
+async def get_deferred_explanation(explanation_id: str):
+    result = deferred_explanations.get(explanation_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired explanation id")
+    return {"explanation_id": explanation_id, **result}
+
+
 @router.post('/explanation')
 def explain(results: ResultsData):
     shap_values_list = results.shap_values
@@ -78,40 +385,165 @@ def explain(results: ResultsData):
     return {'explanation': explanation}
 
 
+@router.get("/schema")
+async def feature_schema():
+    # Feature order of the model inputs, SHAP values and "data" in predictions
+    return {**FEATURE_SCHEMA.to_dict(), "organ_systems": ORGAN_SYSTEMS}
+
+
 @router.get("/health")
-def health_check():
+async def health_check():
+    # async so it is served on the event loop even when the threadpool is busy
+    active = model_registry.active
+    database_connected, db_error = await run_in_threadpool(prediction_store.ping)
     return {
-        "status": "ok",
-        "hcc_model_loaded": True,
-        "toxicity_model_loaded": True,
-        "database_connected": True,
-        "db_error": None
+        "status": "ok" if active is not None else "degraded",
+        "hcc_model_loaded": active is not None,
+        "toxicity_model_loaded": active is not None,
+        "model_run_id": active.run_id if active is not None else None,
+        "database_connected": database_connected,
+        "db_error": db_error,
+        "db_writer": db_writer.stats(),
+        "patient_index": patient_index.stats(),
+        "inference": inference_executor.stats(),
+        "result_cache": result_cache.stats(),
+        "ner": ner_stats()
     }
 
 
+@router.get("/models")
+def list_models():
+    active = model_registry.active
+    return {
+        "model_dir": str(model_registry.model_dir),
+        "active_run_id": active.run_id if active is not None else None,
+        "runs": [run.to_dict() for run in model_registry.runs()]
+    }
+
+
+@router.post("/models/reload")
+def reload_models(run_id: Optional[str] = None):
+    """
+    Rescans the model directory and switches to run_id (default: pinned or
+    latest run) without restarting the server. In-flight requests finish on
+    the previous model.
+    """
+    model_registry.discover()
+    try:
+        run = model_registry.select(run_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    inference_executor.activate(run, warm=True)
+    model_registry.set_active(run)
+    return {"active_run_id": run.run_id, "model_version": inference_executor.model_version}
+
+
+def _queue_save(table: str, row: dict):
+    try:
+        # Loaded before the row is queued, so its commit is not counted twice
+        performance_monitor.load()
+        db_writer.put(table, row)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    except WriteQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Database busy: {e}", headers={"Retry-After": "1"})
+
+
 @router.post("/insert_data")
 def insert_data(db_info: DB_Data):
+    # Queued for the background writer; readable right away through check_data
+    _queue_save("predictions", db_info.model_dump())
     return {
         "success": True,
-        "data": db_info.dict(),  # just echo back what was sent
-        "message": "Dummy save successful"
+        "patient_id": db_info.patient_id,
+        "message": "Prediction saved"
     }
 
 
 @router.post("/check_data")
 def check_data(data: Patient_check):
+    try:
+        # Committed, or still queued for the writer
+        exists = data.patient_id in patient_index or db_writer.is_queued("predictions", data.patient_id)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
     return {
-        "exists": True,
+        "exists": exists,
         "patient_id": data.patient_id
     }
 
 
+@router.post("/check_data_bulk")
+def check_data_bulk(data: Patient_check_bulk):
+    try:
+        found = patient_index.contains_many(data.patient_ids)
+        for i in np.flatnonzero(~found):
+            found[i] = db_writer.is_queued("predictions", data.patient_ids[i])
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    return {
+        "exists": found.tolist(),  # aligned with patient_ids
+        "n_found": int(found.sum())
+    }
+
+
 @router.post("/insert_outcome")
 def insert_outcome(data: OutcomeCreate):
+    outcome = {"patient_id": data.patient_id, "outcome": 1 if data.outcome else 0}
+    _queue_save("outcomes", outcome)
     return {
         "status": "success",
-        "inserted": {
-            "patient_id": data.patient_id,
-            "outcome": 1 if data.outcome else 0
-        }
-    }
\ No newline at end of file
+        "inserted": outcome
+    }
+
+
+def _write_upload_chunk(table: str, rows: list):
+    # One transaction per chunk, then the in-memory views of the database
+    apply_commit({table: rows}, prediction_store.upsert({table: rows}, previous=True))
+
+
+def _load_upload(path: str, fmt: str, table: str) -> dict:
+    # Saves still queued are committed first, so they cannot overwrite uploaded rows later
+    if not db_writer.flush(timeout=config.DB_FLUSH_TIMEOUT_S):
+        raise sqlite3.OperationalError("queued saves were not committed in time")
+    # Loaded before the upload commits, so uploaded outcomes are not counted twice
+    performance_monitor.load()
+    return load_file(
+        path, fmt, table, _write_upload_chunk,
+        known_patients=patient_index.contains_many,
+        chunk_rows=config.UPLOAD_CHUNK_ROWS,
+        max_rejections=config.UPLOAD_MAX_REJECTIONS,
+    )
+
+
+@router.post("/upload/{table}")
+async def bulk_upload(table: str, request: Request, file_format: Optional[str] = Query(None, alias="format")):
+    """
+    Bulk upload of saved predictions (DB_Data columns) or outcomes
+    (OutcomeCreate columns): the request body is a CSV or Parquet file
+    (?format=, else taken from the Content-Type). The body is spooled to a
+    temporary file and loaded in chunks, each validated column by column
+    and committed in one transaction. Invalid rows, and outcomes of
+    patients without a saved prediction, are listed in the report.
+    """
+    if table not in UPLOAD_SCHEMAS:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    fmt = file_format or ("parquet" if "parquet" in request.headers.get("content-type", "") else "csv")
+
+    spool = tempfile.NamedTemporaryFile(prefix="hcc-upload-", suffix=f".{fmt}", delete=False)
+    try:
+        # Removed below even if the client disconnects mid-upload
+        with spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+        return await run_in_threadpool(_load_upload, spool.name, fmt, table)
+    except ValueError as e:
+        # Unknown format, missing columns or a file that cannot be parsed
+        raise HTTPException(status_code=422, detail=str(e))
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    finally:
+        os.unlink(spool.name)
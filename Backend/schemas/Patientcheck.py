@@ -1,4 +1,8 @@
 from pydantic import BaseModel
+from typing import List
 
 class Patient_check(BaseModel):
-    patient_id: int
\ No newline at end of file
+    patient_id: int
+
+class Patient_check_bulk(BaseModel):
+    patient_ids: List[int]
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, model_validator
+from typing import Any, Dict, List, Optional
+
+# =====================================================
+# Batch scoring request
+# =====================================================
+class BatchPatientData(BaseModel):
+    """
+    A cohort to score in one call, either row-oriented or column-oriented.
+
+    Rows are kept as plain dicts so that a single malformed patient is
+    reported back for that row instead of rejecting the whole batch.
+    """
+    # Row-oriented: [{"ast": 35.0, "alt": 40.0, ...}, ...]
+    patients: Optional[List[Dict[str, Any]]] = None
+
+    # Column-oriented: {"ast": [35.0, 41.0, ...], "alt": [40.0, 22.0, ...], ...}
+    columns: Optional[Dict[str, List[Any]]] = None
+
+    @model_validator(mode="after")
+    def check_layout(self):
+        if (self.patients is None) == (self.columns is None):
+            raise ValueError("Provide exactly one of 'patients' or 'columns'")
+
+        if self.columns is not None:
+            lengths = {len(values) for values in self.columns.values()}
+            if len(lengths) > 1:
+                raise ValueError("All columns must have the same length")
+
+        return self
+
+    def n_rows(self) -> int:
+        if self.patients is not None:
+            return len(self.patients)
+        return len(next(iter(self.columns.values()), []))
+
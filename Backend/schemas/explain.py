@@ -0,0 +1,9 @@
+from enum import Enum
+
+# =====================================================
+# SHAP explanation mode (query parameter on predict routes)
+# =====================================================
+class ExplainMode(str, Enum):
+    none = "none"          # no SHAP values
+    inline = "inline"      # SHAP values in the response
+    deferred = "deferred"  # handle now, SHAP values from /explanations/{id} later
@@ -1,7 +1,7 @@
 from Backend.schemas.patient import PatientData 
-from Backend.services.NLP_service import generate_ner_flags
+from Backend.services.NLP_service import generate_ner_flag_result, generate_ner_flags, generate_ner_flags_batch
+from Backend.services.feature_schema import FEATURE_SCHEMA
 import numpy as np 
-import pandas as pd 
 
 
 def build_features(patient: PatientData) -> np.ndarray:
@@ -9,69 +9,32 @@ def build_features(patient: PatientData) -> np.ndarray:
     Build feature array for HCC model in the exact training order.
     Assumes all fields except clinical_notes are already numeric / encoded.
     """
-
-    # --------------------------
-    # NER flags
-    # --------------------------
     ner_flags = generate_ner_flags(patient.clinical_notes or "")
-    liver_tumor_flag = ner_flags[0]
-    liver_disease_flag = ner_flags[1]
-    portal_hypertension_flag = ner_flags[2]
-    biliary_flag = ner_flags[3]
-    symptoms_flag = ner_flags[4]
-
-    # --------------------------
-    # Feature array in training order
-    # --------------------------
-    feature_array = np.array([
-        # Labs
-        patient.ast,
-        patient.alt,
-        patient.alp,
-        patient.albumin,
-        patient.total_bilirubin,
-        patient.afp,
-
-        # Tumor / disease burden
-        patient.stage_at_diagnosis,
-        patient.t_stage_at_diagnosis,
-
-        # Demographics
-        patient.age,
-        patient.gender,
-
-        # Comorbidities / history
-        patient.pmh_cirrhosis,
-        patient.pmh_fatty_liver,
-        patient.comorbid_diabetes,
-        patient.comorbid_htn,
-        patient.comorbid_cad,
-
-        # NER flags
-        liver_tumor_flag,
-        liver_disease_flag,        
-        portal_hypertension_flag,
-        biliary_flag,
-        symptoms_flag,
+    return FEATURE_SCHEMA.build(patient, ner_flags)
 
-        # Systemic therapy regimens (already 0/1)
-        patient.regimen_atezo_bev,
-        patient.regimen_durva_treme,
-        patient.regimen_nivo_ipi,
-        patient.regimen_pembro_ipi,
 
-        # Local liver treatments (already 0/1)
-        patient.local_treatment_given_TACE,
-        patient.local_treatment_given_Y90,
-        patient.local_treatment_given_RFA,
-        patient.local_treatment_given_None,
-
-        # Other treatments (already 0/1)
-        patient.neoadjuvant_therapy,
-        patient.adjuvant_treatment_given
-    ], dtype=float)
+def build_features_with_ner(patient: PatientData):
+    """
+    build_features, also returning the NERFlagResult (whether NER covered
+    the whole notes or stopped on a budget).
+    """
+    ner_result = generate_ner_flag_result(patient.clinical_notes or "")
+    return FEATURE_SCHEMA.build(patient, ner_result.flags), ner_result
 
-    return feature_array
 
+def build_features_batch(patients: list = None, columns: dict = None, out: np.ndarray = None) -> np.ndarray:
+    """
+    Build the (n_patients, n_features) matrix for many patients at once,
+    from a list of PatientData or from columns ({field: [values, ...]})
+    accepted by FEATURE_SCHEMA.check_columns.
 
+    NER runs for all notes together; everything else is copied straight into the
+    (optionally preallocated) output matrix.
+    """
+    if columns is not None:
+        n_rows = len(columns[FEATURE_SCHEMA.patient_fields[0]])
+        notes = columns.get("clinical_notes") or [None] * n_rows
+        return FEATURE_SCHEMA.build_columns(columns, generate_ner_flags_batch(notes), out=out)
 
+    ner_flags = generate_ner_flags_batch([patient.clinical_notes for patient in patients])
+    return FEATURE_SCHEMA.build_batch(patients, ner_flags, out=out)
@@ -1,6 +1,19 @@
-'''
-from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline, AutoModel
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from Backend import config
+from Backend.services.keyword_matcher import KeywordMatcher
+from Backend.services.ner_backends import create_backend
+from Backend.services.ner_batcher import NERMicroBatcher
+from Backend.services.ner_cache import NERCache
+from Backend.services.remote_ner import CircuitBreaker, RemoteNERClient, RemoteNERError
 
+# 1️⃣ Liver disease
 liver_disease_flag = [
     "Liver Cirrhosis",
     "Cirrhotic",
@@ -49,38 +62,162 @@ symptoms_flag = [
     "Fatigue"
 ]
 
+# Keyword lists in flag order: [liver_tumor, liver_disease, portal_hypertension, biliary, symptoms]
+FLAG_KEYWORDS = {
+    "liver_tumor_flag": liver_tumor_flag,
+    "liver_disease_flag": liver_disease_flag,
+    "portal_hypertension_flag": portal_hypertension_flag,
+    "biliary_flag": biliary_flag,
+    "symptoms_flag": symptoms_flag,
+}
 
-model_name = "OpenMed/OpenMed-NER-PathologyDetect-PubMed-109M"
+# Compiled once: a single-pass scan per note, with negation handling
+keyword_matcher = KeywordMatcher(FLAG_KEYWORDS)
 
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-ner = pipeline("token-classification", model=model_name, tokenizer=tokenizer)
 
-def split_chunks(clinical_notes: str, chunk_size=512, overlap=50):
-    tokens = tokenizer.encode(clinical_notes, add_special_tokens=False)
+# -----------------------------
+# Transformer NER backend (loaded on first use)
+# -----------------------------
+_transformer = None
+_transformer_lock = threading.Lock()
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def _load_transformer():
+    """
+    Loads the configured NER backend (config.NER_BACKEND) once per process.
+    Returns its tokenizer and the backend, called with a list of texts.
+    """
+    global _transformer
+    with _transformer_lock:
+        if _transformer is None:
+            backend = create_backend(
+                config.NER_BACKEND,
+                model_name=config.NER_MODEL_NAME,
+                onnx_path=config.NER_ONNX_PATH,
+                keywords=FLAG_KEYWORDS,
+            )
+            _transformer = (backend.tokenizer, backend)
+    return _transformer
+
+
+def _get_batcher() -> NERMicroBatcher:
+    """
+    Shared micro-batcher: chunks from concurrent requests go through the
+    pipeline in one forward pass.
+    """
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _, ner = _load_transformer()
+            _batcher = NERMicroBatcher(
+                ner,
+                max_batch_size=config.NER_BATCH_SIZE,
+                max_wait_ms=config.NER_BATCH_WAIT_MS,
+            )
+    return _batcher
+
+
+# -----------------------------
+# Remote NER service (created on first use)
+# -----------------------------
+_remote_client = None
+_remote_lock = threading.Lock()
+
+
+def _get_remote_client() -> RemoteNERClient:
+    global _remote_client
+    with _remote_lock:
+        if _remote_client is None:
+            if not config.NER_REMOTE_URL:
+                raise ValueError("The remote NER engine needs HCC_NER_REMOTE_URL")
+            _remote_client = RemoteNERClient(
+                config.NER_REMOTE_URL,
+                timeout_ms=config.NER_REMOTE_TIMEOUT_MS,
+                hedge_ms=config.NER_REMOTE_HEDGE_MS,
+                max_batch_size=config.NER_BATCH_SIZE,
+                max_wait_ms=config.NER_BATCH_WAIT_MS,
+                pool_size=config.NER_REMOTE_POOL_SIZE,
+                breaker=CircuitBreaker(config.NER_REMOTE_FAILURES, config.NER_REMOTE_RESET_S),
+            )
+    return _remote_client
+
+
+def iter_chunk_spans(text: str, chunk_size=512, overlap=50):
+    """
+    Yields (start, end) character spans of overlapping windows of chunk_size
+    tokens, read from the tokenizer's offset mapping. The text is tokenized
+    once and the windows are produced on demand.
+    """
+    tokenizer, _ = _load_transformer()
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
 
-    chunks = []
     start = 0
-    while start < len(tokens):
-        end = start + chunk_size
-        chunk = tokens[start:end]
-        chunks.append(chunk)
+    while start < len(offsets):
+        end = min(start + chunk_size, len(offsets))
+        yield offsets[start][0], offsets[end - 1][1]
+        if end == len(offsets):
+            break
         start += (chunk_size - overlap)
 
-    return [tokenizer.decode(chunk) for chunk in chunks]
 
+def count_tokens(text: str) -> int:
+    """
+    Model tokens (subwords, no special tokens) the backend's tokenizer makes of text.
+    """
+    tokenizer, _ = _load_transformer()
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def split_chunks(clinical_notes: str, chunk_size=512, overlap=50):
+    """
+    Yields the overlapping windows as slices of the original text, so the
+    pipeline tokenizes each chunk once and no decode round-trip alters it.
+    """
+    tokenizer, _ = _load_transformer()
+    if getattr(tokenizer, "is_fast", False):
+        for start, end in iter_chunk_spans(clinical_notes, chunk_size, overlap):
+            yield clinical_notes[start:end]
+        return
+
+    # Slow tokenizers have no offset mapping: decode the token windows
+    tokens = tokenizer.encode(clinical_notes, add_special_tokens=False)
+    for start in range(0, len(tokens), chunk_size - overlap):
+        yield tokenizer.decode(tokens[start:start + chunk_size])
+        if start + chunk_size >= len(tokens):
+            break
 
-def extract_symptoms_from_clinical_notes(clinical_notes: str):
 
-    chunks = split_chunks(clinical_notes)
+# Sentence boundaries: end punctuation followed by whitespace, or line breaks
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
 
-    all_results = []
-    batch_size = 8
+# Longer sentences are split into token windows (well under 512 tokens)
+MAX_UNIT_CHARS = 1500
 
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        results = ner(batch)
-        all_results.extend(results)
+# Per-sentence NER results, shared by all requests of this process. Keys
+# include the backend, so int8 ONNX results never answer for the HF model
+_NER_MODEL_ID = config.NER_BACKEND + ":" + (config.NER_ONNX_PATH if config.NER_BACKEND == "onnx" else config.NER_MODEL_NAME)
+ner_cache = NERCache(_NER_MODEL_ID, max_entries=config.NER_CACHE_SIZE, path=config.NER_CACHE_PATH)
 
+
+def split_units(clinical_notes: str):
+    """
+    Yields the sentences of the notes, the unit NER results are cached by.
+    Unlike fixed token windows, a sentence keeps its boundaries when text
+    is added before it, so repeated text in a follow-up note hashes the same.
+    """
+    for sentence in _SENTENCE_RE.split(clinical_notes or ""):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) > MAX_UNIT_CHARS:
+            yield from split_chunks(sentence)
+        else:
+            yield sentence
+
+
+def _symptoms_from_results(all_results) -> list:
     extracted_symptoms = set()
     for chunk_result in all_results:
         for ent in chunk_result:
@@ -91,49 +228,299 @@ def extract_symptoms_from_clinical_notes(clinical_notes: str):
     return list(extracted_symptoms)
 
 
-def generate_ner_flags(clinical_notes: str) -> list:
+def _dispatch_size() -> int:
+    return config.NER_BATCH_SIZE if config.NER_BATCH_WAIT_MS > 0 else 8
+
+
+def _submit_ner(texts: list) -> Future:
+    """
+    Starts NER on the texts: queued on the micro-batcher when enabled,
+    otherwise run right away. The future resolves to one result per text.
+    """
+    if config.NER_BATCH_WAIT_MS > 0:
+        return _get_batcher().submit(texts)
+
+    _, ner = _load_transformer()
+    future = Future()
+    future.set_result(ner(texts))
+    return future
+
+
+def _store_results(batch: list, future: Future) -> dict:
+    """
+    Caches the disease mentions of a finished batch of (key, text) pairs.
     """
-    Takes clinical notes as input, runs NER to extract symptoms/disease mentions,
-    and generates a binary list of flags for liver disease, portal hypertension,
-    liver tumor, biliary issues, and general symptoms.
+    mentions = {
+        key: sorted(_symptoms_from_results([result])) for (key, _), result in zip(batch, future.result())
+    }
+    # One transaction per model batch
+    ner_cache.put_many(mentions.items())
+    return mentions
 
-    Returns:
-        ner_list (list): [liver_disease, portal_hypertension, liver_tumor, biliary, symptoms]
+
+def _iter_pending(notes: list, note_keys: list, mentions: dict):
+    """
+    Yields (key, text) for each sentence that is neither cached nor already
+    yielded, recording every note's sentence keys along the way.
     """
-    # 1️⃣ Extract entities from clinical notes
-    symptoms = extract_symptoms_from_clinical_notes(clinical_notes)
+    pending = set()
+    for note in notes:
+        keys = []
+        note_keys.append(keys)
+        for unit in split_units(note):
+            key = ner_cache.make_key(unit)
+            keys.append(key)
+            if key in mentions or key in pending:
+                continue
+            cached = ner_cache.get(key, n_bytes=len(unit.encode()))
+            if cached is None:
+                pending.add(key)
+                yield key, unit
+            else:
+                mentions[key] = cached
+
+
+def _extract_symptoms_many(notes: list) -> list:
+    """
+    Disease mentions of each note. Sentences already seen (in this call or
+    in the cache) are not run again; the rest are sent to the model batch
+    by batch while the notes are still being split.
+    """
+    note_keys = []
+    mentions = {}   # key -> disease mentions of the sentence
+    batch_size = _dispatch_size()
+
+    submitted = []
+    pending = _iter_pending(notes, note_keys, mentions)
+    while True:
+        batch = list(islice(pending, batch_size))
+        if not batch:
+            break
+        submitted.append((batch, _submit_ner([text for _, text in batch])))
+
+    for batch, future in submitted:
+        mentions.update(_store_results(batch, future))
+
+    return [list({word for key in keys for word in mentions[key]}) for keys in note_keys]
 
-    # 2️⃣ Define flags (keyword lists)
-    flags = [
-        liver_tumor_flag,
-        liver_disease_flag,
-        portal_hypertension_flag,
-        biliary_flag,
-        symptoms_flag
-    ]
 
-    # 3️⃣ Initialize NER binary list
-    ner_list = [0] * len(flags)
+def extract_symptoms_from_clinical_notes(clinical_notes: str):
+    return _extract_symptoms_many([clinical_notes])[0]
+
 
-    # 4️⃣ Check intersection between extracted symptoms and keyword lists
+def _flags_from_symptoms(symptoms: list) -> list:
+    # 1️⃣ Initialize NER binary list
+    ner_list = [0] * len(FLAG_KEYWORDS)
+
+    # 2️⃣ Check intersection between extracted symptoms and keyword lists
     symptoms_set = {s.lower().strip() for s in symptoms}  # normalize
 
-    for i, flag_keywords in enumerate(flags):
+    for i, flag_keywords in enumerate(FLAG_KEYWORDS.values()):
         flag_set = {f.lower().strip() for f in flag_keywords}
         if symptoms_set & flag_set:
             ner_list[i] = 1
 
     return ner_list
-    '''
 
-import random
 
-def generate_ner_flags(dummy_clinical_notes) -> list:
+class NERFlagResult(NamedTuple):
+    flags: list
+    complete: bool = True                   # False when a budget stopped NER before the end of the notes
+    truncated_reason: Optional[str] = None  # "token_budget" or "time_budget"
+    chunks_processed: int = 0               # sentences / chunks whose NER result was used
+    degraded: bool = False                  # the remote service failed; flags come from the fallback engine
+
+    def status(self) -> dict:
+        return {
+            "complete": self.complete,
+            "truncated_reason": self.truncated_reason,
+            "chunks_processed": self.chunks_processed,
+            "degraded": self.degraded,
+        }
+
+
+def stream_transformer_flags(clinical_notes: str, targets: list = None, token_budget: int = None,
+                             time_budget_ms: float = None) -> NERFlagResult:
+    """
+    Runs the transformer NER over the notes sentence by sentence and sets a
+    flag when an extracted disease mention is one of that flag's keywords.
+
+    Flags can only turn on, so NER stops as soon as every flag in targets
+    (default: all) is set. It also stops, with an incomplete result, before
+    sending more than token_budget model tokens (counted by the backend's
+    tokenizer) or once time_budget_ms has passed (defaults from config, 0
+    means no limit). Cached sentences count against neither budget.
+    """
+    targets = targets or [1] * len(FLAG_KEYWORDS)
+    token_budget = config.NER_TOKEN_BUDGET if token_budget is None else token_budget
+    time_budget_ms = config.NER_TIME_BUDGET_MS if time_budget_ms is None else time_budget_ms
+    deadline = time.monotonic() + time_budget_ms / 1000.0 if time_budget_ms > 0 else None
+
+    flags = [0] * len(FLAG_KEYWORDS)
+    processed = 0
+    tokens_used = 0
+    batch = []
+
+    def add(mentions):
+        nonlocal processed
+        processed += 1
+        for i, flag in enumerate(_flags_from_symptoms(mentions)):
+            flags[i] |= flag
+
+    def resolved():
+        return all(flag or not target for flag, target in zip(flags, targets))
+
+    def run_batch():
+        # Returns the reason NER has to stop, or None
+        future = _submit_ner([text for _, text in batch])
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            future.result(timeout=timeout)
+        except TimeoutError:
+            # Keep the results for later notes once the model is done
+            future.add_done_callback(lambda done, batch=list(batch): _store_results(batch, done))
+            return "time_budget"
+        for mentions in _store_results(batch, future).values():
+            add(mentions)
+        batch.clear()
+        return None
+
+    def result(reason=None):
+        return NERFlagResult(flags, reason is None, reason, processed)
+
+    for unit in split_units(clinical_notes):
+        if resolved():
+            return result()
+
+        key = ner_cache.make_key(unit)
+        cached = ner_cache.get(key, n_bytes=len(unit.encode()))
+        if cached is not None:
+            add(cached)
+            continue
+
+        n_tokens = count_tokens(unit) if token_budget else 0
+        if token_budget and tokens_used + n_tokens > token_budget:
+            reason = run_batch() if batch else None
+            return result(reason or ("token_budget" if not resolved() else None))
+        if deadline is not None and time.monotonic() >= deadline:
+            return result("time_budget" if not resolved() else None)
+
+        batch.append((key, unit))
+        tokens_used += n_tokens
+        if len(batch) >= _dispatch_size():
+            reason = run_batch()
+            if reason:
+                return result(reason)
+
+    if batch:
+        reason = run_batch()
+        if reason:
+            return result(reason)
+    return result()
+
+
+def random_ner_flags(dummy_clinical_notes) -> list:
     """
     Mimics the output of the NER pipeline by generating a random binary list of flags.
-    The order of flags is the same as the real NER function:
-    [liver_tumor, liver_disease, portal_hypertension, biliary, symptoms]
     """
-    
     # Generate 0 or 1 for each flag randomly
-    return [random.randint(0, 1) for _ in range(5)]
\ No newline at end of file
+    return [random.randint(0, 1) for _ in range(len(FLAG_KEYWORDS))]
+
+
+def remote_ner_flag_results(notes: list) -> list:
+    """
+    NERFlagResult per note from the remote service, or from the
+    config.NER_REMOTE_FALLBACK engine, marked degraded, when it fails.
+    """
+    try:
+        return [NERFlagResult(list(flags)) for flags in _get_remote_client().flags(notes)]
+    except RemoteNERError:
+        fallback = config.NER_REMOTE_FALLBACK
+        if fallback == "remote":
+            raise ValueError("HCC_NER_REMOTE_FALLBACK must be a local engine")
+        return [generate_ner_flag_result(note, fallback)._replace(degraded=True) for note in notes]
+
+
+def generate_ner_flag_result(clinical_notes: str, engine: str = None) -> NERFlagResult:
+    """
+    Binary flags for the clinical notes, in the order
+    [liver_tumor, liver_disease, portal_hypertension, biliary, symptoms],
+    with whether NER covered the whole notes.
+
+    engine (default config.NER_ENGINE):
+        "keyword":     keyword automaton with negation handling (fast, deterministic)
+        "transformer": transformer NER matched against the keyword lists
+        "prefilter":   transformer NER, skipped when no keyword occurs in the
+                       notes and limited to the flags whose keywords do
+        "remote":      remote NER service, falling back to a local engine
+        "random":      random flags (demo placeholder)
+    """
+    engine = engine or config.NER_ENGINE
+
+    if engine == "keyword":
+        return NERFlagResult(keyword_matcher.flags(clinical_notes))
+
+    if engine == "remote":
+        return remote_ner_flag_results([clinical_notes])[0]
+
+    if engine == "transformer":
+        return stream_transformer_flags(clinical_notes)
+
+    if engine == "prefilter":
+        candidates = keyword_matcher.candidates(clinical_notes)
+        if not any(candidates):
+            return NERFlagResult(candidates)
+        result = stream_transformer_flags(clinical_notes, targets=candidates)
+        return result._replace(flags=[flag & candidate for flag, candidate in zip(result.flags, candidates)])
+
+    if engine == "random":
+        return NERFlagResult(random_ner_flags(clinical_notes))
+
+    raise ValueError(f"Unknown NER engine: {engine}")
+
+
+def generate_ner_flags(clinical_notes: str, engine: str = None) -> list:
+    """
+    The flags of generate_ner_flag_result.
+    """
+    return generate_ner_flag_result(clinical_notes, engine).flags
+
+
+def generate_ner_flags_batch(notes: list, engine: str = None) -> list:
+    """
+    generate_ner_flags for many notes. With a transformer engine, the
+    uncached sentences of all notes go to the model at once instead of note
+    by note, so a cohort does not wait one batching window per patient.
+    """
+    engine = engine or config.NER_ENGINE
+    notes = [note or "" for note in notes]
+    if engine == "remote":
+        return [result.flags for result in remote_ner_flag_results(notes)]
+    if engine not in ("transformer", "prefilter"):
+        return [generate_ner_flags(note, engine) for note in notes]
+
+    if engine == "prefilter":
+        candidates = [keyword_matcher.candidates(note) for note in notes]
+    else:
+        candidates = [[1] * len(FLAG_KEYWORDS) for _ in notes]
+
+    selected = [i for i, candidate in enumerate(candidates) if any(candidate)]
+    symptoms = _extract_symptoms_many([notes[i] for i in selected])
+
+    flags = list(candidates)
+    for i, note_symptoms in zip(selected, symptoms):
+        note_flags = _flags_from_symptoms(note_symptoms)
+        flags[i] = [flag & allowed for flag, allowed in zip(note_flags, candidates[i])]
+    return flags
+
+
+def ner_stats() -> dict:
+    """
+    NER engine, cache and remote service counters for /health.
+    """
+    return {
+        "engine": config.NER_ENGINE,
+        "backend": config.NER_BACKEND,
+        "cache": ner_cache.stats(),
+        "remote": _remote_client.stats() if _remote_client is not None else None,
+    }
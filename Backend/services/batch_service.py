@@ -0,0 +1,99 @@
+import numpy as np
+from pydantic import ValidationError
+
+from Backend.schemas.patient import PatientData
+from Backend.services.Feature_service import build_features_batch
+from Backend.services.feature_schema import FEATURE_SCHEMA
+
+
+def _format_validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+    )
+
+
+def build_batch_matrix(rows: list):
+    """
+    Validates each row and builds the (n_valid, n_features) feature matrix.
+
+    Returns:
+        X: feature matrix for the rows that could be built
+        valid_idx: original row index of each matrix row
+        errors: {row index: error message} for rows that failed
+    """
+    patients = []
+    valid_idx = []
+    errors = {}
+
+    for i, row in enumerate(rows):
+        try:
+            patients.append(PatientData(**row))
+        except ValidationError as e:
+            errors[i] = _format_validation_error(e)
+            continue
+        except Exception as e:
+            errors[i] = str(e)
+            continue
+        valid_idx.append(i)
+
+    if not patients:
+        return np.empty((0, FEATURE_SCHEMA.n_features)), [], errors
+    return build_features_batch(patients=patients), valid_idx, errors
+
+
+def build_column_matrix(columns: dict):
+    """
+    Same as build_batch_matrix for column-oriented input.
+
+    When every column is already valid the matrix is filled column by
+    column without creating a PatientData per row; otherwise the rows are
+    validated one by one so each bad row gets its own error.
+    """
+    if columns and FEATURE_SCHEMA.check_columns(columns):
+        X = build_features_batch(columns=columns)
+        return X, list(range(X.shape[0])), {}
+
+    names = list(columns.keys())
+    rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+    return build_batch_matrix(rows)
+
+
+def explain_matrix(X: np.ndarray, hcc_service):
+    """
+    SHAP values for every row of X with a single explainer call on the unique rows.
+
+    Returns:
+        shap_values: (n_samples, n_features) array aligned with X
+        base_value: expected model output
+    """
+    X_unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    shap_values, base_value = hcc_service.explain_batch(X_unique)
+    return shap_values[inverse.reshape(-1)], base_value
+
+
+def score_matrix(X: np.ndarray, hcc_service, toxicity_service, explain: bool = True) -> dict:
+    """
+    Scores an (n_samples, n_features) matrix with one call per model.
+
+    Identical rows are scored once and the results are broadcast back,
+    so the output is always aligned with the rows of X. SHAP is skipped
+    entirely when explain is False.
+    """
+    X_unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    proba = hcc_service.hcc_predict(X_unique)[:, 1]
+    toxicity = toxicity_service.predict_toxicity_batch(X_unique)
+
+    shap_values, base_value = None, None
+    if explain:
+        shap_values, base_value = hcc_service.explain_batch(X_unique)
+        shap_values = shap_values[inverse]
+
+    return {
+        "probability": proba[inverse],
+        "shap_values": shap_values,
+        "baseline": base_value,
+        "toxicity_proba": toxicity[inverse],
+        "n_unique": int(X_unique.shape[0]),
+    }
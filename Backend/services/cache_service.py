@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600.0):
+        """
+        Bounded LRU + TTL cache of per-patient model outputs.
+
+        Keys are a hash of the float64 feature vector and the model version,
+        so a model reload can never serve results from the previous model.
+        Each entry holds the probability, the toxicity row and, if it was
+        computed, the SHAP row and base value.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, entry)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(row: np.ndarray, model_version: str) -> bytes:
+        row = np.ascontiguousarray(row, dtype=np.float64)
+        h = hashlib.blake2b(row.tobytes(), digest_size=16)
+        h.update(model_version.encode())
+        return h.digest()
+
+    def get(self, key: bytes, need_shap: bool = False):
+        """
+        Returns the cached entry, or None on a miss. An entry without SHAP
+        values counts as a miss when need_shap is True.
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] < now:
+                del self._entries[key]
+                item = None
+
+            if item is None or (need_shap and item[1]["shap_values"] is None):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: bytes, entry: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def add_shap(self, key: bytes, shap_values: np.ndarray, base_value: float):
+        """
+        Attaches SHAP values to an existing entry (e.g. once a deferred explanation finishes).
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                item[1]["shap_values"] = shap_values
+                item[1]["baseline"] = base_value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def make_entries(scores: dict) -> list:
+    """
+    Splits score_matrix output into one cache entry per row.
+    """
+    n_rows = scores["probability"].shape[0]
+    shap_values = scores["shap_values"]
+    return [
+        {
+            "probability": float(scores["probability"][i]),
+            "toxicity_proba": scores["toxicity_proba"][i].copy(),
+            "shap_values": shap_values[i].copy() if shap_values is not None else None,
+            "baseline": scores["baseline"],
+        }
+        for i in range(n_rows)
+    ]
+
+
+def model_fingerprint(paths) -> str:
+    """
+    Identifies a set of model artifacts by path, size and modification time.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        if path is None:
+            continue
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{path}:missing;".encode())
+    return h.hexdigest()
@@ -0,0 +1,74 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class DeferredExplanationStore:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 600.0):
+        """
+        Holds SHAP computations that were started after the prediction was
+        returned, so clients can fetch them later by handle.
+
+        Entries are dropped once they are older than ttl_seconds, and the
+        oldest entries are evicted when more than max_entries are held.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # handle -> (created, future, single_row)
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        while self._entries:
+            handle, (created, _, _) = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_entries or now - created > self.ttl_seconds:
+                self._entries.popitem(last=False)
+            else:
+                break
+
+    def add(self, future: Future, single_row: bool = False) -> str:
+        """
+        Registers a future resolving to (shap_values, base_value) and returns its handle.
+        single_row flattens the result to one SHAP vector, as /predict returns it.
+        """
+        handle = uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            self._entries[handle] = (now, future, single_row)
+            self._evict(now)
+        return handle
+
+    def add_failed(self, message: str) -> str:
+        """
+        Registers a handle for work that could not be started.
+        """
+        future = Future()
+        future.set_exception(RuntimeError(message))
+        return self.add(future)
+
+    def get(self, handle: str):
+        """
+        Returns the status of a deferred explanation, or None if the handle is unknown or expired.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            entry = self._entries.get(handle)
+        if entry is None:
+            return None
+
+        _, future, single_row = entry
+        if not future.done():
+            return {"status": "pending"}
+
+        error = future.exception()
+        if error is not None:
+            return {"status": "failed", "error": str(error)}
+
+        shap_values, base_value = future.result()
+        shap_values = shap_values[0] if single_row else shap_values
+        return {
+            "status": "ready",
+            "shap_values": shap_values.tolist(),
+            "baseline": float(base_value),
+        }
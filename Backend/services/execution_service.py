@@ -0,0 +1,264 @@
+import asyncio
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from Backend.services.batch_service import explain_matrix, score_matrix
+
+# -----------------------------
+# Per-process model services
+# -----------------------------
+# Each process (a pool worker, or the API process in thread / inline mode)
+# keeps the services of the last few model runs it has served. Every task
+# carries the ModelRun it was submitted under, so requests that started on
+# an old run finish on it while new requests load the new one.
+MAX_LOADED_RUNS = 2
+_loaded = OrderedDict()  # run key -> (hcc_service, toxicity_service)
+_load_lock = threading.Lock()
+
+
+def worker_services(run):
+    """
+    Returns (hcc_service, toxicity_service) for run, loading it on first use.
+    """
+    with _load_lock:
+        services = _loaded.get(run.key)
+        if services is None:
+            services = run.load()
+            _loaded[run.key] = services
+            while len(_loaded) > MAX_LOADED_RUNS:
+                _loaded.popitem(last=False)
+        else:
+            _loaded.move_to_end(run.key)
+        return services
+
+
+def load_worker_services(run):
+    """
+    Loads a run's models into this process. Used as the process pool initializer.
+    """
+    worker_services(run)
+
+
+def _warm_up(run) -> bool:
+    worker_services(run)
+    return True
+
+
+# -----------------------------
+# Execution layer
+# -----------------------------
+class ExecutorSaturated(Exception):
+    """
+    Raised when the inference queue is full; callers should retry later.
+    """
+    def __init__(self, retry_after: int):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+class NoActiveModel(Exception):
+    """
+    Raised when a task is submitted before any model run has been activated.
+    """
+
+
+class InferenceExecutor:
+    def __init__(self, mode: str, max_workers: int, max_queue: int,
+                 retry_after: int = 2, start_method: str = "spawn", eager: bool = True):
+        """
+        Runs CPU-bound inference off the event loop with bounded concurrency.
+
+        At most max_workers tasks run at once and at most max_queue more may
+        wait for a worker; anything beyond that raises ExecutorSaturated so
+        the route can answer 503 instead of piling up work.
+
+        With eager=True, workers load the active model when they start and a
+        new model run is warmed up on a fresh pool before it replaces the old
+        one; with eager=False models are loaded by the first task that needs them.
+        """
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self.start_method = start_method
+        self.eager = eager
+
+        self.run = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._in_flight = 0
+        self._reload_listeners = []
+
+    @property
+    def model_version(self):
+        return self.run.key if self.run is not None else None
+
+    def _new_pool(self, run):
+        if self.mode == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=load_worker_services if self.eager else None,
+                initargs=(run,) if self.eager else (),
+            )
+
+        if self.eager:
+            worker_services(run)
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        return _InlineExecutor()
+
+    def _warm(self, pool, run):
+        if self.mode == "process":
+            futures = [pool.submit(_warm_up, run) for _ in range(self.max_workers)]
+            for future in futures:
+                future.result()
+        else:
+            worker_services(run)
+
+    def _current(self):
+        with self._lock:
+            if self.run is None:
+                raise NoActiveModel("No model run is active")
+            if self._pool is None:
+                self._pool = self._new_pool(self.run)
+            return self._pool, self.run
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn, *args) -> Future:
+        """
+        Submits fn(run, *args) to the pool, or raises ExecutorSaturated when full.
+        The active ModelRun is passed as the first argument.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated(self.retry_after)
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            try:
+                pool, run = self._current()
+                future = pool.submit(fn, run, *args)
+            except BrokenExecutor:
+                # A worker died; start a fresh pool once before giving up
+                self._discard_pool(pool)
+                pool, run = self._current()
+                future = pool.submit(fn, run, *args)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    async def run_task(self, fn, *args):
+        """
+        Awaits fn(run, *args) on the pool without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def warm_up(self):
+        """
+        Starts every worker and loads the active model before the first request.
+        """
+        if self.run is None or not self.eager:
+            return
+        pool, run = self._current()
+        self._warm(pool, run)
+
+    def activate(self, run, warm: bool = False, force: bool = False):
+        """
+        Switches to a new model run without stopping the server.
+
+        The new pool is built (and warmed, if requested and eager) before the
+        swap, so no request waits on a cold worker. Tasks already submitted
+        finish on the old pool, which shuts down once they are done.
+        """
+        if not force and self.run is not None and run.key == self.run.key:
+            return
+
+        pool = None
+        if warm and self.eager:
+            pool = self._new_pool(run)
+            self._warm(pool, run)
+
+        with self._lock:
+            old_pool, self._pool, self.run = self._pool, pool, run
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+        for callback in self._reload_listeners:
+            callback(run.key)
+
+    def on_reload(self, callback):
+        """
+        Registers callback(model_version) to run after every model switch.
+        """
+        self._reload_listeners.append(callback)
+
+    def _discard_pool(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "queue_size": self.max_queue,
+            "in_flight": self._in_flight,
+            "model_version": self.model_version,
+            "started": self._pool is not None,
+        }
+
+
+class _InlineExecutor:
+    """
+    Minimal executor that runs tasks immediately in the caller's thread.
+    """
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        pass
+
+
+# -----------------------------
+# Tasks (run inside the pool)
+# -----------------------------
+def score_task(run, X, explain: bool = True) -> dict:
+    """
+    Batch / sweep scoring of a whole feature matrix.
+    """
+    hcc_service, toxicity_service = worker_services(run)
+    return score_matrix(X, hcc_service, toxicity_service, explain=explain)
+
+
+def explain_task(run, X):
+    """
+    SHAP values only, used for deferred explanations.
+    """
+    hcc_service, _ = worker_services(run)
+    return explain_matrix(X, hcc_service)
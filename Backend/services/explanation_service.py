@@ -1,20 +1,10 @@
+from Backend.services.feature_schema import FEATURE_SCHEMA
 import numpy as np
 
 class ExplanationService:
     def __init__(self):
         # Full model features in training order (must match SHAP values)
-        self.feature_names = [
-            'ast', 'alt', 'alp', 'albumin', 'total_bilirubin', 'afp',
-            'stage_at_diagnosis', 't_stage_at_diagnosis', 'age', 'gender',
-            'pmh_cirrhosis', 'pmh_fatty_liver', 'comorbid_diabetes', 'comorbid_htn',
-            'comorbid_cad', 'liver_tumor_flag', 'liver_disease_flag',
-            'portal_hypertension_flag', 'biliary_flag', 'symptoms_flag',
-            'regimen_atezo_bev', 'regimen_durva_treme', 'regimen_nivo_ipi',
-            'regimen_pembro_ipi', 'local_treatment_given_TACE',
-            'local_treatment_given_Y90', 'local_treatment_given_RFA',
-            'local_treatment_given_None', 'neoadjuvant_therapy',
-            'adjuvant_treatment_given'
-        ]
+        self.feature_names = FEATURE_SCHEMA.names
 
         # Human-readable mapping
         self.feature_names_human = {
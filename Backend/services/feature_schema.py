@@ -0,0 +1,181 @@
+from operator import attrgetter
+from typing import Optional
+
+import numpy as np
+
+from Backend.schemas.patient import PatientData
+
+
+class FeatureSchema:
+    def __init__(self, names: list, ner_flags: list, patient_model=PatientData):
+        """
+        Single definition of the model's feature order.
+
+        Every feature is either a PatientData field or an NER flag derived
+        from the clinical notes. The field extractor and the column indices
+        are compiled once here, so building features needs no per-call
+        lookups or pandas.
+        """
+        self.names = list(names)
+        self.ner_flags = list(ner_flags)
+        self.n_features = len(self.names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        missing = [name for name in self.ner_flags if name not in self.index]
+        if missing:
+            raise ValueError(f"NER flags not in the feature list: {missing}")
+
+        # Features read straight from the patient record, in feature order
+        self.patient_fields = [name for name in self.names if name not in self.ner_flags]
+        unknown = [name for name in self.patient_fields if name not in patient_model.model_fields]
+        if unknown:
+            raise ValueError(f"Features missing from {patient_model.__name__}: {unknown}")
+        self.int_fields = {
+            name for name in self.patient_fields if patient_model.model_fields[name].annotation is int
+        }
+        # Free-text fields (clinical notes), read by NER rather than as features
+        self.text_fields = [
+            name for name, field in patient_model.model_fields.items() if field.annotation == Optional[str]
+        ]
+
+        self._field_idx = np.array([self.index[name] for name in self.patient_fields])
+        self._ner_idx = np.array([self.index[name] for name in self.ner_flags])
+        self._get_fields = attrgetter(*self.patient_fields)
+        self._field_dtype = np.dtype((np.float64, len(self.patient_fields)))
+
+    def to_dict(self) -> dict:
+        return {
+            "features": self.names,
+            "ner_flags": self.ner_flags,
+            "ner_index": self._ner_idx.tolist(),
+        }
+
+    # -----------------------------
+    # Feature building
+    # -----------------------------
+    def _empty(self, n_rows: int, out: np.ndarray = None) -> np.ndarray:
+        if out is None:
+            return np.empty((n_rows, self.n_features), dtype=np.float64)
+        if out.shape != (n_rows, self.n_features):
+            raise ValueError(f"out has shape {out.shape}, expected {(n_rows, self.n_features)}")
+        return out
+
+    def build(self, patient, ner_flags) -> np.ndarray:
+        """
+        Feature vector (n_features,) for one patient and its NER flags.
+        """
+        row = np.empty(self.n_features, dtype=np.float64)
+        row[self._field_idx] = self._get_fields(patient)
+        row[self._ner_idx] = ner_flags
+        return row
+
+    def build_batch(self, patients: list, ner_flags, out: np.ndarray = None) -> np.ndarray:
+        """
+        Fills an (n_patients, n_features) matrix from PatientData objects.
+        """
+        X = self._empty(len(patients), out)
+        if patients:
+            X[:, self._field_idx] = np.fromiter(
+                map(self._get_fields, patients), dtype=self._field_dtype, count=len(patients)
+            )
+            X[:, self._ner_idx] = ner_flags
+        return X
+
+    def build_columns(self, columns: dict, ner_flags, out: np.ndarray = None) -> np.ndarray:
+        """
+        Fills an (n_rows, n_features) matrix from columnar input
+        ({field: [values, ...]}) previously accepted by check_columns.
+        """
+        n_rows = len(columns[self.patient_fields[0]])
+        X = self._empty(n_rows, out)
+        for name in self.patient_fields:
+            X[:, self.index[name]] = columns[name]
+        X[:, self._ner_idx] = ner_flags
+        return X
+
+    def check_columns(self, columns: dict) -> bool:
+        """
+        True if every row would validate as PatientData with the values
+        build_columns reads: every feature column present and numeric (no
+        strings or missing values), ints integral and within int64 like
+        pydantic requires, and text fields str or None. Anything else is
+        left to per-row validation.
+        """
+        for name in self.patient_fields:
+            if name not in columns:
+                return False
+            # Numbers only: strings ("12", "1e2") and None go through pydantic's own parsing
+            values = np.asarray(columns[name])
+            if values.ndim != 1 or values.dtype.kind not in "biuf":
+                return False
+            values = values.astype(np.float64)
+            if not np.all(np.isfinite(values)):
+                return False
+            if name in self.int_fields and not (
+                np.all(np.mod(values, 1) == 0) and np.all((values >= -2.0 ** 63) & (values < 2.0 ** 63))
+            ):
+                return False
+        for name in self.text_fields:
+            if any(value is not None and not isinstance(value, str) for value in columns.get(name, ())):
+                return False
+        return True
+
+    # -----------------------------
+    # Model checks
+    # -----------------------------
+    def check_model(self, model, name: str = "model"):
+        """
+        Verifies once, at load time, that a fitted estimator expects exactly
+        this feature order, so inference can pass plain arrays.
+        """
+        fitted_names = getattr(model, "feature_names_in_", None)
+        if fitted_names is not None and list(fitted_names) != self.names:
+            mismatch = next(
+                (i for i, (a, b) in enumerate(zip(fitted_names, self.names)) if a != b),
+                min(len(fitted_names), self.n_features),
+            )
+            raise ValueError(
+                f"{name} was trained on a different feature order than the schema "
+                f"(first difference at position {mismatch})"
+            )
+
+        n_features = getattr(model, "n_features_in_", None)
+        if n_features is not None and n_features != self.n_features:
+            raise ValueError(f"{name} expects {n_features} features, the schema has {self.n_features}")
+
+        # The names are checked; dropping them stops sklearn re-validating
+        # (and warning about) feature names on every array call
+        if fitted_names is not None:
+            del model.feature_names_in_
+
+
+# Training order of the HCC and toxicity models
+FEATURE_SCHEMA = FeatureSchema(
+    names=[
+        # Labs
+        'ast', 'alt', 'alp', 'albumin', 'total_bilirubin', 'afp',
+        # Tumor / disease burden
+        'stage_at_diagnosis', 't_stage_at_diagnosis',
+        # Demographics
+        'age', 'gender',
+        # Comorbidities / history
+        'pmh_cirrhosis', 'pmh_fatty_liver', 'comorbid_diabetes',
+        'comorbid_htn', 'comorbid_cad',
+        # NER flags
+        'liver_tumor_flag', 'liver_disease_flag', 'portal_hypertension_flag',
+        'biliary_flag', 'symptoms_flag',
+        # Systemic therapy regimens (already 0/1)
+        'regimen_atezo_bev', 'regimen_durva_treme',
+        'regimen_nivo_ipi', 'regimen_pembro_ipi',
+        # Local liver treatments (already 0/1)
+        'local_treatment_given_TACE', 'local_treatment_given_Y90',
+        'local_treatment_given_RFA', 'local_treatment_given_None',
+        # Other treatments (already 0/1)
+        'neoadjuvant_therapy', 'adjuvant_treatment_given',
+    ],
+    # Same order as generate_ner_flags returns them
+    ner_flags=[
+        'liver_tumor_flag', 'liver_disease_flag', 'portal_hypertension_flag',
+        'biliary_flag', 'symptoms_flag',
+    ],
+)
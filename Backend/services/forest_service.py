@@ -0,0 +1,324 @@
+import numpy as np
+import sklearn
+from scipy import sparse
+from sklearn.utils.fixes import parse_version
+
+# Leaf marker in sklearn's children arrays
+TREE_LEAF = -1
+
+# From scikit-learn 1.4 on, classifier trees store class fractions in
+# tree_.value and predict_proba returns them as is; before, it normalised counts
+_VALUE_IS_FRACTION = parse_version(sklearn.__version__) >= parse_version("1.4")
+
+# Rows per TreeSHAP chunk are chosen so that the (rows, leaves, depth)
+# working arrays stay around this many elements
+_SHAP_CHUNK_ELEMENTS = 1 << 20
+
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, missing_left, value, cover, roots, n_features, max_depth):
+        """
+        Flat array representation of a tree ensemble.
+
+        All trees are stored back to back: node i of the forest has a split
+        feature, threshold and global child indices (TREE_LEAF at leaves),
+        the side NaNs go to, the per-class fractions sklearn predicts at the
+        node, and a cover (weighted training samples reaching the node).
+        roots holds the index of each tree's root node.
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.cover = cover
+        self.roots = roots
+        self.n_features = n_features
+        self.max_depth = max_depth
+        self.n_trees = roots.shape[0]
+        self.n_classes = value.shape[1]
+
+        # Leaves point to themselves so every tree can be walked max_depth steps
+        is_leaf = left == TREE_LEAF
+        nodes = np.arange(left.shape[0], dtype=left.dtype)
+        self._walk_feature = np.where(is_leaf, 0, feature)
+        self._walk_left = np.where(is_leaf, nodes, left)
+        self._walk_right = np.where(is_leaf, nodes, right)
+
+        self._shap_paths = None
+
+    @classmethod
+    def from_sklearn(cls, model, dtype=np.float64):
+        """
+        Compiles a fitted sklearn RandomForest / ExtraTrees / DecisionTree classifier.
+
+        With dtype=np.float32 thresholds are rounded down to float32, which
+        routes float32 inputs exactly like the float64 thresholds, and the
+        leaf fractions are stored in float32 (probabilities then agree with
+        sklearn to ~1e-7 instead of bit for bit).
+        """
+        estimators = getattr(model, "estimators_", [model])
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output classifiers can be compiled")
+
+        feature, threshold, left, right, missing_left, value, cover, roots = [], [], [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == TREE_LEAF
+
+            # Class fractions per node, computed exactly as sklearn's predict_proba does
+            fractions = tree.value[:, 0, :].astype(np.float64)
+            if not _VALUE_IS_FRACTION:
+                totals = fractions.sum(axis=1, keepdims=True)
+                totals[totals == 0] = 1.0
+                fractions = fractions / totals
+
+            feature.append(np.where(is_leaf, -1, tree.feature).astype(np.int64))
+            threshold.append(tree.threshold.astype(np.float64))
+            left.append(np.where(is_leaf, TREE_LEAF, tree.children_left + offset).astype(np.int64))
+            right.append(np.where(is_leaf, TREE_LEAF, tree.children_right + offset).astype(np.int64))
+            missing_left.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool))
+            value.append(fractions)
+            cover.append(tree.weighted_n_node_samples.astype(np.float64))
+            roots.append(offset)
+            offset += tree.node_count
+
+        threshold = np.concatenate(threshold)
+        value = np.concatenate(value)
+        if dtype == np.float32:
+            rounded = threshold.astype(np.float32)
+            too_high = rounded > threshold
+            rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+            threshold, value = rounded, value.astype(np.float32)
+
+        return cls(
+            feature=np.concatenate(feature),
+            threshold=threshold,
+            left=np.concatenate(left),
+            right=np.concatenate(right),
+            missing_left=np.concatenate(missing_left),
+            value=np.ascontiguousarray(value),
+            cover=np.concatenate(cover),
+            roots=np.asarray(roots, dtype=np.int64),
+            n_features=int(model.n_features_in_),
+            max_depth=max(int(estimator.tree_.max_depth) for estimator in estimators),
+        )
+
+    @property
+    def expected_value(self) -> np.ndarray:
+        """
+        Mean model output over the training data (mean of the root values).
+        """
+        return (self.value[self.roots] / self.n_trees).sum(axis=0, dtype=np.float64)
+
+    # -----------------------------
+    # Inference
+    # -----------------------------
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leaf index (global) reached in every tree, shape (n_samples, n_trees).
+        """
+        X = np.asarray(X, dtype=np.float32)  # sklearn routes samples on float32 inputs
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n = X.shape[0]
+
+        flat = np.ascontiguousarray(X).ravel()
+        row_offset = (np.arange(n, dtype=np.int64) * self.n_features)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+
+        node = np.tile(self.roots, (n, 1))
+        for _ in range(self.max_depth):
+            x = flat[row_offset + self._walk_feature[node]]
+            go_left = x <= self.threshold[node]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[node]
+            node = np.where(go_left, self._walk_left[node], self._walk_right[node])
+        return node
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Class probabilities, shape (n_samples, n_classes).
+
+        With float64 arrays the result is bit-identical to sklearn's
+        predict_proba: tree outputs are summed in estimator order and then
+        divided by the number of trees.
+        """
+        leaf_values = self.value[self.apply(X).T]  # (n_trees, n_samples, n_classes)
+        return np.cumsum(leaf_values, axis=0, dtype=np.float64)[-1] / self.n_trees
+
+    # -----------------------------
+    # Path-dependent TreeSHAP
+    # -----------------------------
+    def compile_shap(self):
+        """
+        Precomputes the TreeSHAP path tables (otherwise built on first use).
+        """
+        if self._shap_paths is None:
+            self._compile_shap_paths()
+        return self
+
+    def _compile_shap_paths(self):
+        """
+        Flattens every root-to-leaf path into padded per-leaf arrays.
+
+        For each leaf and each distinct feature split on along its path
+        ("slot"), z is the product of cover ratios of the path's branches
+        on that feature, and the path's conditions on that feature are
+        kept so the "follows the path" indicator can be evaluated per row.
+        """
+        leaf_slots = []  # per leaf: list of (feature, z, [(node, went_left), ...])
+        leaf_values = []
+
+        for root in self.roots:
+            stack = [(int(root), [])]
+            while stack:
+                node, path = stack.pop()
+                if self.left[node] == TREE_LEAF:
+                    if not path:
+                        continue  # single-leaf tree: contributes only to the expected value
+                    slots = {}
+                    for parent, child, went_left in path:
+                        f = int(self.feature[parent])
+                        ratio = self.cover[child] / self.cover[parent]
+                        if f in slots:
+                            slots[f][0] *= ratio
+                            slots[f][1].append((parent, went_left))
+                        else:
+                            slots[f] = [ratio, [(parent, went_left)]]
+                    leaf_slots.append([(f, z, conds) for f, (z, conds) in slots.items()])
+                    leaf_values.append(self.value[node].astype(np.float64) / self.n_trees)
+                    continue
+
+                stack.append((int(self.right[node]), path + [(node, int(self.right[node]), False)]))
+                stack.append((int(self.left[node]), path + [(node, int(self.left[node]), True)]))
+
+        # Leaves are grouped by their number of slots m: each group needs
+        # exactly m slot rows and ceil(m / 2) quadrature nodes, no padding
+        groups = {}
+        for leaf, slots in enumerate(leaf_slots):
+            groups.setdefault(len(slots), []).append(leaf)
+
+        self._shap_paths = [
+            self._compile_shap_group(depth, [leaf_slots[i] for i in leaves], [leaf_values[i] for i in leaves])
+            for depth, leaves in sorted(groups.items())
+        ]
+        return self._shap_paths
+
+    def _compile_shap_group(self, depth, leaf_slots, leaf_values):
+        n_leaves = len(leaf_slots)
+
+        # Slots are stored slot-major: slot k of leaf l has flat index k * n_leaves + l
+        slot_z = np.empty((depth, n_leaves))
+        cond_node, cond_left, cond_slot = [], [], []
+        scatter_row, scatter_col, scatter_value = [], [], []
+        for leaf, slots in enumerate(leaf_slots):
+            for k, (f, z, conds) in enumerate(slots):
+                slot = k * n_leaves + leaf
+                slot_z[k, leaf] = z
+                for node, went_left in conds:
+                    cond_node.append(node)
+                    cond_left.append(went_left)
+                    cond_slot.append(slot)
+                for c in range(self.n_classes):
+                    scatter_row.append(f * self.n_classes + c)
+                    scatter_col.append(slot)
+                    scatter_value.append(leaf_values[leaf][c])
+
+        # Conditions are sorted by slot so one reduceat ANDs each slot's run
+        cond_slot = np.asarray(cond_slot, dtype=np.int64)
+        order = np.argsort(cond_slot, kind="stable")
+        cond_node = np.asarray(cond_node, dtype=np.int64)[order]
+        slot_starts = np.searchsorted(cond_slot[order], np.arange(depth * n_leaves))
+
+        # Sums slot contributions (times the leaf value) into (feature, class) pairs
+        to_features = sparse.csr_matrix(
+            (scatter_value, (scatter_row, scatter_col)),
+            shape=(self.n_features * self.n_classes, depth * n_leaves),
+        )
+
+        # Gauss-Legendre nodes on [0, 1]; exact for the degree depth - 1 integrands
+        t, w = np.polynomial.legendre.leggauss((depth + 1) // 2)
+        t, w = (t + 1.0) / 2.0, w / 2.0
+
+        # Factor of a slot the row does not follow (off), and the increase when it does
+        off = slot_z * (1.0 - t[:, None, None])
+        on = slot_z + (1.0 - slot_z) * t[:, None, None]
+
+        return {
+            "depth": depth,
+            "n_leaves": n_leaves,
+            "slot_z": slot_z[:, :, None],
+            "cond_feature": self.feature[cond_node].astype(np.int64),
+            "cond_threshold": self.threshold[cond_node][:, None],
+            "cond_missing_left": self.missing_left[cond_node][:, None],
+            "cond_left": np.asarray(cond_left, dtype=bool)[order][:, None],
+            "slot_starts": slot_starts,
+            "to_features": to_features,
+            "off": off[:, :, :, None],
+            "step": (on - off)[:, :, :, None],
+            "w": w,
+        }
+
+    def _shap_group(self, X, group):
+        n = X.shape[0]
+        n_leaves, depth = group["n_leaves"], group["depth"]
+
+        # o[slot, leaf, row] = 1 if the row satisfies every condition of the slot;
+        # NaNs go to each node's missing-value side, as in apply()
+        x = X.T[group["cond_feature"]]
+        go_left = x <= group["cond_threshold"]
+        if np.isnan(x).any():
+            go_left |= np.isnan(x) & group["cond_missing_left"]
+        follows = go_left == group["cond_left"]
+        o = np.logical_and.reduceat(follows, group["slot_starts"], axis=0)
+        o = o.reshape(depth, n_leaves, n).astype(np.float64)
+
+        # Shapley weight of slot i on a leaf with m slots:
+        #   sum_S |S|!(m-|S|-1)!/m! prod_{j in S} o_j prod_{j not in S, j != i} z_j
+        #   = integral_0^1 prod_{j != i} (z_j + (o_j - z_j) t) dt
+        integral = np.zeros((depth, n_leaves, n))
+        factors = np.empty((depth, n_leaves, n))
+        for off, step, w in zip(group["off"], group["step"], group["w"]):
+            np.multiply(o, step, out=factors)
+            factors += off
+            product = factors[0] * w
+            for k in range(1, depth):
+                product *= factors[k]
+            np.divide(product, factors, out=factors)
+            integral += factors
+
+        integral *= o - group["slot_z"]
+        return group["to_features"] @ integral.reshape(depth * n_leaves, n)
+
+    def _shap_chunk(self, X, groups):
+        phi = sum(self._shap_group(X, group) for group in groups)
+        return phi.T.reshape(X.shape[0], self.n_features, self.n_classes)
+
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        """
+        Exact path-dependent TreeSHAP values, shape (n_samples, n_features, n_classes).
+
+        Matches shap.TreeExplainer(model).shap_values(X) for the same model
+        (feature_perturbation="tree_path_dependent"), vectorised over rows,
+        leaves and trees with NumPy.
+        """
+        groups = self.compile_shap()._shap_paths
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # sklearn routes samples on float32 inputs
+        X = X.astype(np.float32)
+        if not groups:
+            return np.zeros((X.shape[0], self.n_features, self.n_classes))
+
+        per_row = max(group["n_leaves"] * group["depth"] for group in groups)
+        chunk = max(1, _SHAP_CHUNK_ELEMENTS // per_row)
+        if X.shape[0] <= chunk:
+            return self._shap_chunk(X, groups)
+        return np.concatenate([
+            self._shap_chunk(X[start:start + chunk], groups)
+            for start in range(0, X.shape[0], chunk)
+        ])
@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+
+# Symmetric log-spaced bin edges for SHAP values of a probability: about
+# 5% relative resolution from 1e-5 up to 1, one central bin around 0
+_POSITIVE_EDGES = np.geomspace(1e-5, 1.0, 256)
+BIN_EDGES = np.concatenate([-_POSITIVE_EDGES[::-1], _POSITIVE_EDGES])
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class ShapAggregator:
+    def __init__(self, feature_names: list, groups: dict, model_version: str = None):
+        """
+        Running cohort-level SHAP importance, overall and per group.
+
+        groups maps a group label (e.g. a regimen) to the index of the
+        one-hot feature column selecting its rows. Each explained row adds,
+        in O(features), to the count, the sum and sum of |SHAP| and a fixed
+        histogram per feature, from which mean |SHAP|, the signed mean and
+        quantiles are read without revisiting past predictions.
+        """
+        self.feature_names = list(feature_names)
+        self.group_names = ["all"] + list(groups)
+        self._group_columns = list(groups.values())
+        self._lock = threading.Lock()
+        self.reset(model_version)
+
+    def reset(self, model_version: str = None):
+        """
+        Drops the aggregates, e.g. when another model starts serving.
+        """
+        n_groups, n_features = len(self.group_names), len(self.feature_names)
+        with self._lock:
+            self.model_version = model_version
+            self._count = np.zeros(n_groups, dtype=np.int64)
+            self._sum = np.zeros((n_groups, n_features))
+            self._sum_abs = np.zeros((n_groups, n_features))
+            # Values beyond the outer edges land in the first / last bin
+            self._hist = np.zeros((n_groups, n_features, len(BIN_EDGES) - 1), dtype=np.int64)
+
+    def update(self, X: np.ndarray, shap_values: np.ndarray):
+        """
+        Adds explained rows: X (n, n_features) and their SHAP values (n, n_features).
+        """
+        X = np.asarray(X, dtype=float).reshape(-1, len(self.feature_names))
+        shap_values = np.asarray(shap_values, dtype=float).reshape(X.shape)
+        if not len(X):
+            return
+
+        bins = np.clip(np.searchsorted(BIN_EDGES, shap_values, side="right") - 1, 0, len(BIN_EDGES) - 2)
+        features = np.broadcast_to(np.arange(X.shape[1]), X.shape)
+        masks = [np.ones(len(X), dtype=bool)] + [X[:, column] == 1 for column in self._group_columns]
+
+        with self._lock:
+            for group, mask in enumerate(masks):
+                if not mask.any():
+                    continue
+                rows = shap_values[mask]
+                self._count[group] += len(rows)
+                self._sum[group] += rows.sum(axis=0)
+                self._sum_abs[group] += np.abs(rows).sum(axis=0)
+                np.add.at(self._hist[group], (features[mask], bins[mask]), 1)
+
+    @staticmethod
+    def _quantiles(hist: np.ndarray, count: int) -> np.ndarray:
+        """
+        (n_features, len(QUANTILES)) quantiles, interpolated inside the bins.
+        """
+        cumulative = np.cumsum(hist, axis=1)
+        result = np.empty((hist.shape[0], len(QUANTILES)))
+        for j, q in enumerate(QUANTILES):
+            target = q * count
+            # First bin whose cumulative count reaches the target
+            b = np.minimum((cumulative < target).sum(axis=1), hist.shape[1] - 1)
+            rows = np.arange(hist.shape[0])
+            before = np.where(b > 0, cumulative[rows, np.maximum(b - 1, 0)], 0)
+            inside = np.maximum(hist[rows, b], 1)
+            fraction = np.clip((target - before) / inside, 0.0, 1.0)
+            result[:, j] = BIN_EDGES[b] + fraction * (BIN_EDGES[b + 1] - BIN_EDGES[b])
+        return result
+
+    def summary(self, group: str = None) -> dict:
+        """
+        Per group: number of explained rows and, per feature (by decreasing
+        mean |SHAP|), mean |SHAP|, signed mean and quantiles. group selects
+        a single group; ValueError if it is unknown.
+        """
+        if group is not None and group not in self.group_names:
+            raise ValueError(f"Unknown group: {group}")
+        names = [group] if group is not None else self.group_names
+
+        with self._lock:
+            groups = {}
+            for name in names:
+                g = self.group_names.index(name)
+                count = int(self._count[g])
+                features = []
+                if count:
+                    mean_abs = self._sum_abs[g] / count
+                    mean = self._sum[g] / count
+                    quantiles = self._quantiles(self._hist[g], count)
+                    for f in np.argsort(-mean_abs, kind="stable"):
+                        features.append({
+                            "feature": self.feature_names[f],
+                            "mean_abs_shap": float(mean_abs[f]),
+                            "mean_shap": float(mean[f]),
+                            "quantiles": {f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, quantiles[f])},
+                        })
+                groups[name] = {"n": count, "features": features}
+            return {"model_version": self.model_version, "groups": groups}
@@ -0,0 +1,157 @@
+import re
+from collections import deque
+from typing import Dict, List, NamedTuple
+
+# Pattern kinds sharing the automaton with the keywords
+_KEYWORD, _PRE_NEGATION, _POST_NEGATION, _TERMINATOR = range(4)
+
+# Cues that negate a mention following them ("no ascites", "negative for varices")
+PRE_NEGATION_CUES = [
+    "no", "not", "denies", "denied", "without", "negative for", "no evidence of",
+    "no signs of", "no sign of", "free of", "absence of", "rules out", "ruled out",
+]
+
+# Cues that negate a mention preceding them ("ascites was ruled out")
+POST_NEGATION_CUES = ["ruled out", "was excluded", "excluded", "is absent", "absent", "unlikely"]
+
+# Tokens that end the scope of a negation cue
+TERMINATORS = [".", ";", ":", "!", "?", "but", "however", "although", "except"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[.;:!?]")
+
+
+def normalize_token(token: str) -> str:
+    """
+    Folds simple plurals so "Neoplasms" matches "neoplasm" and "ducts" "duct".
+    """
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased word and sentence-punctuation tokens; hyphens, commas and
+    other symbols only separate words.
+    """
+    return [normalize_token(token) for token in _TOKEN_RE.findall(text.lower())]
+
+
+class KeywordMatch(NamedTuple):
+    flag: int      # index of the flag the keyword belongs to
+    keyword: str
+    start: int     # token span [start, end)
+    end: int
+    negated: bool
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Dict[str, List[str]], negation_window: int = 5):
+        """
+        Aho-Corasick automaton over word tokens for several keyword lists.
+
+        keywords maps each flag name to its phrases, in flag order. Negation
+        cues and scope terminators are compiled into the same automaton, so
+        a note is scanned once, in time linear in its length.
+        """
+        self.flag_names = list(keywords)
+        self.negation_window = negation_window
+
+        # Trie: one dict of transitions per state, plus outputs per state
+        self._goto = [{}]
+        self._outputs = [[]]
+        for flag, phrases in enumerate(keywords.values()):
+            for phrase in phrases:
+                self._add(phrase, (_KEYWORD, flag, phrase))
+        for cue in PRE_NEGATION_CUES:
+            self._add(cue, (_PRE_NEGATION, None, cue))
+        for cue in POST_NEGATION_CUES:
+            self._add(cue, (_POST_NEGATION, None, cue))
+        for token in TERMINATORS:
+            self._add(token, (_TERMINATOR, None, token))
+        self._build_failure_links()
+
+    def _add(self, phrase: str, output: tuple):
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            if token not in self._goto[state]:
+                self._goto.append({})
+                self._outputs.append([])
+                self._goto[state][token] = len(self._goto) - 1
+            state = self._goto[state][token]
+        self._outputs[state].append((len(tokens),) + output)
+
+    def _build_failure_links(self):
+        # Breadth-first: a state's failure link is the longest proper suffix
+        # of its path that is also a path in the trie
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                if self._fail[child] == child:
+                    self._fail[child] = 0
+                # Inherit the outputs of the suffix state
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def _iter_outputs(self, tokens: List[str]):
+        state = 0
+        for position, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            for length, kind, flag, phrase in self._outputs[state]:
+                yield position + 1 - length, position + 1, kind, flag, phrase
+
+    # -----------------------------
+    # Scanning
+    # -----------------------------
+    def scan(self, text: str) -> List[KeywordMatch]:
+        """
+        Every keyword mention in the text, with its negation status.
+        """
+        matches = []
+        sentence_start = 0      # index in matches of the current sentence's first mention
+        negated_until = -1      # mentions starting before this token are negated
+
+        for start, end, kind, flag, phrase in self._iter_outputs(tokenize(text or "")):
+            if kind == _KEYWORD:
+                matches.append(KeywordMatch(flag, phrase, start, end, start < negated_until))
+            elif kind == _PRE_NEGATION:
+                negated_until = max(negated_until, end + self.negation_window)
+            elif kind == _POST_NEGATION:
+                for i in range(sentence_start, len(matches)):
+                    if matches[i].end <= start and start - matches[i].end < self.negation_window:
+                        matches[i] = matches[i]._replace(negated=True)
+            else:  # terminator: negation scope ends with the sentence / clause
+                negated_until = -1
+                sentence_start = len(matches)
+        return matches
+
+    def flags(self, text: str) -> List[int]:
+        """
+        1 for each flag with at least one non-negated mention, else 0.
+        """
+        flags = [0] * len(self.flag_names)
+        for match in self.scan(text):
+            if not match.negated:
+                flags[match.flag] = 1
+        return flags
+
+    def candidates(self, text: str) -> List[int]:
+        """
+        1 for each flag with any mention at all, negated or not. A flag whose
+        keywords never occur in the text cannot be produced by the transformer.
+        """
+        flags = [0] * len(self.flag_names)
+        for match in self.scan(text):
+            flags[match.flag] = 1
+        return flags
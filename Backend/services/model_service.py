@@ -2,61 +2,79 @@
 
 import joblib
 import numpy as np
-import pandas as pd
 import shap
+from scipy.special import expit
 from sklearn.preprocessing import StandardScaler
 
-# Feature names must match build_features order
-FEATURE_NAMES = [
-    'ast', 'alt', 'alp', 'albumin', 'total_bilirubin', 'afp',
-    'stage_at_diagnosis', 't_stage_at_diagnosis', 'age', 'gender',
-    'pmh_cirrhosis', 'pmh_fatty_liver', 'comorbid_diabetes',
-    'comorbid_htn', 'comorbid_cad',
-    'liver_tumor_flag', 'liver_disease_flag', 'portal_hypertension_flag',
-    'biliary_flag', 'symptoms_flag',
-    'regimen_atezo_bev', 'regimen_durva_treme',
-    'regimen_nivo_ipi', 'regimen_pembro_ipi',
-    'local_treatment_given_TACE', 'local_treatment_given_Y90',
-    'local_treatment_given_RFA', 'local_treatment_given_None',
-    'neoadjuvant_therapy', 'adjuvant_treatment_given'
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.forest_service import CompiledForest
+
+# Toxicity targets, in the column order of ToxicityModelService.predict_toxicity_batch
+ORGAN_SYSTEMS = [
+    'skin', 'liver', 'gi', 'lung', 'endocrine',
+    'neurologic', 'oral', 'musculoskeletal', 'renal', 'other'
 ]
 
 # -----------------------------
 # HCC Model Service
 # -----------------------------
 class HCCModelService:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, shap_engine: str = "native", predict_engine: str = "compiled"):
         """
         Load the HCC model (RandomForest or LogisticRegression) and setup SHAP explainer.
+
+        For tree ensembles, predict_engine="compiled" (or "compiled32" for
+        float32 arrays) predicts with a compiled copy of the forest and
+        shap_engine="native" explains with the in-project TreeSHAP;
+        "sklearn" / "shap" use the libraries directly.
         """
         self.model = joblib.load(model_path)
-        
+        FEATURE_SCHEMA.check_model(self.model, name="HCC model")
+        self.forest = None
+
+        is_forest = hasattr(self.model, "estimators_") and hasattr(self.model.estimators_[0], "tree_")
+        if is_forest and (predict_engine != "sklearn" or shap_engine == "native"):
+            dtype = np.float32 if predict_engine == "compiled32" else np.float64
+            self.forest = CompiledForest.from_sklearn(self.model, dtype=dtype)
+        self.predict_engine = predict_engine if self.forest is not None else "sklearn"
+        self.shap_engine = shap_engine if self.forest is not None else "shap"
+
+        if self.shap_engine == "native":
+            self.forest.compile_shap()
+            self.explainer = None
+            self.model_type = "tree"
+            return
+
         # Use TreeExplainer for RandomForest, LinearExplainer for LogisticRegression
         try:
             self.explainer = shap.TreeExplainer(self.model)
             self.model_type = "tree"
         except:
-            self.explainer = shap.LinearExplainer(self.model, np.zeros((1, len(FEATURE_NAMES))))
+            self.explainer = shap.LinearExplainer(self.model, np.zeros((1, FEATURE_SCHEMA.n_features)))
             self.model_type = "linear"
 
-    def _to_df(self, X: np.ndarray) -> pd.DataFrame:
-        if X.ndim == 1:
-            X = X.reshape(1, -1)
-        return pd.DataFrame(X, columns=FEATURE_NAMES)
+    @staticmethod
+    def _as_2d(X: np.ndarray) -> np.ndarray:
+        return X.reshape(1, -1) if X.ndim == 1 else X
 
     def hcc_predict(self, X: np.ndarray) -> np.ndarray:
         """
         Returns probability array (n_samples, 2) for binary classification
         """
-        X_df = self._to_df(X)
-        return self.model.predict_proba(X_df)
+        if self.predict_engine != "sklearn":
+            return self.forest.predict_proba(X)
+
+        return self.model.predict_proba(self._as_2d(X))
 
     def explain_prediction(self, X: np.ndarray):
         """
         Returns SHAP values and base value for the first sample
         """
-        X_df = self._to_df(X)
-        shap_values = self.explainer.shap_values(X_df)
+        if self.shap_engine == "native":
+            shap_values = self.forest.shap_values(X[:1] if X.ndim == 2 else X)
+            return shap_values[0, :, 1], self.forest.expected_value[1]
+
+        shap_values = self.explainer.shap_values(self._as_2d(X))
         if self.model_type == "tree":
             base_value = self.explainer.expected_value[1]  # positive class
             return shap_values[0][:, 1], base_value
@@ -64,6 +82,25 @@ class HCCModelService:
             base_value = self.explainer.expected_value[1] if hasattr(self.explainer, 'expected_value') else 0
             return shap_values[0], base_value
 
+    def explain_batch(self, X: np.ndarray):
+        """
+        Returns SHAP values (n_samples, n_features) for the positive class
+        and the base value, using a single explainer call for all rows.
+        """
+        if self.shap_engine == "native":
+            return self.forest.shap_values(X)[:, :, 1], float(self.forest.expected_value[1])
+
+        shap_values = self.explainer.shap_values(self._as_2d(X))
+        if self.model_type == "tree":
+            if isinstance(shap_values, list):  # older shap: one array per class
+                shap_values = shap_values[1]
+            elif shap_values.ndim == 3:
+                shap_values = shap_values[:, :, 1]
+            base_value = self.explainer.expected_value[1]
+        else:
+            base_value = self.explainer.expected_value[1] if hasattr(self.explainer, 'expected_value') else 0
+        return np.asarray(shap_values), float(base_value)
+
 # -----------------------------
 # Toxicity Model Service
 # -----------------------------
@@ -75,6 +112,41 @@ class ToxicityModelService:
         """
         self.model = joblib.load(model_path)
         self.scaler = joblib.load(scaler_path) if scaler_path else None
+        FEATURE_SCHEMA.check_model(self.model, name="Toxicity model")
+        if self.scaler is not None:
+            FEATURE_SCHEMA.check_model(self.scaler, name="Toxicity scaler")
+        self.coef, self.intercept = self._fuse()
+
+    def _fuse(self):
+        """
+        Folds the scaler into one (n_features, n_targets) coefficient matrix
+        when every target is a binary linear classifier, so that
+        sigmoid(X @ coef + intercept) gives all positive-class probabilities.
+        Returns (None, None) for other models, which keep the sklearn path.
+        """
+        estimators = getattr(self.model, "estimators_", None)
+        if not estimators:
+            return None, None
+        for estimator in estimators:
+            if not hasattr(estimator, "coef_") or len(getattr(estimator, "classes_", [])) != 2:
+                return None, None
+            if getattr(estimator, "multi_class", None) == "multinomial":
+                return None, None
+
+        coef = np.column_stack([estimator.coef_[0] for estimator in estimators]).astype(np.float64)
+        intercept = np.array([float(np.ravel(estimator.intercept_)[0]) for estimator in estimators])
+
+        if self.scaler is not None:
+            # Only a StandardScaler is folded; any other transform keeps the sklearn path
+            if not isinstance(self.scaler, StandardScaler):
+                return None, None
+            # ((x - mean) / scale) @ w + b == x @ (w / scale) + (b - (mean / scale) @ w)
+            # mean_ is set even with with_mean=False, so the flags decide what was applied
+            if self.scaler.with_std and self.scaler.scale_ is not None:
+                coef = coef / np.asarray(self.scaler.scale_)[:, None]
+            if self.scaler.with_mean:
+                intercept = intercept - np.asarray(self.scaler.mean_) @ coef
+        return np.ascontiguousarray(coef), intercept
 
     def _scale(self, X: np.ndarray) -> np.ndarray:
         if self.scaler:
@@ -87,3 +159,17 @@ class ToxicityModelService:
         """
         X_scaled = self._scale(X)
         return self.model.predict_proba(X_scaled)  # returns list of arrays if multi-class
+
+    def predict_toxicity_batch(self, X: np.ndarray) -> np.ndarray:
+        """
+        Returns positive-class probabilities as a dense (n_samples, n_targets) array
+        """
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.coef is not None:
+            return expit(X @ self.coef + self.intercept)
+
+        proba = self.predict_toxicity(X)
+        if isinstance(proba, list):  # multi-output: one (n_samples, 2) array per target
+            return np.column_stack([p[:, -1] for p in proba])
+        return np.asarray(proba)
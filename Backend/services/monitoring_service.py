@@ -0,0 +1,164 @@
+import threading
+from typing import Callable, Iterable
+
+import numpy as np
+
+# Score histogram used for the AUC: predictions in the same bin count as ties,
+# which bounds the error on the AUC by the mass of the bins shared by both classes
+SCORE_BINS = 1000
+CALIBRATION_BINS = 10
+THRESHOLD = 0.5
+
+
+def _bin(probability: float, n_bins: int) -> int:
+    return min(int(probability * n_bins), n_bins - 1) if probability > 0 else 0
+
+
+class PerformanceMonitor:
+    def __init__(self, groups: dict, loader: Callable[[], Iterable] = None):
+        """
+        Running performance of the saved predictions against the observed
+        outcomes, overall and per group.
+
+        groups maps a group label (e.g. a regimen) to the saved-prediction
+        column selecting its rows. Each outcome adds, in O(1), to a score
+        histogram per class (AUC), the squared error (Brier score), the
+        calibration bins and the confusion counts of the saved prediction
+        (probability > THRESHOLD, like the predict routes, when the row has
+        none), so summary() costs the same however many outcomes were seen.
+        Outcomes without a saved prediction are counted as unmatched.
+        loader returns the (saved prediction or None, outcome) pairs already
+        in storage; it runs once, on load() or the first replace().
+        """
+        self.loader = loader
+        self.group_names = ["all"] + list(groups)
+        self._group_columns = list(groups.values())
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = loader is None
+
+        n_groups = len(self.group_names)
+        self._hist = np.zeros((n_groups, 2, SCORE_BINS), dtype=np.int64)   # [group, outcome, score bin]
+        self._squared_error = np.zeros(n_groups)
+        self._calibration_n = np.zeros((n_groups, CALIBRATION_BINS), dtype=np.int64)
+        self._calibration_p = np.zeros((n_groups, CALIBRATION_BINS))
+        self._calibration_y = np.zeros((n_groups, CALIBRATION_BINS), dtype=np.int64)
+        self._confusion = np.zeros((n_groups, 2, 2), dtype=np.int64)      # [group, outcome, predicted]
+        self.unmatched = 0
+
+    def load(self):
+        with self._load_lock:
+            if self._loaded:
+                return
+            for pair in self.loader():
+                self._replace((None, None), pair)
+            self._loaded = True
+
+    def _groups(self, prediction: dict) -> list:
+        return [0] + [g + 1 for g, column in enumerate(self._group_columns) if prediction.get(column) == 1]
+
+    def _contribution(self, prediction: dict, outcome: int) -> tuple:
+        probability = min(max(float(prediction["probability"]), 0.0), 1.0)
+        predicted = prediction.get("prediction")
+        predicted = int(probability > THRESHOLD) if predicted is None else (1 if predicted else 0)
+        return self._groups(prediction), probability, predicted, 1 if outcome else 0
+
+    def _apply(self, groups: list, probability: float, predicted: int, outcome: int, sign: int):
+        # Caller holds the lock
+        score_bin = _bin(probability, SCORE_BINS)
+        calibration_bin = _bin(probability, CALIBRATION_BINS)
+        for g in groups:
+            self._hist[g, outcome, score_bin] += sign
+            self._squared_error[g] += sign * (probability - outcome) ** 2
+            self._calibration_n[g, calibration_bin] += sign
+            self._calibration_p[g, calibration_bin] += sign * probability
+            self._calibration_y[g, calibration_bin] += sign * outcome
+            self._confusion[g, outcome, predicted] += sign
+
+    def _pair(self, pair: tuple) -> tuple:
+        # (contribution or None, whether the outcome is unmatched)
+        prediction, outcome = pair
+        if outcome is None:
+            return None, 0
+        if prediction is None:
+            return None, 1
+        return self._contribution(prediction, outcome), 0
+
+    def _replace(self, previous: tuple, current: tuple):
+        removed, removed_unmatched = self._pair(previous)
+        added, added_unmatched = self._pair(current)
+        with self._lock:
+            if removed is not None:
+                self._apply(*removed, sign=-1)
+            if added is not None:
+                self._apply(*added, sign=1)
+            self.unmatched += added_unmatched - removed_unmatched
+
+    def replace(self, previous: tuple, current: tuple):
+        """
+        Follows a write to storage for one patient: previous and current are
+        its (saved prediction (a DB_Data row), outcome) pair before and after
+        the write, None where a table has no row. The old pair is taken out
+        and the new one added in one step, so a corrected outcome or a
+        re-saved prediction replaces the old pair, and an outcome stops
+        being unmatched once its prediction is saved. The figures thus
+        follow the predictions joined with the outcomes, with nothing kept
+        per patient; as each change is a difference of pairs, they do not
+        depend on the order concurrent writes are applied in.
+        """
+        self.load()
+        self._replace(previous, current)
+
+    # -----------------------------
+    # Metrics
+    # -----------------------------
+    @staticmethod
+    def _auc(negatives: np.ndarray, positives: np.ndarray):
+        n_negatives, n_positives = int(negatives.sum()), int(positives.sum())
+        if not n_negatives or not n_positives:
+            return None
+        # Positives ranked above the negatives of lower bins, half credit within a bin
+        below = np.cumsum(negatives) - negatives
+        pairs = (positives * below).sum() + 0.5 * (positives * negatives).sum()
+        return float(pairs / (n_negatives * n_positives))
+
+    def _group_summary(self, g: int) -> dict:
+        # Caller holds the lock
+        n = int(self._hist[g].sum())
+        if not n:
+            return {"n": 0, "positives": 0, "auc": None, "brier": None, "calibration": [], "confusion": None}
+
+        calibration = []
+        for b in np.flatnonzero(self._calibration_n[g]):
+            count = int(self._calibration_n[g, b])
+            calibration.append({
+                "bin": [b / CALIBRATION_BINS, (b + 1) / CALIBRATION_BINS],
+                "n": count,
+                "mean_predicted": float(self._calibration_p[g, b] / count),
+                "observed_rate": float(self._calibration_y[g, b] / count),
+            })
+        (tn, fp), (fn, tp) = self._confusion[g].tolist()
+        return {
+            "n": n,
+            "positives": int(self._hist[g, 1].sum()),
+            "auc": self._auc(self._hist[g, 0], self._hist[g, 1]),
+            "brier": float(self._squared_error[g] / n),
+            "calibration": calibration,
+            "confusion": {"threshold": THRESHOLD, "tp": tp, "fp": fp, "tn": tn, "fn": fn},
+        }
+
+    def summary(self, group: str = None) -> dict:
+        """
+        Per group: number of outcomes, AUC (None until both outcomes were
+        seen), Brier score, calibration bins and confusion counts. group
+        selects a single group; ValueError if it is unknown.
+        """
+        if group is not None and group not in self.group_names:
+            raise ValueError(f"Unknown group: {group}")
+        self.load()
+        names = [group] if group is not None else self.group_names
+        with self._lock:
+            return {
+                "unmatched_outcomes": self.unmatched,
+                "groups": {name: self._group_summary(self.group_names.index(name)) for name in names},
+            }
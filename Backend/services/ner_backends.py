@@ -0,0 +1,192 @@
+import json
+import os
+import random
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+import numpy as np
+
+
+class NERBackend(ABC):
+    """
+    Token-classification model behind the transformer NER engines.
+
+    A backend is called with a list of texts and returns, per text, a list of
+    entities ({"entity_group", "word", "start", "end", "score"}), like a
+    Hugging Face pipeline with aggregation. Its tokenizer is used to split
+    long notes into windows (see NLP_service.split_chunks).
+    """
+    name = "base"
+    tokenizer = None
+
+    @abstractmethod
+    def __call__(self, texts: List[str]) -> list:
+        ...
+
+
+# -----------------------------
+# Hugging Face pipeline
+# -----------------------------
+class HFPipelineBackend(NERBackend):
+    name = "hf"
+
+    def __init__(self, model_name: str):
+        from transformers import AutoTokenizer, pipeline
+
+        self.model_name = model_name
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Aggregation groups B-/I- tokens into one entity with an entity_group
+        self.pipeline = pipeline(
+            "token-classification", model=model_name, tokenizer=self.tokenizer, aggregation_strategy="simple"
+        )
+
+    def __call__(self, texts: List[str]) -> list:
+        return self.pipeline(texts, batch_size=len(texts))
+
+
+# -----------------------------
+# ONNX Runtime (CPU)
+# -----------------------------
+def aggregate_entities(text: str, offsets: np.ndarray, label_ids: np.ndarray, scores: np.ndarray,
+                       id2label: Dict[int, str]) -> list:
+    """
+    Groups consecutive tokens of the same entity type into entities, as the
+    pipeline's "simple" aggregation does. Tokens without a character span
+    (special tokens, padding) are skipped.
+    """
+    entities = []
+    current = None
+    for (start, end), label_id, score in zip(offsets.tolist(), label_ids.tolist(), scores.tolist()):
+        if end <= start:
+            continue
+        label = id2label[label_id]
+        if label == "O":
+            current = None
+            continue
+        if label[:2] in ("B-", "I-"):
+            prefix, entity_type = label[0], label[2:]
+        else:
+            prefix, entity_type = "I", label
+
+        if current is not None and current["entity_group"] == entity_type and prefix == "I":
+            current["end"] = end
+            current["scores"].append(score)
+            continue
+
+        current = {"entity_group": entity_type, "start": start, "end": end, "scores": [score]}
+        entities.append(current)
+
+    return [
+        {
+            "entity_group": entity["entity_group"],
+            "word": text[entity["start"]:entity["end"]],
+            "start": entity["start"],
+            "end": entity["end"],
+            "score": float(np.mean(entity["scores"])),
+        }
+        for entity in entities
+    ]
+
+
+class ONNXBackend(NERBackend):
+    name = "onnx"
+
+    def __init__(self, model_path: str, max_length: int = 512, threads: int = 0):
+        """
+        model_path is an .onnx file written by export_onnx; the tokenizer
+        and config.json (for the label names) are read from its directory.
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = os.path.dirname(os.path.abspath(model_path))
+        self.model_path = model_path
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        with open(os.path.join(model_dir, "config.json")) as f:
+            self.id2label = {int(i): label for i, label in json.load(f)["id2label"].items()}
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def __call__(self, texts: List[str]) -> list:
+        if not texts:
+            return []
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_length,
+            return_offsets_mapping=True, return_tensors="np",
+        )
+        offsets = encoded.pop("offset_mapping")
+        feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        logits = self.session.run(None, feeds)[0]
+
+        # Softmax over labels: the predicted label and its probability per token
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=-1, keepdims=True)
+        label_ids = probs.argmax(axis=-1)
+        scores = probs.max(axis=-1)
+
+        return [
+            aggregate_entities(text, offsets[i], label_ids[i], scores[i], self.id2label)
+            for i, text in enumerate(texts)
+        ]
+
+
+# -----------------------------
+# Random (demo placeholder)
+# -----------------------------
+class WhitespaceTokenizer:
+    """
+    Minimal fast-tokenizer stand-in: one token per whitespace-separated word.
+    """
+    is_fast = True
+
+    def __call__(self, text: str, add_special_tokens: bool = False, return_offsets_mapping: bool = False):
+        spans = [match.span() for match in re.finditer(r"\S+", text)]
+        encoded = {"input_ids": list(range(len(spans)))}
+        if return_offsets_mapping:
+            encoded["offset_mapping"] = spans
+        return encoded
+
+
+class RandomBackend(NERBackend):
+    name = "random"
+
+    def __init__(self, keywords: Dict[str, List[str]], rate: float = 0.2, seed: int = None):
+        """
+        Reports each keyword as a disease mention with probability rate, to
+        exercise chunking, caching and batching without a model.
+        """
+        self.phrases = [phrase for phrases in keywords.values() for phrase in phrases]
+        self.rate = rate
+        self.rng = random.Random(seed)
+        self.tokenizer = WhitespaceTokenizer()
+
+    def __call__(self, texts: List[str]) -> list:
+        return [
+            [
+                {"entity_group": "Disease", "word": phrase, "start": 0, "end": 0, "score": 1.0}
+                for phrase in self.phrases
+                if self.rng.random() < self.rate
+            ]
+            for _ in texts
+        ]
+
+
+def create_backend(name: str, model_name: str = None, onnx_path: str = None, keywords: dict = None) -> NERBackend:
+    """
+    name: "hf" (Hugging Face pipeline), "onnx" (ONNX Runtime on CPU) or "random".
+    """
+    if name == "hf":
+        return HFPipelineBackend(model_name)
+    if name == "onnx":
+        return ONNXBackend(onnx_path)
+    if name == "random":
+        return RandomBackend(keywords or {})
+    raise ValueError(f"Unknown NER backend: {name}")
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from typing import Callable, List
+
+
+class _Request:
+    def __init__(self, n_chunks: int):
+        self.future = Future()
+        self.results = [None] * n_chunks
+        self.remaining = n_chunks
+
+
+class NERMicroBatcher:
+    def __init__(self, ner_fn: Callable[[List[str]], list], max_batch_size: int = 32, max_wait_ms: float = 10.0,
+                 executor: Executor = None):
+        """
+        Collects text chunks from all concurrent callers and runs them through
+        ner_fn together.
+
+        ner_fn takes a list of texts and returns one result (e.g. the list of
+        entities of a token-classification pipeline) per text. A batch is
+        run as soon as max_batch_size chunks are waiting, or max_wait_ms
+        after its first chunk arrived, whichever comes first. Results are
+        routed back to each caller in its own chunk order.
+
+        Batches run on the collecting thread, one at a time, unless an
+        executor is given (e.g. for I/O-bound ner_fn): each batch is then
+        handed to it and the next one is collected right away.
+        """
+        self.ner_fn = ner_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+
+        self._queue = queue.Queue()  # (request, chunk index, text), or None to stop
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        # Counters
+        self.batches = 0
+        self.chunks = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("NER micro-batcher is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ner-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, chunks: List[str]) -> Future:
+        """
+        Queues the chunks of one caller; the future resolves to their results.
+        """
+        request = _Request(len(chunks))
+        if not chunks:
+            request.future.set_result([])
+            return request.future
+
+        self._ensure_started()
+        for i, text in enumerate(chunks):
+            self._queue.put((request, i, text))
+        return request.future
+
+    def run(self, chunks: List[str], timeout: float = None) -> list:
+        """
+        Blocking form of submit.
+        """
+        return self.submit(chunks).result(timeout=timeout)
+
+    # -----------------------------
+    # Worker thread
+    # -----------------------------
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _dispatch(self, batch: list):
+        try:
+            outputs = self.ner_fn([text for _, _, text in batch])
+            if len(outputs) != len(batch):
+                raise RuntimeError(f"NER returned {len(outputs)} results for {len(batch)} chunks")
+        except Exception as e:
+            with self._lock:
+                for request, _, _ in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            return
+
+        # Batches may finish on several threads: a request completes once
+        with self._lock:
+            self.batches += 1
+            self.chunks += len(batch)
+            for (request, i, _), output in zip(batch, outputs):
+                request.results[i] = output
+                request.remaining -= 1
+                if request.remaining == 0 and not request.future.done():
+                    request.future.set_result(request.results)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            if self.executor is None:
+                self._dispatch(batch)
+            else:
+                self.executor.submit(self._dispatch, batch)
+
+    def close(self):
+        """
+        Stops the worker thread once the chunks already queued are processed.
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "chunks": self.chunks,
+            "mean_batch_size": self.chunks / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
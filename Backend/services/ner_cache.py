@@ -0,0 +1,147 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class NERCache:
+    def __init__(self, model_name: str, max_entries: int = 50000, path: str = None):
+        """
+        Content-addressed cache of NER results per text unit (sentence or chunk).
+
+        Keys hash the NER model name and the whitespace-normalised text, so
+        the same sentence repeated in a follow-up note is looked up instead
+        of run through the model again. Entries live in an in-memory LRU
+        and, when path is given, in a SQLite table that survives restarts.
+        The table has its own lock, so commits never block in-memory hits.
+        """
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.path = path
+        self._entries = OrderedDict()  # key -> list of extracted mentions
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ner_cache ("
+                "key BLOB PRIMARY KEY, mentions TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_saved = 0       # text not sent to the model thanks to hits
+        self.bytes_processed = 0   # text that had to go through the model
+
+    def make_key(self, text: str) -> bytes:
+        h = hashlib.blake2b(_WHITESPACE_RE.sub(" ", text).strip().encode(), digest_size=16)
+        h.update(b"\0" + self.model_name.encode())
+        return h.digest()
+
+    def _remember(self, key: bytes, mentions: list):
+        # Caller holds the lock
+        self._entries[key] = mentions
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: bytes):
+        # Mentions stored on disk, or None
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT mentions FROM ner_cache WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def get(self, key: bytes, n_bytes: int = 0):
+        """
+        Returns the cached mentions for the key, or None on a miss.
+        n_bytes is the size of the text, counted in bytes_saved on a hit.
+        """
+        with self._lock:
+            mentions = self._entries.get(key)
+            if mentions is not None:
+                self._entries.move_to_end(key)
+
+        from_disk = mentions is None and self._db is not None
+        if from_disk:
+            mentions = self._load(key)
+
+        with self._lock:
+            if mentions is None:
+                self.misses += 1
+                self.bytes_processed += n_bytes
+                return None
+
+            if from_disk:
+                self.disk_hits += 1
+                if self.max_entries > 0:
+                    self._remember(key, mentions)
+            self.hits += 1
+            self.bytes_saved += n_bytes
+            return mentions
+
+    def put(self, key: bytes, mentions: list):
+        self.put_many([(key, mentions)])
+
+    def put_many(self, items: list):
+        """
+        Stores (key, mentions) pairs, e.g. one model batch, in a single
+        transaction.
+        """
+        items = [(key, list(mentions)) for key, mentions in items]
+        if not items:
+            return
+        if self.max_entries > 0:
+            with self._lock:
+                for key, mentions in items:
+                    self._remember(key, mentions)
+        with self._db_lock:
+            if self._db is not None:
+                created = time.time()
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO ner_cache (key, mentions, created) VALUES (?, ?, ?)",
+                        [(key, json.dumps(mentions), created) for key, mentions in items],
+                    )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM ner_cache")
+                self._db.commit()
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "bytes_processed": self.bytes_processed,
+            }
@@ -0,0 +1,76 @@
+"""
+Exports a Hugging Face token-classification model to ONNX and quantizes
+its weights to int8, for the "onnx" NER backend on CPU-only nodes.
+
+    python -m Backend.services.ner_export [--model NAME_OR_PATH] [--out DIR] [--no-quantize]
+
+DIR then holds model.onnx, model.int8.onnx, the tokenizer and config.json.
+"""
+import argparse
+import os
+
+from Backend import config
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def export_onnx(model_name: str, out_dir: str, quantize: bool = True, opset: int = 17) -> str:
+    """
+    Writes the model (logits output, dynamic batch and sequence axes) with
+    its tokenizer and config to out_dir. Returns the path of the model to
+    serve: the int8 file when quantize is True.
+    """
+    import torch
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForTokenClassification.from_pretrained(model_name).eval()
+    os.makedirs(out_dir, exist_ok=True)
+
+    sample = tokenizer(["Portal vein thrombosis", "ascites"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class _Logits(torch.nn.Module):
+        # Positional inputs in input_names order, logits only
+        def __init__(self):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).logits
+
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["logits"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            _Logits(), tuple(sample[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes, opset_version=opset,
+        )
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+
+    if not quantize:
+        return fp32_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.join(out_dir, INT8_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config.NER_MODEL_NAME)
+    parser.add_argument("--out", default=os.path.dirname(config.NER_ONNX_PATH))
+    parser.add_argument("--no-quantize", action="store_true", help="only write the float32 model")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+
+    path = export_onnx(args.model, args.out, quantize=not args.no_quantize, opset=args.opset)
+    print(f"Exported {args.model} to {path}")
+
+
+if __name__ == "__main__":
+    main()
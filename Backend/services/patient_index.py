@@ -0,0 +1,91 @@
+import threading
+from typing import Callable, Iterable
+
+import numpy as np
+
+
+class PatientIdIndex:
+    def __init__(self, loader: Callable[[], np.ndarray], merge_threshold: int = 4096):
+        """
+        Exact in-memory set of the patient_ids that have a saved prediction.
+
+        Ids are kept in a sorted int64 array (8 bytes each) plus a small
+        buffer of recent inserts, merged into the array once it holds
+        merge_threshold ids. loader returns the ids already in storage; it
+        runs once, on load() or the first lookup. Both hits and misses are
+        answered without a database round trip.
+        """
+        self.loader = loader
+        self.merge_threshold = max(1, int(merge_threshold))
+        self._ids = np.empty(0, dtype=np.int64)
+        self._buffer = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    def load(self):
+        with self._load_lock:
+            if self._loaded:
+                return
+            ids = np.unique(np.asarray(self.loader(), dtype=np.int64))
+            with self._lock:
+                # Inserts made before or while loading are in the buffer
+                self._ids = ids
+                self._merge()
+                self._loaded = True
+
+    def _merge(self):
+        # Caller holds the lock
+        if self._buffer:
+            buffered = np.fromiter(self._buffer, dtype=np.int64, count=len(self._buffer))
+            self._ids = np.union1d(self._ids, buffered)
+            self._buffer.clear()
+
+    def _in_array(self, ids: np.ndarray) -> np.ndarray:
+        # Caller holds the lock
+        if not self._ids.size:
+            return np.zeros(ids.shape, dtype=bool)
+        positions = np.searchsorted(self._ids, ids)
+        return self._ids[np.minimum(positions, self._ids.size - 1)] == ids
+
+    def add(self, patient_id: int):
+        self.add_many([patient_id])
+
+    def add_many(self, patient_ids: Iterable[int]):
+        ids = np.fromiter((int(patient_id) for patient_id in patient_ids), dtype=np.int64)
+        with self._lock:
+            self._buffer.update(ids[~self._in_array(ids)].tolist())
+            if len(self._buffer) >= self.merge_threshold:
+                self._merge()
+
+    def __contains__(self, patient_id: int) -> bool:
+        self.load()
+        patient_id = int(patient_id)
+        with self._lock:
+            return patient_id in self._buffer or bool(self._in_array(np.array([patient_id]))[0])
+
+    def contains_many(self, patient_ids) -> np.ndarray:
+        """
+        Boolean array: whether each id is known, in O(n log N).
+        """
+        self.load()
+        ids = np.asarray(patient_ids, dtype=np.int64).reshape(-1)
+        with self._lock:
+            found = self._in_array(ids)
+            if self._buffer:
+                buffered = np.fromiter(self._buffer, dtype=np.int64, count=len(self._buffer))
+                found |= np.isin(ids, buffered)
+        return found
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._ids.size) + len(self._buffer)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._loaded,
+                "indexed": int(self._ids.size),
+                "buffered": len(self._buffer),
+                "bytes": int(self._ids.nbytes),
+            }
@@ -0,0 +1,158 @@
+import json
+import os
+import pathlib
+import threading
+
+from Backend import config
+from Backend.services.cache_service import model_fingerprint
+from Backend.services.model_service import HCCModelService, ToxicityModelService
+
+# Artifact file names inside a run directory
+HCC_MODEL_FILE = "random_forest_demo.pkl"
+TOXICITY_MODEL_FILE = "logistic_toxicity_model.pkl"
+TOXICITY_SCALER_FILE = "logistic_toxicity_scaler.pkl"
+META_FILE = "meta.json"
+
+# run_id used when the artifacts sit directly in the model directory
+DEFAULT_RUN_ID = "default"
+
+
+class ModelRun:
+    def __init__(self, run_id: str, path: str, version: str = None, created: float = None):
+        """
+        One set of model artifacts (HCC model, toxicity model, optional scaler).
+
+        Small and picklable, so it can be sent with every task to the
+        inference workers, which load it on first use.
+        """
+        self.run_id = run_id
+        self.path = str(path)
+        self.hcc_model_path = os.path.join(self.path, HCC_MODEL_FILE)
+        self.toxicity_model_path = os.path.join(self.path, TOXICITY_MODEL_FILE)
+        scaler_path = os.path.join(self.path, TOXICITY_SCALER_FILE)
+        self.toxicity_scaler_path = scaler_path if os.path.exists(scaler_path) else None
+
+        self.created = created if created is not None else os.path.getmtime(self.hcc_model_path)
+        self.version = version or run_id
+
+        # Changes whenever an artifact is replaced, even under the same run_id
+        self.fingerprint = model_fingerprint(
+            (self.hcc_model_path, self.toxicity_model_path, self.toxicity_scaler_path)
+        )
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies exactly which artifacts are served (used in cache keys).
+        """
+        return f"{self.run_id}:{self.fingerprint}"
+
+    def load(self):
+        """
+        Returns freshly loaded (hcc_service, toxicity_service) for this run.
+        """
+        return (
+            HCCModelService(
+                self.hcc_model_path, shap_engine=config.SHAP_ENGINE, predict_engine=config.PREDICT_ENGINE
+            ),
+            ToxicityModelService(self.toxicity_model_path, self.toxicity_scaler_path),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "version": self.version,
+            "created": self.created,
+            "fingerprint": self.fingerprint,
+            "has_scaler": self.toxicity_scaler_path is not None,
+        }
+
+
+def _read_run(run_id: str, path: pathlib.Path):
+    if not (path / HCC_MODEL_FILE).is_file() or not (path / TOXICITY_MODEL_FILE).is_file():
+        return None
+
+    meta = {}
+    if (path / META_FILE).is_file():
+        with open(path / META_FILE) as f:
+            meta = json.load(f)
+    return ModelRun(
+        run_id=str(meta.get("run_id", run_id)),
+        path=path,
+        version=meta.get("version"),
+        created=meta.get("created"),
+    )
+
+
+class ModelRegistry:
+    def __init__(self, model_dir: str, pinned_run_id: str = None):
+        """
+        Discovers model runs under model_dir and tracks which one is active.
+
+        Layout: model_dir/<run_id>/{random_forest_demo.pkl, logistic_toxicity_model.pkl,
+        logistic_toxicity_scaler.pkl, meta.json (optional)}. Artifacts placed
+        directly in model_dir are registered as the "default" run.
+        """
+        self.model_dir = pathlib.Path(model_dir)
+        self.pinned_run_id = pinned_run_id
+
+        self._runs = {}
+        self._active = None
+        self._lock = threading.Lock()
+
+    def discover(self) -> dict:
+        """
+        Rescans model_dir and returns {run_id: ModelRun}.
+        """
+        runs = {}
+        if self.model_dir.is_dir():
+            root_run = _read_run(DEFAULT_RUN_ID, self.model_dir)
+            if root_run is not None:
+                runs[root_run.run_id] = root_run
+            for child in sorted(self.model_dir.iterdir()):
+                if child.is_dir():
+                    run = _read_run(child.name, child)
+                    if run is not None:
+                        runs[run.run_id] = run
+
+        with self._lock:
+            self._runs = runs
+        return dict(runs)
+
+    def runs(self) -> list:
+        with self._lock:
+            runs = list(self._runs.values())
+        return sorted(runs, key=lambda run: run.created, reverse=True)
+
+    def get(self, run_id: str) -> ModelRun:
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run is None:
+            raise KeyError(f"Unknown model run: {run_id}")
+        return run
+
+    def latest(self):
+        runs = self.runs()
+        return runs[0] if runs else None
+
+    @property
+    def active(self):
+        return self._active
+
+    def select(self, run_id: str = None) -> ModelRun:
+        """
+        Resolves which run should be served: the given run_id, else the
+        pinned one, else the most recently created run.
+        """
+        run_id = run_id or self.pinned_run_id
+        run = self.get(run_id) if run_id else self.latest()
+        if run is None:
+            raise FileNotFoundError(f"No model artifacts found under {self.model_dir}")
+        return run
+
+    def set_active(self, run: ModelRun):
+        """
+        Makes run the active model. A single reference swap, so readers see
+        either the old run or the new one, never a mix.
+        """
+        self._active = run
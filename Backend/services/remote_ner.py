@@ -0,0 +1,217 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from typing import List
+
+import httpx
+
+from Backend.services.ner_batcher import NERMicroBatcher
+
+
+class RemoteNERError(Exception):
+    """
+    The remote NER service did not answer in time, failed, or is cut off
+    by the circuit breaker.
+    """
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        """
+        Opens after failure_threshold consecutive failures; calls are then
+        refused until reset_seconds have passed, when one trial call is let
+        through (half-open) to decide whether to close again.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class RemoteNERClient:
+    def __init__(self, url: str, timeout_ms: float = 500, hedge_ms: float = 150, max_batch_size: int = 32,
+                 max_wait_ms: float = 10, pool_size: int = 10, breaker: CircuitBreaker = None):
+        """
+        Client for a remote NER flag service: POST url {"notes": [...]}
+        answered by {"flags": [[0/1 per flag], ...]}, one list per note.
+
+        Connections are kept alive in a pool of pool_size. Notes are sent in
+        batches of max_batch_size, and single notes from concurrent callers
+        are coalesced for up to max_wait_ms (0 sends each call on its own).
+        When a request has not answered after hedge_ms, the same request is
+        sent again and the first answer wins (0 disables hedging). Every
+        request is bounded by timeout_ms from the moment it is sent; a
+        coalesced note may also wait up to timeout_ms for a free connection
+        first, which stats() reports as a queue timeout.
+        """
+        self.url = url
+        self.timeout_ms = timeout_ms
+        self.hedge_ms = hedge_ms
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.breaker = breaker or CircuitBreaker()
+
+        self._http = httpx.Client(
+            timeout=timeout_ms / 1000.0,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+        # Room for a hedge next to every first attempt
+        self._executor = ThreadPoolExecutor(max_workers=2 * pool_size, thread_name_prefix="remote-ner")
+        self._batch_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="remote-ner-batch")
+        self._batcher = None
+        if max_wait_ms > 0:
+            # Coalesced batches are sent on the batch pool, up to pool_size at a time
+            self._batcher = NERMicroBatcher(
+                self._send_batch, max_batch_size=self.max_batch_size, max_wait_ms=max_wait_ms,
+                executor=self._batch_executor,
+            )
+        self._max_queue_wait = max_wait_ms / 1000.0 + 2 * timeout_ms / 1000.0
+
+        # Counters, updated from the pool threads
+        self._counter_lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.queue_timeouts = 0
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _post(self, notes: List[str]) -> list:
+        self._count("requests")
+        response = self._http.post(self.url, json={"notes": notes})
+        response.raise_for_status()
+        flags = response.json()["flags"]
+        if len(flags) != len(notes):
+            raise RemoteNERError(f"Remote NER returned {len(flags)} results for {len(notes)} notes")
+        return flags
+
+    def _post_hedged(self, notes: List[str], deadline: float) -> list:
+        attempts = {self._executor.submit(self._post, notes): "first"}
+        hedge_at = time.monotonic() + self.hedge_ms / 1000.0 if self.hedge_ms > 0 else None
+        last_error = None
+
+        while attempts:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = deadline if hedge_at is None else min(deadline, hedge_at)
+            done, _ = wait(attempts, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                kind = attempts.pop(future)
+                if future.exception() is None:
+                    if kind == "hedge":
+                        self._count("hedge_wins")
+                    return future.result()
+                last_error = future.exception()
+
+            # Hedge once: after hedge_ms, or right away when the first attempt failed
+            if hedge_at is not None and (time.monotonic() >= hedge_at or not attempts):
+                hedge_at = None
+                if time.monotonic() < deadline:
+                    self._count("hedges")
+                    attempts[self._executor.submit(self._post, notes)] = "hedge"
+
+        if last_error is not None and not attempts:
+            raise RemoteNERError(f"Remote NER failed: {last_error}") from last_error
+        raise RemoteNERError(f"Remote NER did not answer within {self.timeout_ms:g} ms")
+
+    def _send_batch(self, notes: List[str], deadline: float = None) -> list:
+        """
+        One hedged request, recorded by the circuit breaker.
+        """
+        if not self.breaker.allow():
+            raise RemoteNERError("Remote NER circuit breaker is open")
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout_ms / 1000.0
+        try:
+            flags = self._post_hedged(notes, deadline)
+        except Exception:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return flags
+
+    def flags(self, notes: List[str]) -> list:
+        """
+        Flags for each note. Raises RemoteNERError when the service fails,
+        does not answer within timeout_ms, or the circuit breaker is open.
+        """
+        if not notes:
+            return []
+        if self.breaker.state == "open":
+            raise RemoteNERError("Remote NER circuit breaker is open")
+
+        # Small calls are coalesced with concurrent ones; a cohort is batched as is.
+        # The request deadline starts when the batch is sent, so the wait
+        # covers the coalescing window, a free connection and the request
+        if self._batcher is not None and len(notes) < self.max_batch_size:
+            try:
+                return self._batcher.run(list(notes), timeout=self._max_queue_wait)
+            except TimeoutError:
+                self._count("queue_timeouts")
+                raise RemoteNERError("Remote NER request was not sent in time: every connection is busy") from None
+
+        # Batches go out together and share one deadline
+        deadline = time.monotonic() + self.timeout_ms / 1000.0
+        batches = [list(notes[i:i + self.max_batch_size]) for i in range(0, len(notes), self.max_batch_size)]
+        if len(batches) == 1:
+            return self._send_batch(batches[0], deadline)
+        futures = [self._batch_executor.submit(self._send_batch, batch, deadline) for batch in batches]
+        return [flag for future in futures for flag in future.result()]
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.close()
+        self._batch_executor.shutdown(wait=False)
+        self._executor.shutdown(wait=False)
+        self._http.close()
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            return {
+                "url": self.url,
+                "circuit": self.breaker.state,
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "failures": self.failures,
+                "queue_timeouts": self.queue_timeouts,
+            }
@@ -0,0 +1,125 @@
+import msgpack
+import numpy as np
+import orjson
+from fastapi import Response
+
+# Media types the predict routes can answer with, chosen from the Accept header
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+_ALIASES = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+
+def negotiate(accept: str = None) -> str:
+    """
+    The supported media type the client prefers (highest q, then header
+    order). JSON when the header is missing, is */* or lists nothing supported.
+    """
+    choices = []
+    for position, part in enumerate((accept or "").split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type.lower() in _ALIASES and q > 0:
+            choices.append((-q, position, _ALIASES[media_type.lower()]))
+    return min(choices)[2] if choices else JSON
+
+
+def to_float32(obj):
+    """
+    The payload with its floats as float32: lists of floats become float32
+    arrays (converted in one call each), single floats np.float32 scalars.
+    """
+    if isinstance(obj, dict):
+        return {key: to_float32(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        if obj and isinstance(obj[0], float):
+            try:
+                return np.asarray(obj, dtype=np.float32)
+            except (TypeError, ValueError):
+                pass
+        return [to_float32(value) for value in obj]
+    if isinstance(obj, float):
+        return np.float32(obj)
+    return obj
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _arrow_table(payload: dict, float32: bool):
+    """
+    Tabular responses ("results") as one row per result, anything else as
+    a single row. The remaining fields travel as JSON in the schema metadata
+    under "meta".
+    """
+    import pyarrow as pa
+
+    if isinstance(payload.get("results"), list):
+        rows = payload["results"]
+        meta = {key: value for key, value in payload.items() if key != "results"}
+    else:
+        rows, meta = [payload], {}
+
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    columns = {}
+    for name in names:
+        column = pa.array([row.get(name) for row in rows])
+        if float32:
+            column = column.cast(_float32_type(column.type))
+        columns[name] = column
+    table = pa.table(columns)
+    meta_json = orjson.dumps(meta, option=orjson.OPT_SERIALIZE_NUMPY)
+    return table.replace_schema_metadata({"meta": meta_json})
+
+
+def _float32_type(arrow_type):
+    import pyarrow as pa
+
+    if pa.types.is_float64(arrow_type):
+        return pa.float32()
+    if pa.types.is_list(arrow_type):
+        return pa.list_(_float32_type(arrow_type.value_type))
+    if pa.types.is_struct(arrow_type):
+        return pa.struct([field.with_type(_float32_type(field.type)) for field in arrow_type])
+    return arrow_type
+
+
+def render(payload: dict, media_type: str = JSON, float32: bool = False) -> Response:
+    """
+    Serializes a response payload as JSON (orjson), MessagePack or an Arrow
+    IPC stream. With float32, floats are sent in single precision: shorter
+    JSON numbers, 4-byte MessagePack / Arrow floats.
+    """
+    if media_type == ARROW:
+        import pyarrow as pa
+
+        table = _arrow_table(payload, float32)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue().to_pybytes(), media_type=ARROW)
+
+    if media_type == MSGPACK:
+        content = msgpack.packb(payload, default=_msgpack_default, use_single_float=float32)
+        return Response(content, media_type=MSGPACK)
+    if float32:
+        payload = to_float32(payload)
+    return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), media_type=JSON)
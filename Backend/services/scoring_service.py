@@ -0,0 +1,220 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from Backend.services.batch_service import build_column_matrix, score_matrix
+from Backend.services.execution_service import load_worker_services, worker_services
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.model_service import ORGAN_SYSTEMS
+
+MANIFEST_FILE = "manifest.json"
+
+
+def part_name(index: int) -> str:
+    return f"part-{index:05d}.parquet"
+
+
+def iter_input_chunks(path: str, chunk_rows: int):
+    """
+    The input file (CSV or Parquet, by extension) chunk_rows rows at a time,
+    as {column: [values]} with missing values as None.
+    """
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+        frames = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+    else:
+        frames = pd.read_csv(path, chunksize=chunk_rows)
+    for frame in frames:
+        frame = frame.astype(object).where(frame.notna(), None)
+        yield {name: frame[name].tolist() for name in frame.columns}
+
+
+# -----------------------------
+# Task (run inside the pool)
+# -----------------------------
+def score_chunk_task(run, columns: dict, first_row: int, explain: bool, id_column: str, out_path: str) -> tuple:
+    """
+    Builds the features of one chunk, scores it and writes its Parquet part.
+    The part is written under a temporary name and renamed when complete,
+    so an interrupted job never leaves a partial part behind.
+
+    Returns (rows, rows that failed validation).
+    """
+    hcc_service, toxicity_service = worker_services(run)
+    n_rows = len(next(iter(columns.values()), []))
+    X, valid_idx, errors = build_column_matrix(columns)
+
+    out = {"row": np.arange(first_row, first_row + n_rows)}
+    if id_column in columns:
+        out[id_column] = columns[id_column]
+    probability = np.full(n_rows, np.nan)
+    toxicity = np.full((n_rows, len(ORGAN_SYSTEMS)), np.nan)
+    shap_values = np.full((n_rows, FEATURE_SCHEMA.n_features), np.nan) if explain else None
+    if valid_idx:
+        scores = score_matrix(X, hcc_service, toxicity_service, explain=explain)
+        probability[valid_idx] = scores["probability"]
+        toxicity[valid_idx] = scores["toxicity_proba"]
+        if explain:
+            shap_values[valid_idx] = scores["shap_values"]
+
+    out["probability"] = probability
+    # Same rule as /predict; -1 for rows that could not be scored
+    out["prediction"] = np.where(np.isnan(probability), -1, probability > 0.5).astype(np.int8)
+    for j, organ in enumerate(ORGAN_SYSTEMS):
+        out[f"toxicity_{organ}"] = toxicity[:, j]
+    if explain:
+        for j, name in enumerate(FEATURE_SCHEMA.names):
+            out[f"shap_{name}"] = shap_values[:, j]
+    out["error"] = [errors.get(i) for i in range(n_rows)]
+
+    tmp_path = out_path + ".tmp"
+    pd.DataFrame(out).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, out_path)
+    return n_rows, len(errors)
+
+
+class _InlinePool:
+    # workers=0: chunks are scored in this process, one at a time
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        pass
+
+
+# -----------------------------
+# Job
+# -----------------------------
+class ScoringJob:
+    def __init__(self, input_path: str, out_dir: str, run, chunk_rows: int = 10000, workers: int = 4,
+                 explain: bool = False, id_column: str = "patient_id", start_method: str = "spawn"):
+        """
+        Scores a cohort file into out_dir/part-NNNNN.parquet, one part per
+        chunk of chunk_rows input rows, on a pool of workers processes that
+        each load the models once (workers=0 scores in this process).
+
+        At most two chunks per worker are read ahead, so memory does not
+        grow with the input. out_dir/manifest.json records the job settings
+        and the completed chunks; running the same job again skips them.
+        """
+        self.input_path = os.path.abspath(input_path)
+        self.out_dir = out_dir
+        self.run = run
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.workers = max(0, int(workers))
+        self.explain = explain
+        self.id_column = id_column
+        self.start_method = start_method
+        self.manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+
+    def _settings(self) -> dict:
+        stat = os.stat(self.input_path)
+        return {
+            "input": self.input_path,
+            "input_size": stat.st_size,
+            "input_mtime": stat.st_mtime,
+            "chunk_rows": self.chunk_rows,
+            "explain": self.explain,
+            "id_column": self.id_column,
+            "model_version": self.run.key,
+        }
+
+    def load_manifest(self) -> dict:
+        """
+        The manifest to continue from. ValueError if out_dir holds a job
+        with other settings (input, chunking or model).
+        """
+        settings = self._settings()
+        if not os.path.exists(self.manifest_path):
+            return {"settings": settings, "completed": {}}
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["settings"] != settings:
+            changed = [key for key in settings if manifest["settings"].get(key) != settings[key]]
+            raise ValueError(f"{self.out_dir} holds another scoring job (different {', '.join(changed)})")
+        # Only chunks whose part is on disk count as done
+        manifest["completed"] = {
+            index: done for index, done in manifest["completed"].items()
+            if os.path.exists(os.path.join(self.out_dir, part_name(int(index))))
+        }
+        return manifest
+
+    def _save_manifest(self, manifest: dict):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _new_pool(self):
+        if not self.workers:
+            worker_services(self.run)
+            return _InlinePool()
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=load_worker_services,
+            initargs=(self.run,),
+        )
+
+    def execute(self, progress=sys.stderr) -> dict:
+        """
+        Runs the job and returns {"rows", "errors", "chunks", "skipped"}.
+        Progress is written to progress (None for silence).
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+        manifest = self.load_manifest()
+        completed = manifest["completed"]
+        skipped = len(completed)
+        rows = sum(done["rows"] for done in completed.values())
+        errors = sum(done["errors"] for done in completed.values())
+        started = time.monotonic()
+        scored = 0
+
+        def report(index, result):
+            nonlocal rows, errors, scored
+            n_rows, n_errors = result
+            completed[str(index)] = {"rows": n_rows, "errors": n_errors}
+            self._save_manifest(manifest)
+            rows += n_rows
+            errors += n_errors
+            scored += n_rows
+            if progress is not None:
+                rate = scored / max(time.monotonic() - started, 1e-9)
+                print(f"chunk {index}: {rows} rows scored, {errors} invalid ({rate:,.0f} rows/s)",
+                      file=progress, flush=True)
+
+        pool = self._new_pool()
+        pending = {}
+        try:
+            first_row = 0
+            for index, columns in enumerate(iter_input_chunks(self.input_path, self.chunk_rows)):
+                n_rows = len(next(iter(columns.values()), []))
+                if str(index) not in completed:
+                    out_path = os.path.join(self.out_dir, part_name(index))
+                    future = pool.submit(score_chunk_task, self.run, columns, first_row,
+                                         self.explain, self.id_column, out_path)
+                    pending[future] = index
+                first_row += n_rows
+
+                # Bounded read-ahead
+                while len(pending) >= max(1, 2 * self.workers):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report(pending.pop(future), future.result())
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report(pending.pop(future), future.result())
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        return {"rows": rows, "errors": errors, "chunks": len(completed), "skipped": skipped}
@@ -0,0 +1,480 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+import numpy as np
+
+from Backend.schemas.db import DB_Data
+from Backend.schemas.Outcome import OutcomeCreate
+
+logger = logging.getLogger(__name__)
+
+# Column definitions follow the request schemas, so the tables stay in step with them
+_SQL_TYPES = {int: "INTEGER", float: "REAL", bool: "INTEGER", str: "TEXT"}
+
+
+def _columns(model) -> list:
+    return [(name, _SQL_TYPES.get(field.annotation, "TEXT")) for name, field in model.model_fields.items()]
+
+
+TABLES = {
+    "predictions": _columns(DB_Data),
+    "outcomes": _columns(OutcomeCreate),
+}
+
+
+def _upsert_sql(table: str) -> str:
+    names = [name for name, _ in TABLES[table]]
+    updates = ", ".join(f"{name} = excluded.{name}" for name in names if name != "patient_id")
+    return (
+        f"INSERT INTO {table} ({', '.join(names)}, updated) VALUES ({', '.join('?' * len(names))}, ?) "
+        f"ON CONFLICT(patient_id) DO UPDATE SET {updates}, updated = excluded.updated"
+    )
+
+
+class SQLitePool:
+    def __init__(self, path: str, size: int = 4, timeout: float = 10.0):
+        """
+        Fixed-size pool of SQLite connections, opened on first use.
+
+        ":memory:" is a database shared by the pool's connections (tests,
+        demos). Files use write-ahead logging with synchronous=FULL, so a
+        committed transaction survives a crash.
+        """
+        self.path = path
+        self.timeout = timeout
+        self._memory = path == ":memory:"
+        self._uri = f"file:hcc-{id(self)}?mode=memory&cache=shared" if self._memory else None
+        self._idle = queue.LifoQueue()
+        for _ in range(max(1, size)):
+            self._idle.put(None)
+        self._keepalive = None  # an in-memory database lives as long as one connection to it
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._memory:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False, timeout=self.timeout)
+        else:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+        if self._memory and self._keepalive is None:
+            self._keepalive = conn
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("No database connection available") from None
+        try:
+            if conn is None:
+                conn = self._connect()
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+
+
+class PredictionStore:
+    def __init__(self, path: str, pool_size: int = 4):
+        """
+        Saved predictions (DB_Data) and treatment outcomes (OutcomeCreate),
+        one row per patient_id in each table. Writes are idempotent upserts:
+        saving the same patient again replaces its row.
+        """
+        self.pool = SQLitePool(path, size=pool_size)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with conn:
+                for table, columns in TABLES.items():
+                    definitions = ", ".join(
+                        f"{name} {sql_type} PRIMARY KEY" if name == "patient_id" else f"{name} {sql_type} NOT NULL"
+                        for name, sql_type in columns
+                    )
+                    # INTEGER PRIMARY KEY: patient_id is the rowid, the table's own index
+                    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definitions}, updated REAL NOT NULL)")
+            self._schema_ready = True
+
+    @contextmanager
+    def connection(self):
+        with self.pool.connection() as conn:
+            self._ensure_schema(conn)
+            yield conn
+
+    def upsert(self, rows_by_table: dict, previous: bool = False):
+        """
+        Writes {table: [row dict, ...]} in one transaction. With previous,
+        returns {patient_id: (saved prediction, outcome)} for the patients
+        written, as storage held them before (None where a table had no
+        row), read in the same transaction.
+        """
+        now = time.time()
+        before = None
+        with self.connection() as conn, conn:
+            if previous:
+                # Take the write lock first, so no other commit lands between the reads and the writes
+                conn.execute("BEGIN IMMEDIATE")
+                ids = list({row["patient_id"] for rows in rows_by_table.values() for row in rows})
+                predictions = self._select_many(conn, "predictions", ids)
+                outcomes = self._select_many(conn, "outcomes", ids)
+                before = {
+                    patient_id: (predictions.get(patient_id),
+                                 outcomes[patient_id]["outcome"] if patient_id in outcomes else None)
+                    for patient_id in ids
+                }
+            for table, rows in rows_by_table.items():
+                if not rows:
+                    continue
+                names = [name for name, _ in TABLES[table]]
+                conn.executemany(_upsert_sql(table), [[row[name] for name in names] + [now] for row in rows])
+        return before
+
+    def get(self, table: str, patient_id: int):
+        with self.connection() as conn:
+            cursor = conn.execute(f"SELECT * FROM {table} WHERE patient_id = ?", (patient_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return {column[0]: value for column, value in zip(cursor.description, row) if column[0] != "updated"}
+
+    def get_many(self, table: str, patient_ids: list) -> dict:
+        """
+        {patient_id: row} for the ids with a row in table.
+        """
+        with self.connection() as conn:
+            return self._select_many(conn, table, list(patient_ids))
+
+    @staticmethod
+    def _select_many(conn: sqlite3.Connection, table: str, ids: list) -> dict:
+        found = {}
+        # Below SQLite's limit on bound parameters per statement
+        for start in range(0, len(ids), 900):
+            part = ids[start:start + 900]
+            cursor = conn.execute(
+                f"SELECT * FROM {table} WHERE patient_id IN ({', '.join('?' * len(part))})", part
+            )
+            names = [column[0] for column in cursor.description]
+            for row in cursor:
+                record = dict(zip(names, row))
+                record.pop("updated")
+                found[record["patient_id"]] = record
+        return found
+
+    def exists(self, patient_id: int) -> bool:
+        with self.connection() as conn:
+            return conn.execute("SELECT 1 FROM predictions WHERE patient_id = ?", (patient_id,)).fetchone() is not None
+
+    def patient_ids(self) -> np.ndarray:
+        """
+        Every patient_id with a saved prediction, read in rowid (sorted) order.
+        """
+        with self.connection() as conn:
+            cursor = conn.execute("SELECT patient_id FROM predictions ORDER BY patient_id")
+            return np.fromiter((row[0] for row in cursor), dtype=np.int64)
+
+    def outcomes_with_predictions(self):
+        """
+        (saved prediction row, outcome) for every outcome; the prediction is
+        None when the patient has none.
+        """
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT outcomes.outcome AS outcome, predictions.* FROM outcomes "
+                "LEFT JOIN predictions ON predictions.patient_id = outcomes.patient_id"
+            )
+            names = [column[0] for column in cursor.description]
+            for row in cursor:
+                record = dict(zip(names, row))
+                outcome = record.pop("outcome")
+                yield (record if record.pop("updated") is not None else None), outcome
+
+    def ping(self):
+        """
+        (connected, error message) for /health.
+        """
+        try:
+            with self.connection() as conn:
+                conn.execute("SELECT 1").fetchone()
+            return True, None
+        except sqlite3.Error as e:
+            return False, str(e)
+
+    def close(self):
+        self.pool.close()
+
+
+class WriteQueueFull(Exception):
+    """
+    Raised when the write-behind queue stays full for the whole put timeout;
+    callers should retry later.
+    """
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Errors worth retrying: another connection holds the database lock.
+    """
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class WriteBehindWriter:
+    def __init__(self, store: PredictionStore, max_batch: int = 500, max_delay_ms: float = 50.0,
+                 max_queue: int = 10000, put_timeout: float = None, dead_letter_path: str = None,
+                 on_commit: Callable[[dict, dict], None] = None):
+        """
+        Queues writes and commits them from a background thread, grouping up
+        to max_batch rows, or whatever arrived within max_delay_ms of the
+        first one, into a single transaction. Callers return without waiting
+        for the commit; rows still queued are visible through get/exists.
+
+        At most max_queue rows wait for a commit: put blocks while the queue
+        is full, and raises WriteQueueFull after put_timeout seconds. A
+        locked database is retried, with backoff, until the commit goes
+        through or close() runs out of time. Rows that fail for any other
+        reason are written one by one, so only the bad rows are dropped;
+        those, and the rows close() could not commit, are appended with
+        their error to the dead-letter file (JSON lines), or logged when
+        there is none.
+
+        on_commit(rows_by_table, previous) runs on the writer thread after
+        each transaction, before flush() returns for its rows; previous is
+        what PredictionStore.upsert(previous=True) returned for it.
+        """
+        self.store = store
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max_delay_ms / 1000.0
+        self.put_timeout = put_timeout
+        self.dead_letter_path = dead_letter_path or None
+        self.on_commit = on_commit
+
+        self._queue = queue.Queue()          # (sequence, table, row), or None to stop
+        self._slots = threading.BoundedSemaphore(max(1, int(max_queue)))  # one per row queued
+        self._pending = {}                   # (table, patient_id) -> (sequence, row) not committed yet
+        self._lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        self._sequence = 0                   # last sequence queued
+        self._done = 0                       # every sequence up to this one is committed
+        self._thread = None
+        self._closed = False
+        self._stopping = threading.Event()   # close() timed out: stop retrying
+
+        # Counters
+        self.rows_written = 0
+        self.transactions = 0
+        self.errors = 0
+        self.rows_dead_lettered = 0
+        self.last_error = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+            self._thread.start()
+
+    def put(self, table: str, row: dict):
+        """
+        Queues an upsert of row (a dict with every column of table).
+        """
+        # Backpressure: wait for a free slot outside the lock, which the writer thread needs
+        if not self._slots.acquire(timeout=self.put_timeout):
+            raise WriteQueueFull(f"{self._queue.qsize()} saves waiting for the database")
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError("Write-behind writer is closed")
+            self._ensure_started()
+            self._sequence += 1
+            self._pending[(table, row["patient_id"])] = (self._sequence, row)
+            self._queue.put((self._sequence, table, row))
+
+    def get(self, table: str, patient_id: int):
+        with self._lock:
+            pending = self._pending.get((table, patient_id))
+        if pending is not None:
+            return dict(pending[1])
+        return self.store.get(table, patient_id)
+
+    def exists(self, patient_id: int) -> bool:
+        return self.is_queued("predictions", patient_id) or self.store.exists(patient_id)
+
+    def is_queued(self, table: str, patient_id: int) -> bool:
+        """
+        Whether a row for patient_id is waiting for its commit.
+        """
+        with self._lock:
+            return (table, patient_id) in self._pending
+
+    # -----------------------------
+    # Writer thread
+    # -----------------------------
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _upsert(self, rows_by_table: dict):
+        """
+        One transaction, retried with backoff while the database is locked.
+        """
+        delay = 0.05
+        while True:
+            try:
+                previous = self.store.upsert(rows_by_table, previous=self.on_commit is not None)
+                break
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                    self.last_error = str(e)
+                if not _is_transient(e) or self._stopping.is_set():
+                    raise
+                logger.warning("Database locked, commit retried in %.2fs: %s", delay, e)
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 2.0)
+        if self.on_commit is not None:
+            try:
+                self.on_commit(rows_by_table, previous)
+            except Exception:
+                # Committed all the same: the callback only keeps in-memory views in step
+                logger.exception("Write-behind commit callback failed")
+
+    def _dead_letter(self, failed: list):
+        """
+        Appends the rows that could not be written to the dead-letter file.
+        """
+        now = time.time()
+        lines = [
+            json.dumps({"table": table, "row": row, "error": str(e), "time": now}, default=str)
+            for table, row, e in failed
+        ]
+        for table, row, e in failed:
+            logger.error("Save of %s row for patient_id %s failed: %s", table, row.get("patient_id"), e)
+        if self.dead_letter_path is None:
+            logger.error("No dead-letter file, rows not saved:\n%s", "\n".join(lines))
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.dead_letter_path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            logger.exception("Dead-letter file %s not writable, rows not saved:\n%s",
+                             self.dead_letter_path, "\n".join(lines))
+
+    def _write(self, batch: list):
+        rows_by_table = {}
+        for _, table, row in batch:
+            rows_by_table.setdefault(table, []).append(row)
+
+        written, transactions, failed = len(batch), 1, []
+        try:
+            self._upsert(rows_by_table)
+        except Exception as e:
+            written, transactions = 0, 0
+            if len(batch) == 1 or _is_transient(e):
+                # Shutting down with the database still locked, or a single bad row
+                failed = [(table, row, e) for _, table, row in batch]
+            else:
+                # A bad row: write the rows one by one, so only the rows that fail are dropped
+                for _, table, row in batch:
+                    try:
+                        self._upsert({table: [row]})
+                        written += 1
+                        transactions += 1
+                    except Exception as row_error:
+                        failed.append((table, row, row_error))
+        if failed:
+            self._dead_letter(failed)
+
+        with self._lock:
+            for sequence, table, row in batch:
+                key = (table, row["patient_id"])
+                if self._pending.get(key, (None,))[0] == sequence:
+                    del self._pending[key]
+            self._done = max(sequence for sequence, _, _ in batch)
+            self.rows_written += written
+            self.transactions += transactions
+            self.rows_dead_lettered += len(failed)
+            self._committed.notify_all()
+        for _ in batch:
+            self._slots.release()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._write(self._collect(first))
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Waits until every row queued so far is committed. Returns False on timeout.
+        """
+        with self._lock:
+            target = self._sequence
+            return self._committed.wait_for(lambda: self._done >= target, timeout=timeout)
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        Commits the queued rows and stops the writer thread (server shutdown).
+        Rows still not committed after timeout seconds, because the database
+        stays locked, are moved to the dead-letter file instead.
+        """
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+        if thread is None:
+            return True
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            self._stopping.set()
+            thread.join(timeout)
+        return not thread.is_alive()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "queued": self._sequence - self._done,
+                "rows_written": self.rows_written,
+                "transactions": self.transactions,
+                "errors": self.errors,
+                "rows_dead_lettered": self.rows_dead_lettered,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,75 @@
+import numpy as np
+
+from Backend.services.feature_schema import FEATURE_SCHEMA
+
+# Labels match the options offered in the Streamlit form
+REGIMENS = {
+    "Atezolizumab + Bevacizumab": "regimen_atezo_bev",
+    "Durvalumab + Tremelimumab": "regimen_durva_treme",
+    "Nivolumab + Ipilimumab": "regimen_nivo_ipi",
+    "Pembrolizumab + Ipilimumab": "regimen_pembro_ipi",
+}
+
+LOCAL_TREATMENTS = {
+    "None": "local_treatment_given_None",
+    "TACE": "local_treatment_given_TACE",
+    "Y90": "local_treatment_given_Y90",
+    "RFA": "local_treatment_given_RFA",
+}
+
+_REGIMEN_IDX = [FEATURE_SCHEMA.index[f] for f in REGIMENS.values()]
+_LOCAL_IDX = [FEATURE_SCHEMA.index[f] for f in LOCAL_TREATMENTS.values()]
+
+
+def build_sweep_matrix(base_features: np.ndarray):
+    """
+    Expands one patient's feature vector into every regimen x local treatment
+    combination. Only the one-hot treatment columns change between rows, so
+    NER and the other inputs are computed once by the caller.
+
+    Returns:
+        X: (n_regimens * n_local_treatments, n_features) matrix
+        combos: list of (regimen label, local treatment label), aligned with X
+    """
+    base_features = np.asarray(base_features, dtype=float).reshape(-1)
+    n_regimens, n_local = len(_REGIMEN_IDX), len(_LOCAL_IDX)
+
+    X = np.tile(base_features, (n_regimens * n_local, 1))
+    X[:, _REGIMEN_IDX] = 0.0
+    X[:, _LOCAL_IDX] = 0.0
+
+    rows = np.arange(n_regimens * n_local)
+    X[rows, np.repeat(_REGIMEN_IDX, n_local)] = 1.0
+    X[rows, np.tile(_LOCAL_IDX, n_regimens)] = 1.0
+
+    combos = [(regimen, local) for regimen in REGIMENS for local in LOCAL_TREATMENTS]
+    return X, combos
+
+
+def sweep_order(scores: dict) -> np.ndarray:
+    """
+    Row indices sorted by predicted response probability, best first.
+    """
+    return np.argsort(-scores["probability"], kind="stable")
+
+
+def rank_sweep(combos: list, scores: dict) -> list:
+    """
+    Returns one row per combination, sorted by predicted response probability.
+    """
+    table = []
+    for rank, i in enumerate(sweep_order(scores), start=1):
+        regimen, local = combos[i]
+        probability = float(scores["probability"][i])
+        row = {
+            "rank": rank,
+            "systemic_regimen": regimen,
+            "local_treatment": local,
+            "probability": probability,
+            "prediction": int(probability > 0.5),
+            "toxicity_proba": scores["toxicity_proba"][i].tolist(),
+        }
+        if scores["shap_values"] is not None:
+            row["shap_values"] = scores["shap_values"][i].tolist()
+        table.append(row)
+    return table
@@ -0,0 +1,182 @@
+import re
+from typing import Callable, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from Backend.schemas.db import DB_Data
+from Backend.schemas.Outcome import OutcomeCreate
+
+# Table -> schema a row of the uploaded file must satisfy
+UPLOAD_SCHEMAS = {
+    "predictions": DB_Data,
+    "outcomes": OutcomeCreate,
+}
+
+# Columns only allowed to hold 0 or 1
+BINARY_COLUMNS = {"outcomes": {"outcome"}}
+
+FORMATS = ("csv", "parquet")
+
+_INTEGER_RE = re.compile(r"[+-]?\d+")
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def iter_chunks(path: str, fmt: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    The uploaded file read chunk_rows rows at a time, so memory does not
+    grow with the file. CSV columns are read as text and typed during
+    validation.
+    """
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows, dtype=str, keep_default_na=False)
+    elif fmt == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet uploads need the pyarrow package") from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unknown upload format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+
+def _numeric(values: pd.Series) -> np.ndarray:
+    if values.dtype == object:
+        values = values.str.strip().replace("", None)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+
+
+def _integers(values: pd.Series) -> Tuple[np.ndarray, list]:
+    """
+    An int column as int64, and its (bad rows, message) checks. Integer
+    text and integer cells are converted exactly, never through float64,
+    so ids above 2**53 keep every digit; other numbers ("3.0") must be
+    whole and small enough to be exact as floats.
+    """
+    n = len(values)
+    if values.dtype.kind in "iu" and not values.hasnans:
+        # Already integers (Parquet): only uint64 can overflow
+        raw = values.to_numpy()
+        out_of_range = raw > _INT64_MAX if values.dtype.kind == "u" else np.zeros(n, dtype=bool)
+        return np.where(out_of_range, 0, raw).astype(np.int64), [(out_of_range, "integer out of range")]
+
+    numbers = _numeric(values)
+    ok = np.isfinite(numbers)
+    not_integer = ok & (numbers != np.round(numbers))
+    whole = ok & ~not_integer
+    # Below 2**53 float64 holds every integer: those cells are converted at once
+    small = whole & (np.abs(numbers) < 2 ** 53)
+    parsed = np.zeros(n, dtype=np.int64)
+    parsed[small] = numbers[small].astype(np.int64)
+
+    # Larger ones are re-read from the cell, exactly
+    out_of_range = np.zeros(n, dtype=bool)
+    for i in np.flatnonzero(whole & ~small):
+        value = values.iat[i]
+        if isinstance(value, str) and _INTEGER_RE.fullmatch(value.strip()):
+            exact = int(value.strip())
+        elif isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)):
+            exact = int(value)
+        elif abs(numbers[i]) <= 2 ** 53:
+            exact = int(numbers[i])
+        else:
+            out_of_range[i] = True
+            continue
+        if not _INT64_MIN <= exact <= _INT64_MAX:
+            out_of_range[i] = True
+            continue
+        parsed[i] = exact
+
+    checks = [
+        (~ok, "missing or not a number"),
+        (not_integer, "not an integer"),
+        (out_of_range, "integer out of range"),
+    ]
+    return parsed, checks
+
+
+def validate_chunk(table: str, frame: pd.DataFrame, first_row: int) -> Tuple[list, list, list]:
+    """
+    Checks a chunk column by column against the table's schema.
+
+    Returns the valid rows (dicts typed like the schema), their row numbers
+    and one rejection {"row", "patient_id", "errors"} per invalid row; row
+    numbers count data rows from 1 across the whole file. ValueError if a
+    column is missing.
+    """
+    model = UPLOAD_SCHEMAS[table]
+    missing = [name for name in model.model_fields if name not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    names = list(model.model_fields)
+    errors = [[] for _ in range(len(frame))]
+    columns = []
+    for name, field in model.model_fields.items():
+        if field.annotation is str:
+            checks = [(frame[name].isna().to_numpy(), "required")]
+            values = frame[name].astype(str).to_numpy()
+        elif field.annotation in (int, bool):
+            values, checks = _integers(frame[name])
+            if name in BINARY_COLUMNS.get(table, ()):
+                checks.append(((values != 0) & (values != 1), "must be 0 or 1"))
+        else:
+            values = _numeric(frame[name])
+            checks = [(~np.isfinite(values), "missing or not a number")]
+        for bad, message in checks:
+            for i in np.flatnonzero(bad):
+                errors[i].append(f"{name}: {message}")
+        columns.append((field.annotation, values))
+
+    valid = np.array([not e for e in errors], dtype=bool)
+    typed = [values[valid].tolist() for _, values in columns]
+    rows = [dict(zip(names, row)) for row in zip(*typed)]
+
+    patient_ids = frame["patient_id"]
+    rejections = [
+        {
+            "row": first_row + int(i),
+            "patient_id": None if pd.isna(patient_ids.iloc[i]) else str(patient_ids.iloc[i]),
+            "errors": errors[i],
+        }
+        for i in np.flatnonzero(~valid)
+    ]
+    return rows, (first_row + np.flatnonzero(valid)).tolist(), rejections
+
+
+def load_file(path: str, fmt: str, table: str, write: Callable[[str, list], None],
+              known_patients: Callable[[list], np.ndarray] = None,
+              chunk_rows: int = 5000, max_rejections: int = 1000) -> dict:
+    """
+    Validates the file chunk by chunk and passes the valid rows of each
+    chunk to write(table, rows), which commits them in one transaction.
+    known_patients (patient_ids -> bool array) rejects outcomes of patients
+    without a saved prediction.
+
+    Returns the upload report. Only the first max_rejections rejected rows
+    are listed, so the report stays small whatever the file holds.
+    """
+    if table not in UPLOAD_SCHEMAS:
+        raise KeyError(table)
+
+    report = {"table": table, "rows": 0, "inserted": 0, "rejected": 0, "chunks": 0, "rejections": []}
+    for chunk in iter_chunks(path, fmt, max(1, int(chunk_rows))):
+        rows, row_numbers, rejections = validate_chunk(table, chunk, report["rows"] + 1)
+        if rows and table == "outcomes" and known_patients is not None:
+            known = known_patients([row["patient_id"] for row in rows])
+            rejections += [
+                {"row": number, "patient_id": str(row["patient_id"]), "errors": ["patient_id: no saved prediction"]}
+                for row, number, found in zip(rows, row_numbers, known) if not found
+            ]
+            rows = [row for row, found in zip(rows, known) if found]
+            rejections.sort(key=lambda rejection: rejection["row"])
+        if rows:
+            write(table, rows)
+        report["rows"] += len(chunk)
+        report["inserted"] += len(rows)
+        report["rejected"] += len(rejections)
+        report["chunks"] += 1
+        report["rejections"].extend(rejections[:max_rejections - len(report["rejections"])])
+    report["rejections_truncated"] = report["rejected"] > len(report["rejections"])
+    return report
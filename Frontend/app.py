@@ -2,8 +2,20 @@ import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
 import requests
+import msgpack
 import matplotlib.pyplot as plt
 import numpy as np
+import time
+
+
+# Prediction responses are requested as MessagePack (smaller and faster to decode than JSON)
+MSGPACK_HEADERS = {"Accept": "application/msgpack"}
+
+
+def decode_response(r):
+    if r.headers.get("content-type", "").startswith("application/msgpack"):
+        return msgpack.unpackb(r.content)
+    return r.json()
 
 
 # =====================================================
@@ -14,6 +26,7 @@ for key, default in {
     "has_prediction": False,
     "explanation_text": None,
     "explanation_requested": False,
+    "sweep_result": None,
 }.items():
     if key not in st.session_state:
         st.session_state[key] = default
@@ -91,17 +104,19 @@ t_stage_dict = {'1': 1, '1a': 1, '1b': 1, '2': 2, '3': 3, '4': 4, 'x': 0}
 
 
 # =====================================================
-# Feature names (SHAP) — MUST MATCH MODEL ORDER
+# Feature schema (SHAP / "data" order) — served by the backend
 # =====================================================
-feature_names = [
-    'ast', 'alt', 'alp', 'albumin', 'total_bilirubin', 'afp',
-    'stage_at_diagnosis', 't_stage_at_diagnosis', 'age', 'gender',
-    'pmh_cirrhosis', 'pmh_fatty_liver', 'comorbid_diabetes', 'comorbid_htn', 'comorbid_cad',
-    'liver_tumor_flag', 'liver_disease_flag', 'portal_hypertension_flag', 'biliary_flag', 'symptoms_flag',
-    'regimen_atezo_bev', 'regimen_durva_treme', 'regimen_nivo_ipi', 'regimen_pembro_ipi',
-    'local_treatment_given_TACE', 'local_treatment_given_Y90', 'local_treatment_given_RFA', 'local_treatment_given_None',
-    'neoadjuvant_therapy', 'adjuvant_treatment_given'
-]
+if "feature_schema" not in st.session_state:
+    try:
+        r = requests.get("http://localhost:8000/api/v1/schema", timeout=5)
+        r.raise_for_status()
+        st.session_state.feature_schema = r.json()
+    except Exception as e:
+        st.error(f"🔴 Could not load the feature schema: {e}")
+        st.stop()
+
+feature_names = st.session_state.feature_schema["features"]
+ner_flag_names = st.session_state.feature_schema["ner_flags"]
 
 # =====================================================
 # Upload Patient Outcome (Standalone Section)
@@ -178,6 +193,40 @@ if st.button("Check Patient and Save Outcome"):
             except Exception as e:
                 st.error(f"Connection error: {e}")
 
+# Bulk upload (registry back-fills)
+st.markdown("""
+**Bulk upload:** a CSV or Parquet file of outcomes (columns `patient_id`, `outcome`) or of saved predictions (the columns of the predictions table).
+Rows are checked and saved in chunks; invalid rows, and outcomes of unknown patients, are listed below instead of being saved.
+""")
+bulk_table = st.selectbox("File contents", ["outcomes", "predictions"])
+bulk_file = st.file_uploader("CSV or Parquet file", type=["csv", "parquet"])
+
+if bulk_file is not None and st.button("Upload File"):
+    bulk_format = "parquet" if bulk_file.name.lower().endswith(".parquet") else "csv"
+    with st.spinner("Uploading..."):
+        try:
+            # The file is streamed as the request body, not read into memory first
+            r_bulk = requests.post(
+                f"http://localhost:8000/api/v1/upload/{bulk_table}",
+                params={"format": bulk_format},
+                data=bulk_file,
+                timeout=600
+            )
+            if r_bulk.status_code == 200:
+                report = r_bulk.json()
+                st.success(f"{report['inserted']} of {report['rows']} rows saved, {report['rejected']} rejected")
+                if report["rejections"]:
+                    st.dataframe(pd.DataFrame([
+                        {"row": r["row"], "patient_id": r["patient_id"], "errors": "; ".join(r["errors"])}
+                        for r in report["rejections"]
+                    ]))
+                    if report["rejections_truncated"]:
+                        st.caption(f"Showing the first {len(report['rejections'])} rejected rows")
+            else:
+                st.error(f"Upload failed: {r_bulk.text}")
+        except Exception as e:
+            st.error(f"Connection error: {e}")
+
 # =====================================================
 # Sidebar inputs
 # =====================================================
@@ -352,13 +401,20 @@ payload = {
 # =====================================================
 if run_prediction:
     with st.spinner("Running model inference..."):
-        r = requests.post("http://localhost:8000/api/v1/predict", json=payload)
+        # SHAP is computed in the background and fetched below
+        r = requests.post(
+            "http://localhost:8000/api/v1/predict",
+            params={"explain": "deferred", "include_data": "false"},
+            json=payload,
+            headers=MSGPACK_HEADERS
+        )
 
     if r.status_code == 200:
-        st.session_state.result = r.json()
+        st.session_state.result = decode_response(r)
         st.session_state.has_prediction = True
         st.session_state.explanation_text = None
         st.session_state.explanation_requested = False
+        st.session_state.sweep_result = None
         st.success("Prediction complete")
     else:
         st.error("Prediction failed")
@@ -393,6 +449,23 @@ if st.session_state.has_prediction:
     # ---------------------------
     # SHAP feature contributions
     # ---------------------------
+    if result.get("shap_values") is None and result.get("explanation_id"):
+        with st.spinner("Computing feature contributions..."):
+            explanation = {"status": "pending"}
+            for _ in range(120):
+                r_exp = requests.get(
+                    f"http://localhost:8000/api/v1/explanations/{result['explanation_id']}",
+                    timeout=10
+                )
+                explanation = r_exp.json() if r_exp.status_code == 200 else {"status": "failed"}
+                if explanation["status"] != "pending":
+                    break
+                time.sleep(0.5)
+
+        if explanation["status"] == "ready":
+            result["shap_values"] = explanation["shap_values"]
+            result["baseline"] = explanation["baseline"]
+
     try:
         shap_values = np.array(result["shap_values"])
         base_value = float(result["baseline"])
@@ -415,10 +488,7 @@ if st.session_state.has_prediction:
     st.markdown("---")
     st.subheader("Predicted Toxicity Probabilities ⚠️")
 
-    organ_systems = [
-        'skin', 'liver', 'gi', 'lung', 'endocrine',
-        'neurologic', 'oral', 'musculoskeletal', 'renal', 'other'
-    ]
+    organ_systems = st.session_state.feature_schema["organ_systems"]
 
     toxicity_probs = result.get("toxicity_proba", [0]*len(organ_systems))
 
@@ -444,6 +514,88 @@ if st.session_state.has_prediction:
         st.write("No organ systems show a meaningful predicted risk for adverse events in this patient.")
 
 
+# =====================================================
+# Regimen comparison (single what-if sweep call)
+# =====================================================
+if st.session_state.has_prediction:
+    st.markdown("---")
+    st.subheader("Compare Treatment Options 🔀")
+    st.markdown(
+        "Scores every systemic regimen and local treatment combination for this patient "
+        "in a single request, keeping all other inputs fixed."
+    )
+
+    if st.button("Compare regimens"):
+        with st.spinner("Scoring all regimen combinations..."):
+            r_sweep = requests.post(
+                "http://localhost:8000/api/v1/predict_sweep",
+                json=payload,
+                headers=MSGPACK_HEADERS,
+                timeout=60
+            )
+
+        if r_sweep.status_code == 200:
+            st.session_state.sweep_result = decode_response(r_sweep)["results"]
+        else:
+            st.error("Regimen comparison failed")
+
+    if st.session_state.sweep_result:
+        sweep_df = pd.DataFrame(st.session_state.sweep_result)
+
+        # Grid: regimens x local treatments
+        grid = sweep_df.pivot(
+            index="systemic_regimen",
+            columns="local_treatment",
+            values="probability"
+        )
+        st.dataframe(grid.style.format("{:.2%}").highlight_max(axis=None))
+
+        # Ranked table
+        ranked = sweep_df[["rank", "systemic_regimen", "local_treatment", "probability"]]
+        st.dataframe(
+            ranked.set_index("rank").style.format({"probability": "{:.2%}"})
+        )
+
+
+# =====================================================
+# Cohort feature importance (running SHAP aggregates)
+# =====================================================
+st.markdown("---")
+st.subheader("Cohort Feature Importance 📊")
+st.markdown("Mean absolute SHAP value of each feature over every patient explained by the current model.")
+
+cohort_group = st.selectbox(
+    "Regimen",
+    ["all", "Atezolizumab + Bevacizumab", "Durvalumab + Tremelimumab",
+     "Nivolumab + Ipilimumab", "Pembrolizumab + Ipilimumab"],
+    key="cohort_regimen"
+)
+if st.button("Show cohort importance"):
+    try:
+        r_global = requests.get(
+            "http://localhost:8000/api/v1/explanations/global",
+            params={"regimen": cohort_group},
+            timeout=5
+        )
+        if r_global.status_code == 200:
+            cohort = r_global.json()["groups"][cohort_group]
+            if cohort["n"]:
+                cohort_df = pd.DataFrame([
+                    {"Feature": f["feature"], "Mean |SHAP|": f["mean_abs_shap"], "Mean SHAP": f["mean_shap"],
+                     "Median SHAP": f["quantiles"]["p50"]}
+                    for f in cohort["features"]
+                ])
+                st.caption(f"{cohort['n']} explained predictions")
+                st.bar_chart(cohort_df.set_index("Feature")["Mean |SHAP|"])
+                st.dataframe(cohort_df.set_index("Feature"))
+            else:
+                st.info("No explained predictions for this regimen yet.")
+        else:
+            st.error("Could not load cohort importance")
+    except Exception as e:
+        st.error(f"Could not load cohort importance: {e}")
+
+
 # =====================================================
 # Explanation section (CLEAN + STABLE)
 # =====================================================
@@ -451,7 +603,9 @@ if st.session_state.has_prediction:
     st.markdown("---")
     st.subheader("Model Explanation")
 
-    if st.button("Provide explanation") and not st.session_state.explanation_requested:
+    if result.get("shap_values") is None:
+        st.info("Feature contributions are not available yet for this prediction.")
+    elif st.button("Provide explanation") and not st.session_state.explanation_requested:
         st.session_state.explanation_requested = True
 
         with st.spinner("Generating explanation..."):
@@ -476,14 +630,8 @@ if st.session_state.has_prediction:
 
 if st.session_state.has_prediction:
     result = st.session_state.result
-    data_array = result["data"][0]  # data is wrapped in a list from X.tolist()
-
-    # Extract NER flags from positions 10–14
-    liver_tumor_flag = int(data_array[10])
-    liver_disease_flag = int(data_array[11])
-    portal_hypertension_flag = int(data_array[12])
-    biliary_flag = int(data_array[13])
-    symptoms_flag = int(data_array[14])
+    # NER flags by name, as returned with the prediction
+    ner_flags = {name: int(result["ner_flags"][name]) for name in ner_flag_names}
 
     # Prepare DB payload
     db_payload = {
@@ -530,11 +678,7 @@ if st.session_state.has_prediction:
         "adjuvant_treatment_given": int(adjuvant == "Yes"),
 
         # NER flags
-        "liver_tumor_flag": int(liver_tumor_flag),
-        "liver_disease_flag": int(liver_disease_flag),
-        "portal_hypertension_flag": int(portal_hypertension_flag),
-        "biliary_flag": int(biliary_flag),
-        "symptoms_flag": int(symptoms_flag),
+        **ner_flags,
 
         # Model results
         "prediction": result["prediction"],
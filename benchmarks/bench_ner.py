@@ -0,0 +1,147 @@
+"""
+Accuracy versus latency of the NER backends: the Hugging Face pipeline
+(reference) against its ONNX Runtime exports, float32 and int8.
+
+    python -m benchmarks.bench_ner [--model NAME] [--onnx DIR] [--notes FILE] [--n-notes 200]
+                                   [--batch-sizes 1,8,32] [--out results.json]
+
+DIR is the output of python -m Backend.services.ner_export. FILE holds one
+note per line, or a JSON list of notes; without it synthetic notes are built
+from the flag keyword lists.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from Backend import config
+from Backend.services.NLP_service import FLAG_KEYWORDS, _SENTENCE_RE, _flags_from_symptoms, _symptoms_from_results
+from Backend.services.ner_backends import HFPipelineBackend, ONNXBackend
+from Backend.services.ner_export import FP32_FILE, INT8_FILE
+
+FILLERS = [
+    "Patient seen in clinic for follow-up.",
+    "Vital signs stable, no acute distress.",
+    "Labs reviewed with the patient and family.",
+    "Continue current medications and review in three months.",
+    "Imaging performed at the outside hospital was reviewed.",
+]
+
+
+def synthetic_notes(n: int, seed: int = 0) -> list:
+    """
+    Notes of filler sentences with a few keyword mentions, some negated.
+    """
+    rng = random.Random(seed)
+    phrases = [phrase for phrases in FLAG_KEYWORDS.values() for phrase in phrases]
+    notes = []
+    for _ in range(n):
+        sentences = rng.sample(FILLERS, 3)
+        for phrase in rng.sample(phrases, rng.randint(0, 4)):
+            template = rng.choice(["History of {}.", "Findings consistent with {}.", "No evidence of {}."])
+            sentences.insert(rng.randrange(len(sentences) + 1), template.format(phrase.lower()))
+        notes.append(" ".join(sentences))
+    return notes
+
+
+def load_notes(path: str) -> list:
+    with open(path) as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_backend(backend, notes: list, batch_size: int) -> tuple:
+    """
+    Runs every sentence of the notes through the backend in batches.
+    Returns the mentions per note and the seconds taken.
+    """
+    sentences = [[s for s in _SENTENCE_RE.split(note) if s.strip()] for note in notes]
+    texts = [s for note_sentences in sentences for s in note_sentences]
+
+    start = time.perf_counter()
+    results = []
+    for i in range(0, len(texts), batch_size):
+        results.extend(backend(texts[i:i + batch_size]))
+    seconds = time.perf_counter() - start
+
+    mentions, position = [], 0
+    for note_sentences in sentences:
+        note_results = results[position:position + len(note_sentences)]
+        position += len(note_sentences)
+        mentions.append({word.lower() for word in _symptoms_from_results(note_results)})
+    return mentions, seconds
+
+
+def agreement(reference: list, candidate: list) -> dict:
+    """
+    Mention precision / recall against the reference, and the share of
+    notes whose five flags are identical.
+    """
+    true_positives = sum(len(r & c) for r, c in zip(reference, candidate))
+    n_reference = sum(len(r) for r in reference)
+    n_candidate = sum(len(c) for c in candidate)
+    precision = true_positives / n_candidate if n_candidate else 1.0
+    recall = true_positives / n_reference if n_reference else 1.0
+    same_flags = sum(_flags_from_symptoms(r) == _flags_from_symptoms(c) for r, c in zip(reference, candidate))
+    return {
+        "mention_precision": precision,
+        "mention_recall": recall,
+        "mention_f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "flag_agreement": same_flags / len(reference) if reference else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=config.NER_MODEL_NAME)
+    parser.add_argument("--onnx", default=os.path.dirname(config.NER_ONNX_PATH), help="ner_export output directory")
+    parser.add_argument("--notes", default=None)
+    parser.add_argument("--n-notes", type=int, default=200)
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--out", default=None, help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    notes = load_notes(args.notes) if args.notes else synthetic_notes(args.n_notes)
+    backends = {"hf": HFPipelineBackend(args.model)}
+    for name, filename in (("onnx-fp32", FP32_FILE), ("onnx-int8", INT8_FILE)):
+        path = os.path.join(args.onnx, filename)
+        if os.path.exists(path):
+            backends[name] = ONNXBackend(path)
+
+    results = []
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        reference = None
+        for name, backend in backends.items():
+            run_backend(backend, notes[:batch_size], batch_size)  # warm-up
+            mentions, seconds = run_backend(backend, notes, batch_size)
+            if reference is None:
+                reference = mentions
+            result = {
+                "backend": name,
+                "batch_size": batch_size,
+                "ms_per_note": seconds * 1000 / len(notes),
+                "speedup": None,
+                **agreement(reference, mentions),
+            }
+            results.append(result)
+
+        baseline = next(r["ms_per_note"] for r in results if r["batch_size"] == batch_size and r["backend"] == "hf")
+        for result in results:
+            if result["batch_size"] == batch_size:
+                result["speedup"] = baseline / result["ms_per_note"]
+                print(
+                    f"batch={batch_size:>3}  {result['backend']:<10} {result['ms_per_note']:8.2f} ms/note  "
+                    f"speedup {result['speedup']:5.2f}x  mention F1 {result['mention_f1']:.3f}  "
+                    f"flag agreement {result['flag_agreement']:.3f}"
+                )
+
+    report = {"model": args.model, "onnx": args.onnx, "n_notes": len(notes), "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Micro-benchmarks of the prediction path at batch sizes from 1 to 10k, on
+synthetic models with the production shapes (benchmarks.fixtures).
+
+    python -m benchmarks.bench_suite [--sizes 1,10,100,1000,10000] [--only NAME,...] [--model-dir DIR]
+                                     [--out results.json] [--baseline baseline.json] [--tolerance 0.25]
+
+Each benchmark times the work for batch_size patients: per-patient calls
+(build_features, explain_prediction, generate_explanation, one /predict
+request each) are looped, batch calls get the whole batch. Results are
+written as JSON; with --baseline (an earlier --out file) every timing is
+compared with the baseline and the exit status is 1 if any is slower by
+more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_SIZES = "1,10,100,1000,10000"
+
+
+def timed(fn, repeat: int) -> float:
+    if repeat > 1:
+        fn()  # warm-up; large batches run long enough without one
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmarks(model_dir: str) -> dict:
+    """
+    name -> factory(n) returning the callable to time for a batch of n.
+    """
+    from fastapi.testclient import TestClient
+
+    from Backend.main import app
+    from Backend.schemas.patient import PatientData
+    from Backend.services.Feature_service import build_features, build_features_batch
+    from Backend.services.explanation_service import ExplanationService
+    from Backend.services.registry_service import ModelRegistry
+    from benchmarks.fixtures import synthetic_matrix, synthetic_patients
+
+    registry = ModelRegistry(model_dir)
+    registry.discover()
+    hcc_service, toxicity_service = registry.select().load()
+    explanation_service = ExplanationService()
+    client = TestClient(app)
+
+    def patients(n):
+        return [PatientData(**row) for row in synthetic_patients(n, notes=True)]
+
+    def explained(n):
+        X = synthetic_matrix(n)
+        return hcc_service.hcc_predict(X)[:, 1], hcc_service.explain_batch(X)[0]
+
+    def predict_route(n):
+        rows = synthetic_patients(n, notes=True)
+
+        def run():
+            for row in rows:
+                response = client.post("/api/v1/predict", json=row)
+                response.raise_for_status()
+        return run
+
+    def predict_batch_route(n):
+        body = {"patients": synthetic_patients(n, notes=True)}
+        return lambda: client.post("/api/v1/predict_batch", json=body).raise_for_status()
+
+    def build_one_by_one(n):
+        batch = patients(n)
+        return lambda: [build_features(patient) for patient in batch]
+
+    def batch_build(n):
+        batch = patients(n)
+        return lambda: build_features_batch(patients=batch)
+
+    def call_on_matrix(fn):
+        def factory(n):
+            X = synthetic_matrix(n)
+            return lambda: fn(X)
+        return factory
+
+    def explain_one_by_one(n):
+        X = synthetic_matrix(n)
+        return lambda: [hcc_service.explain_prediction(row) for row in X]
+
+    def explanation_texts(n):
+        probability, shap_values = explained(n)
+        return lambda: [
+            explanation_service.generate_explanation(p, values) for p, values in zip(probability, shap_values)
+        ]
+
+    return {
+        "build_features": build_one_by_one,
+        "build_features_batch": batch_build,
+        "hcc_predict": call_on_matrix(hcc_service.hcc_predict),
+        "explain_prediction": explain_one_by_one,
+        "explain_batch": call_on_matrix(hcc_service.explain_batch),
+        "predict_toxicity": call_on_matrix(toxicity_service.predict_toxicity),
+        "predict_toxicity_batch": call_on_matrix(toxicity_service.predict_toxicity_batch),
+        "generate_explanation": explanation_texts,
+        "predict_route": predict_route,
+        "predict_batch_route": predict_batch_route,
+    }
+
+
+def run_suite(model_dir: str, sizes: list, names: list = None, verbose: bool = True) -> list:
+    suite = benchmarks(model_dir)
+    unknown = [name for name in names or [] if name not in suite]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)} (available: {', '.join(suite)})")
+
+    results = []
+    for name in names or list(suite):
+        for n in sizes:
+            repeat = max(1, min(20, 1000 // n))
+            seconds = timed(suite[name](n), repeat)
+            result = {
+                "benchmark": name,
+                "batch_size": n,
+                "repeat": repeat,
+                "seconds": seconds,
+                "ms_per_row": seconds * 1000 / n,
+                "rows_per_second": n / seconds if seconds > 0 else None,
+            }
+            results.append(result)
+            if verbose:
+                print(f"{name:<24} n={n:>6}  {seconds * 1000:12.3f} ms  {result['ms_per_row']:10.4f} ms/row",
+                      flush=True)
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float = 0.25) -> list:
+    """
+    Timings present in both runs, with their ratio to the baseline. A
+    ratio above 1 + tolerance is a regression.
+    """
+    reference = {(r["benchmark"], r["batch_size"]): r["seconds"] for r in baseline}
+    comparison = []
+    for r in results:
+        base = reference.get((r["benchmark"], r["batch_size"]))
+        if not base:
+            continue
+        ratio = r["seconds"] / base
+        comparison.append({
+            "benchmark": r["benchmark"],
+            "batch_size": r["batch_size"],
+            "seconds": r["seconds"],
+            "baseline_seconds": base,
+            "ratio": ratio,
+            "regression": ratio > 1 + tolerance,
+        })
+    return comparison
+
+
+def environment() -> dict:
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "commit": commit or None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--only", default=None, help="comma-separated benchmark names")
+    parser.add_argument("--model-dir", default=None, help="serve these models instead of fresh synthetic ones")
+    parser.add_argument("--out", default=None, help="write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="results JSON of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--executor", default="inline", help="HCC_INFERENCE_EXECUTOR for the route benchmarks")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    # Backend.config reads these on import: the routes serve the benchmarked
+    # models, do not cache results between repeats and save nothing to disk
+    model_dir = args.model_dir or tempfile.mkdtemp(prefix="hcc-bench-models-")
+    os.environ["HCC_MODEL_DIR"] = model_dir
+    os.environ["HCC_RESULT_CACHE_SIZE"] = "0"
+    os.environ["HCC_INFERENCE_EXECUTOR"] = args.executor
+    os.environ["HCC_DB_PATH"] = ":memory:"
+
+    try:
+        if args.model_dir is None:
+            from benchmarks.fixtures import make_model_artifacts
+            make_model_artifacts(model_dir)
+
+        sizes = [int(size) for size in args.sizes.split(",")]
+        names = args.only.split(",") if args.only else None
+        report = {
+            "environment": environment(),
+            "models": "synthetic" if args.model_dir is None else args.model_dir,
+            "results": run_suite(model_dir, sizes, names),
+        }
+    finally:
+        if args.model_dir is None:
+            shutil.rmtree(model_dir, ignore_errors=True)
+
+    status = 0
+    if baseline is not None:
+        report["comparison"] = compare(report["results"], baseline, args.tolerance)
+        report["tolerance"] = args.tolerance
+        for c in report["comparison"]:
+            flag = "  REGRESSION" if c["regression"] else ""
+            print(f"{c['benchmark']:<24} n={c['batch_size']:>6}  {c['ratio']:6.2f}x baseline{flag}")
+        status = 1 if any(c["regression"] for c in report["comparison"]) else 0
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Native TreeSHAP vs shap.TreeExplainer on the served RandomForest.
+
+    python -m benchmarks.bench_treeshap [--model PATH] [--sizes 1,10,100,1000,10000] [--out results.json]
+"""
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import shap
+
+from Backend import config
+from Backend.services.forest_service import CompiledForest
+
+
+def random_rows(forest: CompiledForest, n: int, seed: int = 0) -> np.ndarray:
+    """
+    Rows drawn uniformly between each feature's smallest and largest split
+    threshold, so every branch of the forest is exercised.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n, forest.n_features))
+    for f in range(forest.n_features):
+        thresholds = forest.threshold[forest.feature == f]
+        if thresholds.size:
+            low, high = thresholds.min(), thresholds.max()
+            margin = max(high - low, 1.0) * 0.1
+            X[:, f] = rng.uniform(low - margin, high + margin, n)
+    return X
+
+
+def timed(fn, repeat: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(config.MODEL_DIR, "random_forest_demo.pkl"))
+    parser.add_argument("--sizes", default="1,10,100,1000,10000")
+    parser.add_argument("--out", default=None, help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    feature_names = getattr(model, "feature_names_in_", None)
+
+    start = time.perf_counter()
+    forest = CompiledForest.from_sklearn(model).compile_shap()
+    compile_seconds = time.perf_counter() - start
+    explainer = shap.TreeExplainer(model)
+
+    results = []
+    for n in [int(size) for size in args.sizes.split(",")]:
+        X = random_rows(forest, n)
+        X_df = pd.DataFrame(X, columns=feature_names) if feature_names is not None else X
+        repeat = max(1, min(20, 1000 // n))
+
+        native = forest.shap_values(X)
+        reference = np.asarray(explainer.shap_values(X_df))
+        native_seconds = timed(lambda: forest.shap_values(X), repeat)
+        shap_seconds = timed(lambda: explainer.shap_values(X_df), repeat)
+
+        result = {
+            "batch_size": n,
+            "native_ms": native_seconds * 1000,
+            "shap_ms": shap_seconds * 1000,
+            "native_ms_per_row": native_seconds * 1000 / n,
+            "shap_ms_per_row": shap_seconds * 1000 / n,
+            "speedup": shap_seconds / native_seconds,
+            "max_abs_diff": float(np.abs(native - reference).max()),
+        }
+        results.append(result)
+        print(
+            f"n={n:>6}  native {result['native_ms']:10.2f} ms  shap {result['shap_ms']:10.2f} ms  "
+            f"speedup {result['speedup']:5.2f}x  max|diff| {result['max_abs_diff']:.2e}"
+        )
+
+    report = {
+        "model": args.model,
+        "n_trees": forest.n_trees,
+        "n_nodes": int(forest.feature.shape[0]),
+        "compile_seconds": compile_seconds,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Synthetic model artifacts and patients with the production shapes: a
+RandomForest over the 30 schema features and a multi-output logistic
+toxicity model (10 organ systems) with its scaler, saved under the file
+names the model registry expects.
+
+    python -m benchmarks.fixtures --out DIR
+
+Used by the benchmark suite and by the tests (tests/conftest.py), so neither
+needs the trained pickles, which are not in the repository.
+"""
+import argparse
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import StandardScaler
+
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.model_service import ORGAN_SYSTEMS
+from Backend.services.registry_service import HCC_MODEL_FILE, TOXICITY_MODEL_FILE, TOXICITY_SCALER_FILE
+from Backend.services.sweep_service import LOCAL_TREATMENTS, REGIMENS
+from benchmarks.bench_ner import synthetic_notes
+
+BINARY_FIELDS = [
+    "gender", "pmh_cirrhosis", "pmh_fatty_liver", "comorbid_diabetes", "comorbid_htn", "comorbid_cad",
+    "neoadjuvant_therapy", "adjuvant_treatment_given",
+]
+
+
+def synthetic_columns(n: int, seed: int = 0, notes: bool = False) -> dict:
+    """
+    n patients as PatientData columns ({field: [values]}), with plausible
+    lab ranges and one regimen / local treatment per patient.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {
+        "ast": np.round(rng.lognormal(np.log(40), 0.5, n), 1),
+        "alt": np.round(rng.lognormal(np.log(35), 0.5, n), 1),
+        "alp": np.round(rng.lognormal(np.log(110), 0.4, n), 1),
+        "albumin": np.round(np.clip(rng.normal(3.7, 0.5, n), 1.5, 5.5), 1),
+        "total_bilirubin": np.round(rng.lognormal(0.0, 0.6, n), 2),
+        "afp": np.round(rng.lognormal(np.log(20), 1.5, n), 1),
+        "stage_at_diagnosis": rng.integers(1, 8, n),
+        "t_stage_at_diagnosis": rng.integers(0, 5, n),
+        "age": rng.integers(30, 86, n),
+    }
+    for name in BINARY_FIELDS:
+        columns[name] = rng.integers(0, 2, n)
+    for group in (list(REGIMENS.values()), list(LOCAL_TREATMENTS.values())):
+        chosen = rng.integers(0, len(group), n)
+        for j, name in enumerate(group):
+            columns[name] = (chosen == j).astype(int)
+
+    columns = {name: values.tolist() for name, values in columns.items()}
+    if notes:
+        columns["clinical_notes"] = synthetic_notes(n, seed=seed)
+    return columns
+
+
+def synthetic_patients(n: int, seed: int = 0, notes: bool = False) -> list:
+    """
+    The same patients as synthetic_columns, one dict per patient.
+    """
+    columns = synthetic_columns(n, seed=seed, notes=notes)
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def synthetic_matrix(n: int, seed: int = 0) -> np.ndarray:
+    """
+    (n, 30) feature matrix in schema order, NER flags drawn at random.
+    """
+    ner_flags = np.random.default_rng(seed + 1).integers(0, 2, (n, len(FEATURE_SCHEMA.ner_flags)))
+    return FEATURE_SCHEMA.build_columns(synthetic_columns(n, seed=seed), ner_flags)
+
+
+def make_model_artifacts(out_dir: str, n_train: int = 2000, n_trees: int = 100, max_depth: int = 10,
+                         seed: int = 0) -> str:
+    """
+    Trains the synthetic models and writes them to out_dir, where the model
+    registry serves them as the "default" run. Returns out_dir.
+    """
+    rng = np.random.default_rng(seed)
+    X = synthetic_matrix(n_train, seed=seed)
+    standardized = (X - X.mean(axis=0)) / (X.std(axis=0) + 1e-9)
+
+    # Response: a noisy linear score of the features
+    weights = rng.normal(0, 1, X.shape[1])
+    y = (standardized @ weights + rng.normal(0, 2, n_train) > 0).astype(int)
+    hcc_model = RandomForestClassifier(n_estimators=n_trees, max_depth=max_depth, random_state=seed, n_jobs=1)
+    hcc_model.fit(pd.DataFrame(X, columns=FEATURE_SCHEMA.names), y)
+
+    # Toxicity: one noisy linear score per organ system
+    organ_weights = rng.normal(0, 1, (X.shape[1], len(ORGAN_SYSTEMS)))
+    Y = (standardized @ organ_weights + rng.normal(0, 2, (n_train, len(ORGAN_SYSTEMS))) > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    toxicity_model = MultiOutputClassifier(LogisticRegression(max_iter=1000)).fit(scaler.transform(X), Y)
+
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(hcc_model, os.path.join(out_dir, HCC_MODEL_FILE))
+    joblib.dump(toxicity_model, os.path.join(out_dir, TOXICITY_MODEL_FILE))
+    joblib.dump(scaler, os.path.join(out_dir, TOXICITY_SCALER_FILE))
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="model directory to write (HCC_MODEL_DIR)")
+    parser.add_argument("--n-train", type=int, default=2000)
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    make_model_artifacts(args.out, n_train=args.n_train, n_trees=args.trees, max_depth=args.max_depth, seed=args.seed)
+    print(f"Wrote synthetic model artifacts to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
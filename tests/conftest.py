@@ -0,0 +1,40 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import shutil
+import tempfile
+
+import pytest
+
+# Backend.config reads the environment on import, so it is set before any
+# test module imports the app: the tests serve synthetic models with the
+# production shapes instead of the trained pickles (not in the repository),
+# and save predictions to a throwaway in-memory database
+_MODEL_DIR = tempfile.mkdtemp(prefix="hcc-test-models-")
+os.environ["HCC_MODEL_DIR"] = _MODEL_DIR
+os.environ["HCC_DB_PATH"] = ":memory:"
+
+from benchmarks.fixtures import make_model_artifacts
+
+make_model_artifacts(_MODEL_DIR)
+
+
+@pytest.fixture
+def patient_payload():
+    """
+    A valid /predict request body (PatientData fields, no clinical notes).
+    """
+    return {
+        "ast": 35.0, "alt": 40.0, "alp": 90.0, "albumin": 4.2, "total_bilirubin": 1.0, "afp": 15.0,
+        "stage_at_diagnosis": 2, "t_stage_at_diagnosis": 3, "age": 58, "gender": 1,
+        "pmh_cirrhosis": 1, "pmh_fatty_liver": 0, "comorbid_diabetes": 0, "comorbid_htn": 1,
+        "comorbid_cad": 0, "regimen_atezo_bev": 1, "regimen_durva_treme": 0, "regimen_nivo_ipi": 0,
+        "regimen_pembro_ipi": 0, "local_treatment_given_TACE": 1, "local_treatment_given_Y90": 0,
+        "local_treatment_given_RFA": 0, "local_treatment_given_None": 0,
+        "neoadjuvant_therapy": 0, "adjuvant_treatment_given": 0
+    }
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_MODEL_DIR, ignore_errors=True)
@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import joblib
+
+from Backend import config
+from Backend.schemas.patient import PatientData
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.model_service import ORGAN_SYSTEMS
+from Backend.services.registry_service import HCC_MODEL_FILE, TOXICITY_MODEL_FILE
+from benchmarks.bench_suite import compare, run_suite
+from benchmarks.fixtures import synthetic_matrix, synthetic_patients
+
+
+def test_synthetic_artifacts_have_production_shapes():
+    hcc_model = joblib.load(os.path.join(config.MODEL_DIR, HCC_MODEL_FILE))
+    toxicity_model = joblib.load(os.path.join(config.MODEL_DIR, TOXICITY_MODEL_FILE))
+    assert list(hcc_model.feature_names_in_) == FEATURE_SCHEMA.names
+    assert len(toxicity_model.estimators_) == len(ORGAN_SYSTEMS)
+
+    X = synthetic_matrix(50)
+    assert X.shape == (50, 30)
+    assert hcc_model.predict_proba(X).shape == (50, 2)
+    for row in synthetic_patients(5, notes=True):
+        PatientData(**row)
+
+
+def test_suite_runs_and_compares():
+    results = run_suite(config.MODEL_DIR, [1, 3], ["hcc_predict", "predict_toxicity_batch", "predict_batch_route"],
+                        verbose=False)
+    assert [(r["benchmark"], r["batch_size"]) for r in results] == [
+        ("hcc_predict", 1), ("hcc_predict", 3),
+        ("predict_toxicity_batch", 1), ("predict_toxicity_batch", 3),
+        ("predict_batch_route", 1), ("predict_batch_route", 3),
+    ]
+    assert all(r["seconds"] > 0 for r in results)
+
+    baseline = [dict(r, seconds=r["seconds"] * 2) for r in results[:2]]
+    baseline.append(dict(results[2], seconds=results[2]["seconds"] / 2))
+    comparison = compare(results, baseline, tolerance=0.25)
+    assert [c["regression"] for c in comparison] == [False, False, True]
+    assert comparison[0]["ratio"] == 0.5
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+import Backend.routes.predict as predict_routes
+from Backend.main import app
+from Backend.services.cache_service import ResultCache
+
+client = TestClient(app)
+
+
+def make_entry(probability):
+    return {"probability": probability, "toxicity_proba": np.zeros(10), "shap_values": None, "baseline": None}
+
+
+def test_cache_key_depends_on_features_and_version():
+    row = np.arange(30, dtype=float)
+    assert ResultCache.make_key(row, "v1") == ResultCache.make_key(row.copy(), "v1")
+    assert ResultCache.make_key(row, "v1") != ResultCache.make_key(row, "v2")
+    assert ResultCache.make_key(row, "v1") != ResultCache.make_key(row + 1e-9, "v1")
+
+
+def test_cache_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2, ttl_seconds=60)
+    cache.put(b"a", make_entry(0.1))
+    cache.put(b"b", make_entry(0.2))
+    assert cache.get(b"a")["probability"] == 0.1  # "a" is now most recently used
+
+    cache.put(b"c", make_entry(0.3))
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") is not None
+    assert cache.get(b"c") is not None
+
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_cache_ttl_and_shap_requirement():
+    cache = ResultCache(max_entries=10, ttl_seconds=0.05)
+    cache.put(b"a", make_entry(0.1))
+    assert cache.get(b"a", need_shap=True) is None
+    assert cache.get(b"a") is not None
+
+    time.sleep(0.1)
+    assert cache.get(b"a") is None
+
+
+def test_predict_uses_cache_and_reload_invalidates(monkeypatch, patient_payload):
+    monkeypatch.setattr("Backend.services.Feature_service.generate_ner_flags", lambda notes: [0, 1, 0, 1, 0])
+    patient = {**patient_payload, "ast": 51.0}
+    cache = predict_routes.result_cache
+
+    first = client.post("/api/v1/predict", json=patient).json()
+    hits = cache.hits
+    second = client.post("/api/v1/predict", json=patient).json()
+    assert cache.hits == hits + 1
+    assert second["probability"] == first["probability"]
+    assert second["shap_values"] == first["shap_values"]
+
+    # Re-activating the run (e.g. after its artifacts were replaced) drops cached results
+    predict_routes.inference_executor.activate(predict_routes.model_registry.active, force=True)
+    assert cache.stats()["size"] == 0
+    third = client.post("/api/v1/predict", json=patient).json()
+    assert cache.hits == hits + 1
+    assert third["probability"] == first["probability"]
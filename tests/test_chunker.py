@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import re
+import types
+from concurrent.futures import Future
+
+import pytest
+import Backend.services.NLP_service as nlp
+from Backend.services.ner_cache import NERCache
+
+
+class WhitespaceTokenizer:
+    """
+    Fast-tokenizer stand-in: one token per whitespace-separated word.
+    """
+    is_fast = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        self.calls += 1
+        spans = [m.span() for m in re.finditer(r"\S+", text)]
+        return {"input_ids": list(range(len(spans))), "offset_mapping": spans}
+
+    def decode(self, ids):
+        raise AssertionError("chunks should be sliced from the text, not decoded")
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    tokenizer = WhitespaceTokenizer()
+    monkeypatch.setattr(nlp, "_load_transformer", lambda: (tokenizer, None))
+    return tokenizer
+
+
+def test_windows_are_overlapping_slices_of_the_text(tokenizer):
+    words = [f"w{i}" for i in range(10)]
+    text = "  ".join(words)
+
+    chunks = nlp.split_chunks(text, chunk_size=4, overlap=1)
+    assert isinstance(chunks, types.GeneratorType)
+    chunks = list(chunks)
+
+    assert [chunk.split() for chunk in chunks] == [words[0:4], words[3:7], words[6:10]]
+    assert all(chunk in text for chunk in chunks)   # original spacing kept
+    assert tokenizer.calls == 1
+
+
+def test_short_text_is_one_window(tokenizer):
+    assert list(nlp.iter_chunk_spans("Liver mass", chunk_size=4, overlap=1)) == [(0, 10)]
+    assert list(nlp.iter_chunk_spans("", chunk_size=4, overlap=1)) == []
+
+
+def test_long_sentences_are_streamed_to_the_model(tokenizer, monkeypatch):
+    batches = []
+    produced = []
+
+    def submit_ner(texts):
+        # Batches are sent while later chunks have not been produced yet
+        batches.append((list(texts), len(produced)))
+        future = Future()
+        future.set_result([[{"entity_group": "Disease", "word": "Ascites"}] for _ in texts])
+        return future
+
+    original_split = nlp.split_chunks
+
+    def split_chunks(text, chunk_size=512, overlap=50):
+        for chunk in original_split(text, chunk_size=4, overlap=1):
+            produced.append(chunk)
+            yield chunk
+
+    monkeypatch.setattr(nlp, "_submit_ner", submit_ner)
+    monkeypatch.setattr(nlp, "split_chunks", split_chunks)
+    monkeypatch.setattr(nlp, "ner_cache", NERCache("stub"))
+    monkeypatch.setattr(nlp, "MAX_UNIT_CHARS", 20)
+    monkeypatch.setattr(nlp.config, "NER_BATCH_WAIT_MS", 0)
+
+    note = "Short one. " + " ".join(f"word{i}" for i in range(40))
+    assert nlp.extract_symptoms_from_clinical_notes(note) == ["Ascites"]
+
+    assert [len(texts) for texts, _ in batches] == [8, 6]
+    assert batches[0][1] < len(produced)
+    assert batches[0][0][0] == "Short one."
@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+import Backend.routes.predict as predict_routes
+from Backend.main import app
+from Backend.services.execution_service import ExecutorSaturated, InferenceExecutor
+
+client = TestClient(app)
+
+
+def make_executor(max_workers=1, max_queue=1):
+    executor = InferenceExecutor(
+        mode="thread", max_workers=max_workers, max_queue=max_queue, retry_after=7
+    )
+    executor.activate(predict_routes.model_registry.active)
+    return executor
+
+
+def test_executor_rejects_when_queue_full():
+    executor = make_executor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    wait = lambda run: release.wait()
+
+    try:
+        running = executor.submit(wait)
+        queued = executor.submit(wait)
+
+        with pytest.raises(ExecutorSaturated) as exc_info:
+            executor.submit(wait)
+        assert exc_info.value.retry_after == 7
+        assert executor.stats()["in_flight"] == 2
+
+        release.set()
+        running.result(timeout=5)
+        queued.result(timeout=5)
+
+        # Capacity comes back once the work finishes
+        assert executor.submit(lambda run: 42).result(timeout=5) == 42
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_predict_returns_503_when_saturated(monkeypatch, patient_payload):
+    executor = make_executor(max_workers=1, max_queue=0)
+    release = threading.Event()
+    monkeypatch.setattr(predict_routes, "inference_executor", executor)
+
+    try:
+        executor.submit(lambda run: release.wait())
+
+        response = client.post("/api/v1/predict_sweep", json=patient_payload)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+
+        # Cheap endpoints are unaffected by the saturated pool
+        assert client.get("/api/v1/health").status_code == 200
+    finally:
+        release.set()
+        executor.shutdown()
@@ -173,4 +173,95 @@ def test_build_features_array(sample_patient):
         assert f in [0, 1]
 
 
-        
\ No newline at end of file
+        
+
+# -------------------------------
+# Test: feature schema
+# -------------------------------
+from Backend.services.Feature_service import build_features_batch
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.batch_service import build_column_matrix
+
+
+def test_schema_matches_patient_and_ner_order():
+    assert FEATURE_SCHEMA.n_features == 30
+    assert FEATURE_SCHEMA.names[15:20] == FEATURE_SCHEMA.ner_flags
+    assert set(FEATURE_SCHEMA.patient_fields) == set(PatientData.model_fields) - {"clinical_notes"}
+
+
+def test_build_features_batch_matches_single_rows(sample_patient, monkeypatch):
+    monkeypatch.setattr(
+        "Backend.services.Feature_service.generate_ner_flags_batch", lambda notes: [[1, 0, 1, 0, 1]] * len(notes)
+    )
+    other = sample_patient.model_copy(update={"ast": 51.5, "age": 71, "regimen_nivo_ipi": 1})
+    expected = np.vstack([build_features(sample_patient), build_features(other)])
+
+    out = np.full((2, 30), np.nan)
+    X = build_features_batch(patients=[sample_patient, other], out=out)
+    assert X is out
+    np.testing.assert_array_equal(X, expected)
+
+    columns = {name: [getattr(sample_patient, name), getattr(other, name)] for name in FEATURE_SCHEMA.patient_fields}
+    assert FEATURE_SCHEMA.check_columns(columns)
+    np.testing.assert_array_equal(build_features_batch(columns=columns), expected)
+
+
+def test_column_matrix_falls_back_to_row_errors(sample_patient):
+    columns = {name: [getattr(sample_patient, name)] * 3 for name in FEATURE_SCHEMA.patient_fields}
+    columns["age"] = [58, 61.5, 70]  # not an int
+    columns["afp"] = [15.0, 20.0, "high"]
+
+    assert not FEATURE_SCHEMA.check_columns(columns)
+    X, valid_idx, errors = build_column_matrix(columns)
+    assert valid_idx == [0]
+    assert set(errors) == {1, 2}
+    assert X.shape == (1, 30)
+
+
+def test_check_model_rejects_other_feature_order():
+    from sklearn.linear_model import LogisticRegression
+    import pandas as pd
+
+    names = FEATURE_SCHEMA.names[::-1]
+    X = pd.DataFrame(np.random.default_rng(0).normal(size=(20, 30)), columns=names)
+    model = LogisticRegression().fit(X, [0, 1] * 10)
+    with pytest.raises(ValueError, match="different feature order"):
+        FEATURE_SCHEMA.check_model(model)
+
+    model = LogisticRegression().fit(X[FEATURE_SCHEMA.names], [0, 1] * 10)
+    FEATURE_SCHEMA.check_model(model)
+    assert not hasattr(model, "feature_names_in_")
+
+
+def test_schema_endpoint():
+    response = client.get("/api/v1/schema")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["features"] == FEATURE_SCHEMA.names
+    assert [body["features"][i] for i in body["ner_index"]] == body["ner_flags"]
+    assert len(body["organ_systems"]) == 10
+
+
+def test_missing_column_values_are_row_errors(sample_patient):
+    columns = {name: [getattr(sample_patient, name)] * 2 for name in FEATURE_SCHEMA.patient_fields}
+    columns["ast"] = [35.0, None]
+
+    assert not FEATURE_SCHEMA.check_columns(columns)
+    X, valid_idx, errors = build_column_matrix(columns)
+    assert valid_idx == [0]
+    assert list(errors) == [1]
+
+
+def test_columns_validate_like_patient_rows(sample_patient):
+    columns = {name: [getattr(sample_patient, name)] * 4 for name in FEATURE_SCHEMA.patient_fields}
+    columns["age"] = [58, "1e2", 1e30, "61"]
+    columns["clinical_notes"] = ["ascites", None, "ascites", 123]
+
+    assert not FEATURE_SCHEMA.check_columns(columns)
+    X, valid_idx, errors = build_column_matrix(columns)
+    assert valid_idx == [0]
+    assert set(errors) == {1, 2, 3}
+
+    response = client.post("/api/v1/predict_batch", json={"columns": columns})
+    assert response.status_code == 200
+    assert ["error" in r for r in response.json()["results"]] == [False, True, True, True]
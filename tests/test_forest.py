@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from Backend.services.forest_service import CompiledForest
+
+
+def make_data(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 5)) * [1.0, 10.0, 100.0, 1e-3, 1.0]  # thresholds at very different scales
+    X[:, 4] = rng.integers(0, 3, n)
+    y = ((X[:, 0] + X[:, 1] / 10 - X[:, 4]) > 0).astype(int) + (X[:, 2] > 100)  # 3 classes
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    RandomForestClassifier(n_estimators=25, random_state=0),
+    ExtraTreesClassifier(n_estimators=10, max_depth=6, random_state=0),
+])
+def test_predict_proba_is_bit_identical_to_sklearn(model):
+    X, y = make_data()
+    X_test, _ = make_data(n=300, seed=1)
+    X_test[::5, 1] = np.nan  # NaNs follow each node's missing-value side
+    model.fit(X, y)
+
+    forest = CompiledForest.from_sklearn(model)
+    assert np.array_equal(forest.predict_proba(X_test), model.predict_proba(X_test))
+    assert np.array_equal(forest.predict_proba(X_test[0]), model.predict_proba(X_test[:1]))
+
+
+def test_float32_forest_routes_identically():
+    X, y = make_data()
+    X_test, _ = make_data(n=300, seed=2)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+    forest32 = CompiledForest.from_sklearn(model, dtype=np.float32)
+
+    # Inputs sitting exactly on the float32 neighbours of every threshold
+    thresholds = forest.threshold[forest.feature == 1].astype(np.float32)
+    X_edge = np.repeat(X_test[:1], thresholds.size * 2, axis=0)
+    X_edge[:, 1] = np.concatenate([thresholds, np.nextafter(thresholds, np.float32(np.inf))])
+
+    for data in (X_test, X_edge):
+        assert np.array_equal(forest32.apply(data), forest.apply(data))
+        np.testing.assert_allclose(forest32.predict_proba(data), model.predict_proba(data), atol=1e-6)
+    assert forest32.threshold.dtype == np.float32
+
+
+def test_rejects_multi_output_models():
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=2, random_state=0).fit(X, np.column_stack([y, y]))
+    with pytest.raises(ValueError):
+        CompiledForest.from_sklearn(model)
+
+
+def test_model_service_engines_agree():
+    from Backend.routes.predict import model_registry
+    from Backend.services.model_service import HCCModelService
+
+    path = model_registry.active.hcc_model_path
+    compiled = HCCModelService(path, predict_engine="compiled")
+    reference = HCCModelService(path, predict_engine="sklearn", shap_engine="shap")
+    X = np.random.default_rng(0).integers(0, 3, size=(20, 30)).astype(float)
+
+    assert compiled.forest is not None and reference.forest is None
+    assert np.array_equal(compiled.hcc_predict(X), reference.hcc_predict(X))
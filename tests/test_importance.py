@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from Backend.main import app
+from Backend.services.importance_service import ShapAggregator
+
+client = TestClient(app)
+
+patient = {
+    "ast": 35.0, "alt": 40.0, "alp": 90.0, "albumin": 4.2, "total_bilirubin": 1.0, "afp": 15.0,
+    "stage_at_diagnosis": 2, "t_stage_at_diagnosis": 3, "age": 58, "gender": 1,
+    "pmh_cirrhosis": 1, "pmh_fatty_liver": 0, "comorbid_diabetes": 0, "comorbid_htn": 1,
+    "comorbid_cad": 0, "regimen_atezo_bev": 1, "regimen_durva_treme": 0, "regimen_nivo_ipi": 0,
+    "regimen_pembro_ipi": 0, "local_treatment_given_TACE": 1, "local_treatment_given_Y90": 0,
+    "local_treatment_given_RFA": 0, "local_treatment_given_None": 0,
+    "neoadjuvant_therapy": 0, "adjuvant_treatment_given": 0,
+    "clinical_notes": "Cirrhotic liver with ascites."
+}
+
+
+def test_running_aggregates_match_full_recomputation():
+    rng = np.random.default_rng(0)
+    names = ["a", "b", "c", "regimen_x", "regimen_y"]
+    aggregator = ShapAggregator(names, {"X": 3, "Y": 4}, model_version="v1")
+
+    X = rng.normal(size=(3000, 5))
+    X[:, 3] = rng.integers(0, 2, 3000)
+    X[:, 4] = 1 - X[:, 3]
+    shap_values = rng.normal(scale=[0.2, 0.02, 0.001, 0.05, 0.05], size=(3000, 5))
+    for start in range(0, 3000, 250):   # arrives in pieces
+        aggregator.update(X[start:start + 250], shap_values[start:start + 250])
+
+    summary = aggregator.summary()
+    assert summary["model_version"] == "v1"
+    assert summary["groups"]["all"]["n"] == 3000
+    assert summary["groups"]["X"]["n"] + summary["groups"]["Y"]["n"] == 3000
+
+    mask = X[:, 3] == 1
+    features = {f["feature"]: f for f in summary["groups"]["X"]["features"]}
+    assert [f["feature"] for f in summary["groups"]["X"]["features"]][0] == "a"   # by mean |SHAP|
+    for i, name in enumerate(names):
+        values = shap_values[mask, i]
+        assert features[name]["mean_abs_shap"] == pytest.approx(np.abs(values).mean())
+        assert features[name]["mean_shap"] == pytest.approx(values.mean())
+        for key, q in (("p5", 5), ("p50", 50), ("p95", 95)):
+            # Histogram quantiles: a few percent of the spread
+            assert features[name]["quantiles"][key] == pytest.approx(np.percentile(values, q), abs=0.05 * values.std())
+
+    aggregator.reset("v2")
+    assert aggregator.summary("X") == {"model_version": "v2", "groups": {"X": {"n": 0, "features": []}}}
+    with pytest.raises(ValueError):
+        aggregator.summary("Z")
+
+
+def test_global_endpoint_counts_each_explained_patient_once():
+    before = client.get("/api/v1/explanations/global").json()["groups"]
+
+    atezo = {**patient, "afp": 17.25}   # not scored by other tests
+    durva = {**atezo, "regimen_atezo_bev": 0, "regimen_durva_treme": 1}
+    for _ in range(3):   # resubmissions come from the cache
+        assert client.post("/api/v1/predict", json=atezo).status_code == 200
+    assert client.post("/api/v1/predict_batch", json={"patients": [atezo, durva, durva]}).status_code == 200
+    # Not explained: not counted
+    assert client.post("/api/v1/predict?explain=none", json={**atezo, "age": 61}).status_code == 200
+
+    response = client.get("/api/v1/explanations/global")
+    assert response.status_code == 200
+    groups = response.json()["groups"]
+    assert groups["all"]["n"] == before["all"]["n"] + 2
+    assert groups["Atezolizumab + Bevacizumab"]["n"] == before["Atezolizumab + Bevacizumab"]["n"] + 1
+    assert groups["Durvalumab + Tremelimumab"]["n"] == before["Durvalumab + Tremelimumab"]["n"] + 1
+    assert len(groups["all"]["features"]) == 30
+
+    # Deferred: counted once the explanation is ready, and only for rows not explained before
+    nivo = {**atezo, "regimen_atezo_bev": 0, "regimen_nivo_ipi": 1}
+    assert client.post("/api/v1/predict_batch?explain=deferred", json={"patients": [nivo, nivo, durva]}).status_code == 200
+    for _ in range(100):
+        groups = client.get("/api/v1/explanations/global").json()["groups"]
+        if groups["all"]["n"] > before["all"]["n"] + 2:
+            break
+        time.sleep(0.05)
+    time.sleep(0.1)
+    groups = client.get("/api/v1/explanations/global").json()["groups"]
+    assert groups["all"]["n"] == before["all"]["n"] + 3
+
+    one = client.get("/api/v1/explanations/global", params={"regimen": "Durvalumab + Tremelimumab"}).json()
+    assert list(one["groups"]) == ["Durvalumab + Tremelimumab"]
+    assert client.get("/api/v1/explanations/global", params={"regimen": "Sorafenib"}).status_code == 404
@@ -0,0 +1,59 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+import Backend.services.NLP_service as nlp
+from Backend.services.keyword_matcher import KeywordMatcher
+from Backend.services.NLP_service import generate_ner_flags, keyword_matcher
+
+
+def test_automaton_finds_overlapping_and_nested_patterns():
+    matcher = KeywordMatcher({"a": ["he", "she", "hers"], "b": ["his", "she sells"]})
+    found = {(m.keyword, m.start, m.end) for m in matcher.scan("ushers. she sells his hers")}
+    # Word-level automaton: "ushers" is one word and matches nothing
+    assert found == {("she", 2, 3), ("she sells", 2, 4), ("his", 4, 5), ("hers", 5, 6)}
+
+
+def test_normalization_ignores_case_punctuation_and_plurals():
+    assert keyword_matcher.flags("HEPATOCELLULAR carcinoma") == [1, 0, 0, 0, 0]
+    assert keyword_matcher.flags("Malignant neoplasm, esophageal-varices") == [1, 0, 1, 0, 0]
+    assert keyword_matcher.flags("Obstruction of the biliary tree") == [0, 0, 0, 0, 0]  # phrase interrupted
+    assert keyword_matcher.flags("obstruction of biliary trees") == [0, 0, 0, 1, 0]
+
+
+def test_negation_scope():
+    # Pre-negation covers a short window, up to the end of the clause
+    assert keyword_matcher.flags("No ascites, splenomegaly or varices.") == [0, 0, 0, 0, 0]
+    assert keyword_matcher.flags("No ascites. Splenomegaly noted.") == [0, 0, 0, 0, 1]
+    assert keyword_matcher.flags("Denies abdominal pain but reports fatigue") == [0, 0, 0, 0, 1]
+    assert keyword_matcher.flags("No " + "stable " * 10 + "ascites") == [0, 0, 0, 0, 1]
+
+    # Post-negation
+    assert keyword_matcher.flags("Portal hypertension was ruled out") == [0, 0, 0, 0, 0]
+    assert keyword_matcher.flags("Portal hypertension. Infection ruled out") == [0, 0, 1, 0, 0]
+
+    # Negated and affirmed mentions of the same flag: affirmed wins
+    assert keyword_matcher.flags("No fatigue last month; now reports weight loss") == [0, 0, 0, 0, 1]
+
+
+def test_generate_ner_flags_engines(monkeypatch):
+    note = "Patient with liver cirrhosis, no ascites."
+    assert generate_ner_flags(note, engine="keyword") == [0, 1, 0, 0, 0]
+    assert len(generate_ner_flags(note, engine="random")) == 5
+    with pytest.raises(ValueError):
+        generate_ner_flags(note, engine="missing")
+
+    calls = []
+    def fake_transformer(notes, targets=None):
+        calls.append(notes)
+        return nlp.NERFlagResult([1, 1, 1, 1, 1])
+    monkeypatch.setattr(nlp, "stream_transformer_flags", fake_transformer)
+
+    # Pre-filter: no keyword anywhere, so the transformer is not run
+    assert generate_ner_flags("Routine follow-up visit.", engine="prefilter") == [0, 0, 0, 0, 0]
+    assert calls == []
+
+    # Otherwise only flags with a (possibly negated) mention can be set
+    assert generate_ner_flags(note, engine="prefilter") == [0, 1, 0, 0, 1]
+    assert calls == [note]
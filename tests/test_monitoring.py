@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+from sklearn.metrics import brier_score_loss, confusion_matrix, roc_auc_score
+
+from fastapi.testclient import TestClient
+from Backend.main import app
+from Backend.services.monitoring_service import PerformanceMonitor
+from Backend.services.patient_index import PatientIdIndex
+from Backend.services.storage_service import PredictionStore, WriteBehindWriter
+from Backend.services.sweep_service import REGIMENS
+
+client = TestClient(app)
+
+
+def cohort(n: int = 2000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    probability = rng.random(n)
+    outcome = (rng.random(n) < probability).astype(int)
+    regimen = rng.integers(0, 2, size=n)
+    rows = [
+        {"patient_id": i, "probability": float(p), "regimen_atezo_bev": int(r == 0), "regimen_nivo_ipi": int(r == 1)}
+        for i, (p, r) in enumerate(zip(probability, regimen))
+    ]
+    return rows, outcome, regimen
+
+
+def test_metrics_match_sklearn():
+    rows, outcome, regimen = cohort()
+    monitor = PerformanceMonitor(dict(REGIMENS))
+    for row, y in zip(rows, outcome):
+        monitor.replace((None, None), (row, y))
+
+    probability = np.array([row["probability"] for row in rows])
+    summary = monitor.summary()["groups"]
+    for name, mask in [("all", np.ones(len(rows), dtype=bool)),
+                       ("Nivolumab + Ipilimumab", regimen == 1)]:
+        group = summary[name]
+        assert group["n"] == mask.sum()
+        assert group["auc"] == pytest.approx(roc_auc_score(outcome[mask], probability[mask]), abs=1e-3)
+        assert group["brier"] == pytest.approx(brier_score_loss(outcome[mask], probability[mask]))
+        tn, fp, fn, tp = confusion_matrix(outcome[mask], probability[mask] > 0.5).ravel()
+        assert (group["confusion"]["tp"], group["confusion"]["fp"]) == (tp, fp)
+        assert (group["confusion"]["tn"], group["confusion"]["fn"]) == (tn, fn)
+        assert sum(b["n"] for b in group["calibration"]) == mask.sum()
+
+    assert summary["Durvalumab + Tremelimumab"]["n"] == 0
+    assert summary["Durvalumab + Tremelimumab"]["auc"] is None
+
+
+def test_corrected_outcome_replaces_the_first():
+    monitor = PerformanceMonitor({})
+    first = {"patient_id": 1, "probability": 0.9}
+    monitor.replace((None, None), (first, 0))
+    monitor.replace((None, None), ({"patient_id": 2, "probability": 0.2}, 0))
+    monitor.replace((first, 0), (first, 1))
+    monitor.replace((None, None), (None, 1))
+    monitor.replace((None, 1), (None, 0))   # a corrected unmatched outcome is still one patient
+
+    summary = monitor.summary()
+    assert summary["unmatched_outcomes"] == 1
+    group = summary["groups"]["all"]
+    assert group["n"] == 2
+    assert group["auc"] == 1.0
+    assert group["brier"] == pytest.approx((0.1 ** 2 + 0.2 ** 2) / 2)
+    assert group["confusion"] == {"threshold": 0.5, "tp": 1, "fp": 0, "tn": 1, "fn": 0}
+
+    with pytest.raises(ValueError):
+        monitor.summary("unknown")
+
+
+def test_confusion_uses_the_saved_prediction():
+    monitor = PerformanceMonitor({})
+    monitor.replace((None, None), ({"patient_id": 1, "probability": 0.5}, 0))                   # 0.5 is not > 0.5
+    monitor.replace((None, None), ({"patient_id": 2, "probability": 0.4, "prediction": 1}, 0))   # as saved
+    assert monitor.summary()["groups"]["all"]["confusion"] == {"threshold": 0.5, "tp": 0, "fp": 1, "tn": 1, "fn": 0}
+
+
+def test_outcomes_update_the_endpoint(monkeypatch):
+    import Backend.routes.predict as predict_routes
+    from test_storage import saved_prediction
+    store = PredictionStore(":memory:")
+    writer = WriteBehindWriter(store, on_commit=predict_routes.apply_commit)
+    # Saved before the server started: picked up by the monitor's first load
+    store.upsert({"predictions": [saved_prediction(1, 0.8)],
+                  "outcomes": [{"patient_id": 1, "outcome": 1}, {"patient_id": 4, "outcome": 0}]})
+    monitor = PerformanceMonitor(dict(REGIMENS), loader=lambda: list(store.outcomes_with_predictions()))
+    monkeypatch.setattr(predict_routes, "prediction_store", store)
+    monkeypatch.setattr(predict_routes, "db_writer", writer)
+    monkeypatch.setattr(predict_routes, "patient_index", PatientIdIndex(store.patient_ids))
+    monkeypatch.setattr(predict_routes, "performance_monitor", monitor)
+
+    client.post("/api/v1/insert_data", json=saved_prediction(2, 0.3))
+    client.post("/api/v1/insert_outcome", json={"patient_id": 2, "outcome": 0})
+    client.post("/api/v1/insert_outcome", json={"patient_id": 3, "outcome": 1})
+    # The monitor follows the commits
+    assert writer.flush(timeout=10)
+
+    response = client.get("/api/v1/monitor/performance")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["unmatched_outcomes"] == 2   # patients 3 and 4
+    assert body["groups"]["all"]["n"] == 2
+    assert body["groups"]["all"]["auc"] == 1.0
+    assert body["groups"]["Atezolizumab + Bevacizumab"]["n"] == 2
+
+    assert client.get("/api/v1/monitor/performance", params={"regimen": "unknown"}).status_code == 404
+
+    # A corrected outcome and a re-saved prediction replace the stored pair
+    client.post("/api/v1/insert_outcome", json={"patient_id": 2, "outcome": 1})
+    client.post("/api/v1/insert_data", json=saved_prediction(2, 0.9))
+    assert writer.flush(timeout=10)
+    body = client.get("/api/v1/monitor/performance").json()
+    assert body["unmatched_outcomes"] == 2
+    assert body["groups"]["all"]["n"] == 2
+    assert body["groups"]["all"]["positives"] == 2
+    assert body["groups"]["all"]["brier"] == pytest.approx((0.2 ** 2 + 0.1 ** 2) / 2)
+
+    # An outcome is matched once its prediction is saved, and counted once however often it is corrected
+    client.post("/api/v1/insert_outcome", json={"patient_id": 3, "outcome": 0})
+    client.post("/api/v1/insert_data", json=saved_prediction(3, 0.6))
+    assert writer.flush(timeout=10)
+    body = client.get("/api/v1/monitor/performance").json()
+    assert body["unmatched_outcomes"] == 1
+    assert body["groups"]["all"]["n"] == 3
+    writer.close()
@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pytest
+import Backend.services.NLP_service as nlp
+from Backend.services.ner_backends import NERBackend, RandomBackend, aggregate_entities, create_backend
+from Backend.services.ner_cache import NERCache
+
+ID2LABEL = {0: "O", 1: "B-Disease", 2: "I-Disease"}
+
+
+def test_aggregate_entities_groups_bio_tags():
+    text = "[CLS] liver cirrhosis and ascites"
+    # [CLS], liver, cirrhosis, and, asc, ##ites, padding
+    offsets = np.array([[0, 0], [6, 11], [12, 21], [22, 25], [26, 29], [29, 33], [0, 0]])
+    labels = np.array([1, 1, 2, 0, 1, 2, 1])
+    scores = np.array([0.5, 0.9, 0.7, 0.99, 0.8, 0.6, 0.5])
+
+    entities = aggregate_entities(text, offsets, labels, scores, ID2LABEL)
+    assert [(e["entity_group"], e["word"]) for e in entities] == [("Disease", "liver cirrhosis"), ("Disease", "ascites")]
+    assert entities[0]["score"] == pytest.approx(0.8)
+
+
+def test_aggregate_entities_b_tag_starts_a_new_entity():
+    offsets = np.array([[0, 5], [6, 10]])
+    entities = aggregate_entities("liver mass", offsets, np.array([1, 1]), np.ones(2), ID2LABEL)
+    assert [e["word"] for e in entities] == ["liver", "mass"]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown NER backend"):
+        create_backend("gpu-cluster")
+
+
+def test_incomplete_backend_fails_on_creation():
+    class NoCall(NERBackend):
+        name = "no-call"
+
+    with pytest.raises(TypeError):
+        NoCall()
+
+
+def test_random_backend_runs_the_transformer_engine(monkeypatch):
+    backend = RandomBackend(nlp.FLAG_KEYWORDS, rate=1.0, seed=0)
+    monkeypatch.setattr(nlp, "_transformer", (backend.tokenizer, backend))
+    monkeypatch.setattr(nlp, "ner_cache", NERCache("random"))
+    monkeypatch.setattr(nlp.config, "NER_BATCH_WAIT_MS", 0)
+
+    result = nlp.generate_ner_flag_result("Routine visit. " * 3, engine="transformer")
+    assert result.flags == [1, 1, 1, 1, 1]
+    assert result.complete
+
+    # Long sentences are windowed with the backend's tokenizer
+    assert len(list(nlp.split_chunks(" ".join(["word"] * 1000), chunk_size=512, overlap=50))) == 3
+
+
+# -------------------------------
+# Tiny local model: HF pipeline vs ONNX export
+# -------------------------------
+@pytest.fixture
+def tiny_model(tmp_path):
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    words = ["liver", "cirrhosis", "portal", "hypertension", "ascites", "patient", "has", "and", "no", "mass"]
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words + [".", ","]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+
+    model_dir = tmp_path / "model"
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_file))
+    tokenizer.save_pretrained(model_dir)
+
+    model_config = transformers.BertConfig(
+        vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=128, num_labels=3,
+        id2label=ID2LABEL, label2id={label: i for i, label in ID2LABEL.items()},
+    )
+    transformers.set_seed(0)
+    transformers.BertForTokenClassification(model_config).save_pretrained(model_dir)
+    return str(model_dir)
+
+
+def test_onnx_export_matches_pipeline(tiny_model, tmp_path):
+    pytest.importorskip("onnxruntime")
+    from Backend.services.ner_backends import HFPipelineBackend, ONNXBackend
+    from Backend.services.ner_export import FP32_FILE, export_onnx
+
+    out_dir = str(tmp_path / "onnx")
+    int8_path = export_onnx(tiny_model, out_dir, quantize=True)
+    texts = ["patient has liver cirrhosis and ascites .", "no portal hypertension", "liver mass"]
+
+    reference = HFPipelineBackend(tiny_model)(texts)
+    exported = ONNXBackend(os.path.join(out_dir, FP32_FILE))(texts)
+    spans = lambda results: [[(e["entity_group"], e["start"], e["end"]) for e in entities] for entities in results]
+    assert spans(exported) == spans(reference)
+
+    # The quantized model keeps the same interface; its labels may differ slightly
+    quantized = ONNXBackend(int8_path)(texts)
+    assert len(quantized) == len(texts)
+    assert all(e["word"] == texts[i][e["start"]:e["end"]] for i, entities in enumerate(quantized) for e in entities)
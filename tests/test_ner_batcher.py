@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+
+import pytest
+from Backend.services.ner_batcher import NERMicroBatcher
+
+
+class StubPipeline:
+    """
+    Token-classification stand-in: one "entity" per input text.
+    """
+    def __init__(self, fail_on=None):
+        self.batch_sizes = []
+        self.fail_on = fail_on
+
+    def __call__(self, texts):
+        self.batch_sizes.append(len(texts))
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError("model failed")
+        return [[{"entity_group": "Disease", "word": text.upper()}] for text in texts]
+
+
+def test_concurrent_requests_share_forward_passes():
+    stub = StubPipeline()
+    batcher = NERMicroBatcher(stub, max_batch_size=64, max_wait_ms=200)
+    start = threading.Barrier(8)
+    results = {}
+
+    def caller(i):
+        chunks = [f"note {i} chunk {j}" for j in range(i % 3 + 1)]
+        start.wait()
+        results[i] = (chunks, batcher.run(chunks, timeout=5))
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        batcher.close()
+
+    # Every caller gets its own results back, in its own chunk order
+    for chunks, entities in results.values():
+        assert [e[0]["word"] for e in entities] == [c.upper() for c in chunks]
+
+    assert sum(stub.batch_sizes) == sum(i % 3 + 1 for i in range(8))
+    assert len(stub.batch_sizes) < 8  # fewer forward passes than requests
+    assert batcher.stats()["chunks"] == sum(stub.batch_sizes)
+
+
+def test_batch_size_limit_splits_large_requests():
+    stub = StubPipeline()
+    batcher = NERMicroBatcher(stub, max_batch_size=4, max_wait_ms=50)
+    try:
+        chunks = [f"chunk {i}" for i in range(10)]
+        entities = batcher.run(chunks, timeout=5)
+    finally:
+        batcher.close()
+
+    assert [e[0]["word"] for e in entities] == [c.upper() for c in chunks]
+    assert max(stub.batch_sizes) <= 4
+    assert batcher.run([]) == []
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    stub = StubPipeline(fail_on="bad")
+    batcher = NERMicroBatcher(stub, max_batch_size=8, max_wait_ms=20)
+    try:
+        with pytest.raises(RuntimeError, match="model failed"):
+            batcher.run(["bad"], timeout=5)
+        # The worker keeps serving later requests
+        assert batcher.run(["good"], timeout=5)[0][0]["word"] == "GOOD"
+    finally:
+        batcher.close()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(["after close"])
+
+
+def test_cohort_notes_are_batched_together(monkeypatch):
+    import Backend.services.NLP_service as nlp
+
+    def stub_ner(texts):
+        stub_ner.batch_sizes.append(len(texts))
+        # Report every sentence as a disease mention
+        return [[{"entity_group": "Disease", "word": part.strip()} for part in text.split(".") if part.strip()]
+                for text in texts]
+    stub_ner.batch_sizes = []
+
+    batcher = NERMicroBatcher(stub_ner, max_batch_size=32, max_wait_ms=50)
+    monkeypatch.setattr(nlp, "_get_batcher", lambda: batcher)
+    monkeypatch.setattr(nlp, "ner_cache", nlp.NERCache("stub"))
+    monkeypatch.setattr(nlp.config, "NER_BATCH_WAIT_MS", 50.0)
+
+    notes = ["Ascites. Liver mass", "Routine visit", None, "Portal hypertension"]
+    try:
+        flags = nlp.generate_ner_flags_batch(notes, engine="prefilter")
+    finally:
+        batcher.close()
+
+    assert flags == [[1, 0, 0, 0, 1], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0], [0, 0, 1, 0, 0]]
+    # Only the sentences of notes with keyword mentions, in one pass
+    assert stub_ner.batch_sizes == [3]
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from concurrent.futures import Future
+
+import pytest
+import Backend.services.NLP_service as nlp
+from Backend.services.ner_cache import NERCache
+
+
+@pytest.fixture
+def stub_ner(monkeypatch):
+    """
+    Replaces the transformer: every sentence is reported as one disease mention.
+    """
+    calls = []
+
+    def submit_ner(texts):
+        calls.append(list(texts))
+        future = Future()
+        future.set_result([[{"entity_group": "Disease", "word": text.rstrip(".")}] for text in texts])
+        return future
+
+    monkeypatch.setattr(nlp, "_submit_ner", submit_ner)
+    monkeypatch.setattr(nlp, "ner_cache", NERCache("stub"))
+    return calls
+
+
+def test_follow_up_note_only_runs_new_sentences(stub_ner):
+    first = "Liver cirrhosis. Ascites.\nPortal hypertension."
+    follow_up = "Liver  cirrhosis.\nAscites. Portal hypertension. Splenomegaly."
+
+    assert nlp.generate_ner_flags_batch([first], engine="transformer") == [[0, 1, 1, 0, 1]]
+    assert nlp.generate_ner_flags(follow_up, engine="transformer") == [0, 1, 1, 0, 1]
+    assert sorted(nlp.extract_symptoms_from_clinical_notes(follow_up)) == [
+        "Ascites", "Liver cirrhosis", "Portal hypertension", "Splenomegaly"
+    ]
+
+    # Whitespace differences hash the same; only the new sentence reaches the model
+    assert stub_ner == [["Liver cirrhosis.", "Ascites.", "Portal hypertension."], ["Splenomegaly."]]
+
+    stats = nlp.ner_cache.stats()
+    assert stats["misses"] == 4
+    assert stats["hits"] == 3 + 4
+    assert stats["bytes_processed"] == len("Liver cirrhosis.Ascites.Portal hypertension.Splenomegaly.")
+    assert stats["bytes_saved"] == 2 * len("Liver  cirrhosis.Ascites.Portal hypertension.") + len("Splenomegaly.")
+    assert stats["hit_rate"] == pytest.approx(7 / 11)
+
+
+def test_repeated_sentences_in_a_cohort_run_once(stub_ner):
+    notes = ["Ascites. Fatigue.", "Fatigue. Ascites.", "Ascites."]
+    flags = nlp.generate_ner_flags_batch(notes, engine="transformer")
+    assert flags == [[0, 0, 0, 0, 1]] * 3
+    assert stub_ner == [["Ascites.", "Fatigue."]]
+
+
+def test_lru_eviction():
+    cache = NERCache("stub", max_entries=2)
+    keys = [cache.make_key(text) for text in ("a", "b", "c")]
+    cache.put(keys[0], ["A"])
+    cache.put(keys[1], ["B"])
+    assert cache.get(keys[0]) == ["A"]   # a is now the most recent
+    cache.put(keys[2], ["C"])
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == ["A"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_keys_depend_on_model():
+    assert NERCache("model-a").make_key("Ascites.") != NERCache("model-b").make_key("Ascites.")
+
+
+def test_sqlite_store_survives_restart(tmp_path):
+    path = str(tmp_path / "ner_cache.sqlite")
+    cache = NERCache("stub", max_entries=10, path=path)
+    key = cache.make_key("Portal vein thrombosis.")
+    cache.put(key, ["Portal vein thrombosis"])
+    cache.close()
+
+    restarted = NERCache("stub", max_entries=10, path=path)
+    try:
+        assert restarted.get(key, n_bytes=23) == ["Portal vein thrombosis"]
+        assert restarted.get(key) == ["Portal vein thrombosis"]   # now from memory
+        stats = restarted.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["hits"] == 2
+        assert stats["bytes_saved"] == 23
+        assert stats["persistent"]
+    finally:
+        restarted.close()
+
+
+def test_put_many_commits_once(tmp_path):
+    path = str(tmp_path / "ner_cache.sqlite")
+    cache = NERCache("stub", max_entries=10, path=path)
+    commits = []
+    cache._db.set_trace_callback(lambda sql: commits.append(sql) if sql.startswith("COMMIT") else None)
+    sentences = [f"Lesion {i}." for i in range(5)]
+    cache.put_many((cache.make_key(text), [text]) for text in sentences)
+    assert len(commits) == 1
+    cache.close()
+
+    restarted = NERCache("stub", max_entries=0, path=path)
+    try:
+        assert [restarted.get(restarted.make_key(text)) for text in sentences] == [[text] for text in sentences]
+    finally:
+        restarted.close()
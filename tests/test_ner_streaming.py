@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+from fastapi.testclient import TestClient
+import Backend.services.NLP_service as nlp
+from Backend.services.ner_cache import NERCache
+from Backend.main import app
+
+client = TestClient(app)
+
+# One sentence per flag: liver_tumor, liver_disease, portal_hypertension, biliary, symptoms
+ALL_FLAGS = "Liver mass. Cirrhotic. Portal Hypertension. Biliary dilatation. Fatigue."
+FILLER = " ".join(f"Visit {i} was unremarkable." for i in range(40))
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """
+    Stub NER reporting each sentence (minus its full stop) as a disease mention.
+    """
+    calls = []
+
+    def submit_ner(texts):
+        calls.append(list(texts))
+        future = Future()
+        future.set_result([[{"entity_group": "Disease", "word": text.rstrip(".")}] for text in texts])
+        return future
+
+    monkeypatch.setattr(nlp, "_submit_ner", submit_ner)
+    monkeypatch.setattr(nlp, "_dispatch_size", lambda: 2)
+    monkeypatch.setattr(nlp, "ner_cache", NERCache("stub"))
+    return calls
+
+
+def test_stops_once_every_flag_is_set(submitted):
+    result = nlp.stream_transformer_flags(ALL_FLAGS + " " + FILLER, token_budget=0, time_budget_ms=0)
+    assert result.flags == [1, 1, 1, 1, 1]
+    assert result.complete and result.truncated_reason is None
+    assert result.chunks_processed == 6   # the fifth flag arrives in the third batch of two
+    assert sum(len(texts) for texts in submitted) == 6
+
+
+def test_prefilter_stops_once_its_candidate_flags_are_set(submitted, monkeypatch):
+    monkeypatch.setattr(nlp.config, "NER_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(nlp.config, "NER_TIME_BUDGET_MS", 0)
+    note = "Ascites noted. Fatigue. " + FILLER
+    result = nlp.generate_ner_flag_result(note, engine="prefilter")
+    assert result.flags == [0, 0, 0, 0, 1]
+    assert result.complete
+    assert submitted == [["Ascites noted.", "Fatigue."]]
+
+
+def test_token_budget_truncates(submitted, monkeypatch):
+    # Subword tokenizer stand-in: a token per 3 characters, several per word
+    def count_tokens(text):
+        return -(-len(text) // 3)
+
+    monkeypatch.setattr(nlp, "count_tokens", count_tokens)
+    result = nlp.stream_transformer_flags(FILLER + " " + ALL_FLAGS, token_budget=20, time_budget_ms=0)
+    assert not result.complete
+    assert result.truncated_reason == "token_budget"
+    assert result.flags == [0, 0, 0, 0, 0]
+    sent = [text for texts in submitted for text in texts]
+    assert sum(count_tokens(text) for text in sent) <= 20
+    assert sum(len(text.split()) for text in sent) < 20 / 2   # far fewer words than tokens
+
+    # Without a budget the whole note is read
+    full = nlp.stream_transformer_flags(FILLER + " " + ALL_FLAGS, token_budget=0, time_budget_ms=0)
+    assert full.complete and full.flags == [1, 1, 1, 1, 1]
+
+
+def test_time_budget_bounds_latency(monkeypatch):
+    cache = NERCache("stub")
+    monkeypatch.setattr(nlp, "ner_cache", cache)
+
+    def slow_submit(texts):
+        future = Future()
+        result = [[{"entity_group": "Disease", "word": "Ascites"}] for _ in texts]
+        threading.Timer(0.3, future.set_result, args=(result,)).start()
+        return future
+
+    monkeypatch.setattr(nlp, "_submit_ner", slow_submit)
+    start = time.monotonic()
+    result = nlp.stream_transformer_flags("Ascites. Fatigue.", token_budget=0, time_budget_ms=50)
+    assert time.monotonic() - start < 0.25
+    assert result.truncated_reason == "time_budget"
+    assert not result.complete
+
+    # The late results still land in the cache
+    time.sleep(0.5)
+    assert cache.get(cache.make_key("Fatigue.")) == ["Ascites"]
+
+
+def test_predict_reports_ner_status():
+    patient = {
+        "ast": 35.0, "alt": 40.0, "alp": 90.0, "albumin": 4.2, "total_bilirubin": 1.0, "afp": 15.0,
+        "stage_at_diagnosis": 2, "t_stage_at_diagnosis": 3, "age": 58, "gender": 1,
+        "pmh_cirrhosis": 1, "pmh_fatty_liver": 0, "comorbid_diabetes": 0, "comorbid_htn": 1,
+        "comorbid_cad": 0, "regimen_atezo_bev": 1, "regimen_durva_treme": 0, "regimen_nivo_ipi": 0,
+        "regimen_pembro_ipi": 0, "local_treatment_given_TACE": 1, "local_treatment_given_Y90": 0,
+        "local_treatment_given_RFA": 0, "local_treatment_given_None": 0,
+        "neoadjuvant_therapy": 0, "adjuvant_treatment_given": 0,
+        "clinical_notes": "Cirrhotic liver with ascites."
+    }
+    response = client.post("/api/v1/predict", json=patient)
+    assert response.status_code == 200
+    assert response.json()["ner"] == {"complete": True, "truncated_reason": None, "chunks_processed": 0,
+                                        "degraded": False}
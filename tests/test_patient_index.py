@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from fastapi.testclient import TestClient
+from Backend.main import app
+from Backend.services.patient_index import PatientIdIndex
+from Backend.services.storage_service import PredictionStore, WriteBehindWriter
+
+client = TestClient(app)
+
+
+def test_loader_runs_once_and_inserts_are_seen():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return np.array([5, 1, 3, 3])
+
+    index = PatientIdIndex(loader, merge_threshold=2)
+    index.add(10)  # before loading: kept in the buffer and merged on load
+    assert 3 in index and 10 in index
+    assert 2 not in index
+    assert len(calls) == 1
+
+    index.add(7)
+    index.add(7)
+    index.add(3)
+    assert index.stats()["buffered"] == 1
+    index.add(8)  # reaches merge_threshold
+    assert index.stats() == {"loaded": True, "indexed": 6, "buffered": 0, "bytes": 48}
+    assert len(calls) == 1
+
+
+def test_contains_many_matches_a_set():
+    rng = np.random.default_rng(0)
+    stored = rng.choice(1_000_000, size=10_000, replace=False)
+    index = PatientIdIndex(lambda: stored)
+    added = rng.integers(0, 1_000_000, size=500)
+    index.add_many(added)
+
+    queries = rng.integers(0, 1_000_000, size=20_000)
+    expected = set(stored.tolist()) | set(added.tolist())
+    found = index.contains_many(queries)
+    assert found.tolist() == [int(q) in expected for q in queries]
+
+
+def test_bulk_check_endpoint(monkeypatch):
+    import Backend.routes.predict as predict_routes
+    store = PredictionStore(":memory:")
+    writer = WriteBehindWriter(store, on_commit=predict_routes.apply_commit)
+    monkeypatch.setattr(predict_routes, "prediction_store", store)
+    monkeypatch.setattr(predict_routes, "db_writer", writer)
+    monkeypatch.setattr(predict_routes, "patient_index", PatientIdIndex(store.patient_ids))
+
+    from test_storage import saved_prediction
+    for patient_id in (11, 12):
+        assert client.post("/api/v1/insert_data", json=saved_prediction(patient_id)).status_code == 200
+
+    # Found while still queued for the writer as well as once committed
+    response = client.post("/api/v1/check_data_bulk", json={"patient_ids": [12, 13, 11]})
+    assert response.status_code == 200
+    assert response.json() == {"exists": [True, False, True], "n_found": 2}
+    assert writer.flush(timeout=10)
+    assert client.post("/api/v1/check_data_bulk", json={"patient_ids": [12, 13, 11]}).json()["n_found"] == 2
+
+    health = client.get("/api/v1/health").json()
+    assert health["patient_index"]["indexed"] + health["patient_index"]["buffered"] == 2
+    writer.close()
@@ -160,4 +160,53 @@ def test_predict_failure_patient():
 
     # FastAPI + Pydantic should reject this input
     assert response.status_code == 422  # Unprocessable Entity
-    print("Failure patient response:", response.json())
\ No newline at end of file
+    print("Failure patient response:", response.json())
+
+def test_predict_sweep():
+    response = client.post("/api/v1/predict_sweep", json=fake_patient)
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert len(results) == 16
+    assert [r["rank"] for r in results] == list(range(1, 17))
+
+    combos = {(r["systemic_regimen"], r["local_treatment"]) for r in results}
+    assert len(combos) == 16
+
+    probabilities = [r["probability"] for r in results]
+    assert probabilities == sorted(probabilities, reverse=True)
+
+
+def test_predict_explain_none():
+    response = client.post("/api/v1/predict?explain=none", json=fake_patient)
+    assert response.status_code == 200
+    json_data = response.json()
+    assert json_data["shap_values"] is None
+    assert "probability" in json_data
+    assert "explanation_id" not in json_data
+
+
+def test_predict_explain_deferred():
+    import time
+
+    response = client.post("/api/v1/predict?explain=deferred", json=fake_patient)
+    assert response.status_code == 200
+    json_data = response.json()
+    assert json_data["shap_values"] is None
+    assert "probability" in json_data
+
+    explanation_id = json_data["explanation_id"]
+    for _ in range(100):
+        explanation = client.get(f"/api/v1/explanations/{explanation_id}").json()
+        if explanation["status"] != "pending":
+            break
+        time.sleep(0.1)
+
+    assert explanation["status"] == "ready"
+    assert len(explanation["shap_values"]) == 30
+    assert "baseline" in explanation
+
+
+def test_unknown_explanation_id():
+    response = client.get("/api/v1/explanations/does-not-exist")
+    assert response.status_code == 404
@@ -0,0 +1,78 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import warnings
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+from fastapi.testclient import TestClient
+from Backend.main import app
+
+
+client = TestClient(app)
+
+
+def test_predict_batch_rows(patient_payload):
+    patients = [patient_payload, dict(patient_payload, age=70), dict(patient_payload, ast="thirty-five")]
+    response = client.post("/api/v1/predict_batch", json={"patients": patients})
+    assert response.status_code == 200
+
+    json_data = response.json()
+    assert json_data["n_rows"] == 3
+    assert json_data["n_scored"] == 2
+    assert "baseline" in json_data
+
+    results = json_data["results"]
+    assert [r["index"] for r in results] == [0, 1, 2]
+    for r in results[:2]:
+        assert 0.0 <= r["probability"] <= 1.0
+        assert r["prediction"] in [0, 1]
+        assert len(r["shap_values"]) == 30
+        assert len(r["toxicity_proba"]) > 0
+
+    # A bad row is reported on its own and does not fail the batch
+    assert "error" in results[2]
+    assert "ast" in results[2]["error"]
+
+
+def test_predict_batch_columns_match_rows(patient_payload):
+    patients = [patient_payload, dict(patient_payload, afp=400.0)]
+    columns = {name: [p[name] for p in patients] for name in patient_payload}
+
+    by_rows = client.post("/api/v1/predict_batch", json={"patients": patients}).json()
+    by_columns = client.post("/api/v1/predict_batch", json={"columns": columns}).json()
+
+    assert by_columns["n_rows"] == 2
+    assert len(by_columns["results"]) == len(by_rows["results"])
+    for r in by_columns["results"]:
+        assert "probability" in r
+
+
+def test_predict_batch_invalid_layout():
+    response = client.post("/api/v1/predict_batch", json={})
+    assert response.status_code == 422
+
+    response = client.post("/api/v1/predict_batch", json={"columns": {"ast": [1.0], "alt": [1.0, 2.0]}})
+    assert response.status_code == 422
+
+
+def test_predict_batch_deduplicates(monkeypatch, patient_payload):
+    # Fix the NER flags so identical patients give identical feature rows
+    monkeypatch.setattr("Backend.services.Feature_service.generate_ner_flags", lambda notes: [1, 0, 1, 0, 1])
+
+    response = client.post("/api/v1/predict_batch", json={"patients": [patient_payload] * 5})
+    json_data = response.json()
+
+    assert response.status_code == 200
+    assert json_data["n_scored"] == 5
+    assert json_data["n_unique"] == 1
+    probabilities = {r["probability"] for r in json_data["results"]}
+    assert len(probabilities) == 1
+
+
+def test_predict_batch_explain_none(patient_payload):
+    response = client.post("/api/v1/predict_batch?explain=none", json={"patients": [patient_payload] * 2})
+    assert response.status_code == 200
+    for r in response.json()["results"]:
+        assert "probability" in r
+        assert "shap_values" not in r
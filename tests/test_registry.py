@@ -0,0 +1,110 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import shutil
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+import Backend.routes.predict as predict_routes
+from Backend.main import app
+from Backend.services.execution_service import InferenceExecutor, worker_services
+from Backend.services.registry_service import ModelRegistry
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    # Two runs built from the artifacts the app is currently serving
+    source = predict_routes.model_registry.active
+    for run_id, created in [("run_a", 100.0), ("run_b", 200.0)]:
+        run_dir = tmp_path / run_id
+        run_dir.mkdir()
+        for path in [source.hcc_model_path, source.toxicity_model_path, source.toxicity_scaler_path]:
+            shutil.copy(path, run_dir)
+        with open(run_dir / "meta.json", "w") as f:
+            json.dump({"version": f"{run_id}-v1", "created": created}, f)
+    return tmp_path
+
+
+def test_registry_discovers_runs(model_dir):
+    registry = ModelRegistry(str(model_dir))
+    runs = registry.discover()
+
+    assert set(runs) == {"run_a", "run_b"}
+    assert registry.select().run_id == "run_b"  # most recent
+    assert registry.select("run_a").version == "run_a-v1"
+
+    with pytest.raises(KeyError):
+        registry.select("missing")
+
+
+def test_registry_pinned_run(model_dir):
+    registry = ModelRegistry(str(model_dir), pinned_run_id="run_a")
+    registry.discover()
+    assert registry.select().run_id == "run_a"
+
+
+def test_worker_services_load_each_run_once(model_dir):
+    registry = ModelRegistry(str(model_dir))
+    registry.discover()
+    run = registry.select()
+
+    first = worker_services(run)
+    assert worker_services(run) is first
+    assert worker_services(registry.get("run_a")) is not first
+
+
+def test_in_flight_tasks_finish_on_old_run(model_dir):
+    registry = ModelRegistry(str(model_dir))
+    registry.discover()
+    executor = InferenceExecutor(mode="thread", max_workers=2, max_queue=2)
+    executor.activate(registry.get("run_a"))
+    release = threading.Event()
+
+    try:
+        in_flight = executor.submit(lambda run: release.wait() and run.run_id)
+        executor.activate(registry.get("run_b"), warm=True)
+        assert executor.submit(lambda run: run.run_id).result(timeout=5) == "run_b"
+
+        release.set()
+        assert in_flight.result(timeout=5) == "run_a"
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_reload_endpoint_switches_run(model_dir, monkeypatch):
+    original = predict_routes.model_registry.active
+    registry = ModelRegistry(str(model_dir))
+    monkeypatch.setattr(predict_routes, "model_registry", registry)
+
+    try:
+        response = client.post("/api/v1/models/reload", params={"run_id": "run_a"})
+        assert response.status_code == 200
+        assert response.json()["active_run_id"] == "run_a"
+
+        models = client.get("/api/v1/models").json()
+        assert models["active_run_id"] == "run_a"
+        assert {run["run_id"] for run in models["runs"]} == {"run_a", "run_b"}
+
+        assert client.get("/api/v1/health").json()["model_run_id"] == "run_a"
+
+        response = client.post("/api/v1/models/reload", params={"run_id": "missing"})
+        assert response.status_code == 404
+    finally:
+        predict_routes.inference_executor.activate(original, force=True)
+
+
+def test_api_router_serves_the_active_run(patient_payload):
+    from fastapi import FastAPI
+    from Backend.api.predict import router
+
+    api = FastAPI()
+    api.include_router(router)
+    response = TestClient(api).post("/predict", json=patient_payload)
+    assert response.status_code == 200
+    assert response.json()["probability"] == client.post("/api/v1/predict", json=patient_payload).json()["probability"]
@@ -0,0 +1,207 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import Backend.services.NLP_service as nlp
+from Backend.services.remote_ner import CircuitBreaker, RemoteNERClient, RemoteNERError
+
+
+class StubNERServer:
+    """
+    Local HTTP server answering with keyword flags. delays holds the seconds
+    to wait before answering each request in turn (then 0); status is the
+    HTTP status to answer with.
+    """
+    def __init__(self):
+        self.delays = []
+        self.status = 200
+        self.requests = []   # (client port, number of notes)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_POST(self):
+                notes = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["notes"]
+                with stub.lock:
+                    stub.requests.append((self.client_address[1], len(notes)))
+                    delay = stub.delays.pop(0) if stub.delays else 0
+                time.sleep(delay)
+                body = json.dumps({"flags": [nlp.keyword_matcher.flags(note) for note in notes]}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/flags"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def server():
+    server = StubNERServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(url, **kwargs):
+        kwargs.setdefault("max_wait_ms", 0)
+        client = RemoteNERClient(url, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+NOTES = ["Ascites and splenomegaly.", "No ascites.", "Liver mass in segment 4.", "Routine visit.", "Cirrhotic liver."]
+
+
+def test_batches_and_reuses_connections(server, make_client):
+    client = make_client(server.url, max_batch_size=2, hedge_ms=0)
+    expected = [nlp.keyword_matcher.flags(note) for note in NOTES]
+    assert client.flags(NOTES) == expected
+    assert sorted(n for _, n in server.requests) == [1, 2, 2]
+
+    server.requests.clear()
+    for _ in range(3):
+        assert client.flags(NOTES[:1]) == expected[:1]
+    assert len({port for port, _ in server.requests}) == 1   # one kept-alive connection
+
+
+def test_concurrent_single_notes_are_coalesced(server, make_client):
+    client = make_client(server.url, max_wait_ms=100, hedge_ms=0, timeout_ms=2000)
+    start = threading.Barrier(len(NOTES))
+    results = {}
+
+    def caller(note):
+        start.wait()
+        results[note] = client.flags([note])[0]
+
+    threads = [threading.Thread(target=caller, args=(note,)) for note in NOTES]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {note: nlp.keyword_matcher.flags(note) for note in NOTES}
+    assert len(server.requests) < len(NOTES)
+
+
+def run_concurrently(client, notes) -> dict:
+    start = threading.Barrier(len(notes))
+    results = {}
+
+    def caller(i, note):
+        start.wait()
+        try:
+            results[i] = client.flags([note])[0]
+        except RemoteNERError as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=caller, args=(i, note)) for i, note in enumerate(notes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_coalesced_batches_are_sent_in_parallel(server, make_client):
+    server.delays = [0.2] * 12
+    client = make_client(server.url, max_wait_ms=10, max_batch_size=2, hedge_ms=0, timeout_ms=500, pool_size=10)
+    notes = (NOTES * 3)[:12]
+    results = run_concurrently(client, notes)
+
+    assert [results[i] for i in range(12)] == [nlp.keyword_matcher.flags(note) for note in notes]
+    assert len(server.requests) >= 6
+    assert client.stats()["failures"] == 0
+
+
+def test_busy_connections_are_reported_as_queue_timeouts(server, make_client):
+    server.delays = [0.3] * 8
+    client = make_client(server.url, max_wait_ms=1, max_batch_size=2, hedge_ms=0, timeout_ms=400, pool_size=1)
+    results = run_concurrently(client, (NOTES * 2)[:8])
+
+    # Each request answers within its own deadline; the last callers gave up waiting for the connection
+    assert sum(isinstance(r, RemoteNERError) for r in results.values()) >= 1
+    stats = client.stats()
+    assert stats["queue_timeouts"] >= 1
+    assert stats["failures"] == 0
+
+
+def test_hedged_request_beats_slow_first_attempt(server, make_client):
+    server.delays = [1.0]   # only the first request is slow
+    client = make_client(server.url, timeout_ms=800, hedge_ms=50)
+    start = time.monotonic()
+    assert client.flags(NOTES[:1]) == [nlp.keyword_matcher.flags(NOTES[0])]
+    assert time.monotonic() - start < 0.5
+    assert client.stats()["hedges"] == 1
+    assert client.stats()["hedge_wins"] == 1
+
+
+def test_deadline(server, make_client):
+    server.delays = [1.0, 1.0]
+    client = make_client(server.url, timeout_ms=150, hedge_ms=50)
+    start = time.monotonic()
+    with pytest.raises(RemoteNERError, match="did not answer"):
+        client.flags(NOTES[:1])
+    assert time.monotonic() - start < 0.5
+
+
+def test_circuit_breaker_stops_calling_a_failing_service(server, make_client):
+    server.status = 503
+    client = make_client(server.url, hedge_ms=0, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=0.2))
+    for _ in range(2):
+        with pytest.raises(RemoteNERError, match="failed"):
+            client.flags(NOTES[:1])
+    assert client.breaker.state == "open"
+
+    with pytest.raises(RemoteNERError, match="circuit breaker"):
+        client.flags(NOTES[:1])
+    assert len(server.requests) == 2
+
+    # After the reset delay one trial call goes through and closes the breaker
+    server.status = 200
+    time.sleep(0.25)
+    assert client.breaker.state == "half-open"
+    assert client.flags(NOTES[:1]) == [nlp.keyword_matcher.flags(NOTES[0])]
+    assert client.breaker.state == "closed"
+
+
+def test_remote_engine_falls_back_and_marks_degraded(server, make_client, monkeypatch):
+    server.delays = [1.0, 1.0]
+    client = make_client(server.url, timeout_ms=100, hedge_ms=30)
+    monkeypatch.setattr(nlp, "_remote_client", client)
+    monkeypatch.setattr(nlp.config, "NER_REMOTE_FALLBACK", "keyword")
+
+    result = nlp.generate_ner_flag_result(NOTES[0], engine="remote")
+    assert result.degraded
+    assert result.flags == nlp.keyword_matcher.flags(NOTES[0])
+
+    server.delays = []
+    result = nlp.generate_ner_flag_result(NOTES[0], engine="remote")
+    assert not result.degraded
+    assert nlp.generate_ner_flags_batch(NOTES, engine="remote") == [nlp.keyword_matcher.flags(n) for n in NOTES]
@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+import msgpack
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from fastapi.testclient import TestClient
+from Backend.main import app
+from Backend.services.feature_schema import FEATURE_SCHEMA
+from Backend.services.response_service import ARROW, JSON, MSGPACK, negotiate
+
+client = TestClient(app)
+
+
+def test_negotiate():
+    assert negotiate(None) == JSON
+    assert negotiate("*/*") == JSON
+    assert negotiate("text/html, application/x-msgpack") == MSGPACK
+    assert negotiate("application/json;q=0.5, application/vnd.apache.arrow.stream") == ARROW
+    assert negotiate("application/msgpack;q=0, application/json") == JSON
+
+
+def test_msgpack_matches_json(patient_payload):
+    as_json = client.post("/api/v1/predict", json=patient_payload).json()
+    response = client.post("/api/v1/predict", json=patient_payload, headers={"Accept": MSGPACK})
+    assert response.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(response.content) == as_json
+    assert as_json["ner_flags"]["liver_disease_flag"] == as_json["data"][0][FEATURE_SCHEMA.index["liver_disease_flag"]]
+
+
+def test_slim_float32_predict(patient_payload):
+    full = client.post("/api/v1/predict", json=patient_payload).json()
+    response = client.post(
+        "/api/v1/predict",
+        params={"include_data": False, "explain": "none", "float32": True},
+        json=patient_payload,
+    )
+    slim = response.json()
+    assert "data" not in slim
+    assert slim["shap_values"] is None
+    assert slim["ner_flags"] == full["ner_flags"]
+    assert slim["probability"] == pytest.approx(full["probability"], rel=1e-6)
+    np.testing.assert_allclose(slim["toxicity_proba"], full["toxicity_proba"], rtol=1e-6)
+    assert len(response.content) < len(json.dumps(full))
+
+
+def test_arrow_batch_and_sweep(patient_payload):
+    patients = [patient_payload, dict(patient_payload, age=70), dict(patient_payload, ast="thirty-five")]
+    as_json = client.post("/api/v1/predict_batch", json={"patients": patients}).json()
+    response = client.post("/api/v1/predict_batch", json={"patients": patients}, headers={"Accept": ARROW})
+    assert response.headers["content-type"] == ARROW
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 3
+    assert table.column("probability").to_pylist()[:2] == [r["probability"] for r in as_json["results"][:2]]
+    assert table.column("error").to_pylist()[2] == as_json["results"][2]["error"]
+    meta = json.loads(table.schema.metadata[b"meta"])
+    assert meta["n_scored"] == 2
+
+    response = client.post("/api/v1/predict_sweep", params={"float32": True}, json=patient_payload,
+                           headers={"Accept": ARROW})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.field("probability").type == pa.float32()
+    assert table.schema.field("toxicity_proba").type == pa.list_(pa.float32())
+    assert table.column("rank").to_pylist() == list(range(1, table.num_rows + 1))
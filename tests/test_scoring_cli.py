@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+import pandas as pd
+import pytest
+
+from Backend import config
+from Backend.cli import main
+from Backend.services import scoring_service
+from Backend.services.model_service import ORGAN_SYSTEMS
+from Backend.services.registry_service import ModelRegistry
+from Backend.services.scoring_service import MANIFEST_FILE, ScoringJob
+
+
+@pytest.fixture(scope="module")
+def run():
+    registry = ModelRegistry(config.MODEL_DIR)
+    registry.discover()
+    return registry.select()
+
+
+@pytest.fixture
+def cohort_csv(tmp_path, patient_payload):
+    rows = [dict(patient_payload, patient_id=100 + i, age=40 + i) for i in range(8)]
+    rows[5]["ast"] = "n/a"
+    path = tmp_path / "cohort.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def read_parts(out_dir):
+    parts = sorted(name for name in os.listdir(out_dir) if name.endswith(".parquet"))
+    return pd.concat([pd.read_parquet(os.path.join(out_dir, name)) for name in parts], ignore_index=True)
+
+
+def test_cli_scores_in_chunks(tmp_path, cohort_csv):
+    out_dir = str(tmp_path / "scores")
+    assert main(["score", cohort_csv, "--out", out_dir, "--chunk-rows", "3", "--workers", "0", "--quiet"]) == 0
+
+    scores = read_parts(out_dir)
+    assert len(os.listdir(out_dir)) == 4                  # three parts and the manifest
+    assert scores["row"].tolist() == list(range(8))
+    assert scores["patient_id"].tolist() == list(range(100, 108))
+    assert scores["error"].notna().tolist() == [i == 5 for i in range(8)]
+    assert scores["prediction"][5] == -1
+    valid = scores.drop(index=5)
+    assert valid["probability"].between(0, 1).all()
+    assert (valid["prediction"] == (valid["probability"] > 0.5)).all()
+    assert [f"toxicity_{organ}" in scores for organ in ORGAN_SYSTEMS] == [True] * len(ORGAN_SYSTEMS)
+    assert not any(name.startswith("shap_") for name in scores.columns)
+
+
+def test_interrupted_job_resumes(tmp_path, cohort_csv, run, monkeypatch):
+    out_dir = str(tmp_path / "scores")
+    score_chunk = scoring_service.score_chunk_task
+
+    def failing_chunk(run, columns, first_row, *args):
+        if first_row == 3:
+            raise KeyboardInterrupt
+        return score_chunk(run, columns, first_row, *args)
+
+    monkeypatch.setattr(scoring_service, "score_chunk_task", failing_chunk)
+    job = ScoringJob(cohort_csv, out_dir, run, chunk_rows=3, workers=0, explain=True)
+    with pytest.raises(KeyboardInterrupt):
+        job.execute(progress=None)
+    with open(os.path.join(out_dir, MANIFEST_FILE)) as f:
+        assert list(json.load(f)["completed"]) == ["0"]
+
+    monkeypatch.setattr(scoring_service, "score_chunk_task", score_chunk)
+    result = job.execute(progress=None)
+    assert result == {"rows": 8, "errors": 1, "chunks": 3, "skipped": 1}
+    scores = read_parts(out_dir)
+    assert scores["row"].tolist() == list(range(8))
+    assert scores.filter(like="shap_").shape[1] == 30
+
+    # Other settings in the same directory are refused
+    with pytest.raises(ValueError, match="chunk_rows"):
+        ScoringJob(cohort_csv, out_dir, run, chunk_rows=4, workers=0, explain=True).execute(progress=None)
+
+
+def test_process_pool_matches_inline(tmp_path, cohort_csv, run):
+    inline = ScoringJob(cohort_csv, str(tmp_path / "inline"), run, chunk_rows=3, workers=0)
+    pooled = ScoringJob(cohort_csv, str(tmp_path / "pooled"), run, chunk_rows=3, workers=2)
+    assert inline.execute(progress=None) == pooled.execute(progress=None)
+    pd.testing.assert_frame_equal(read_parts(str(tmp_path / "inline")), read_parts(str(tmp_path / "pooled")))
@@ -0,0 +1,201 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from fastapi.testclient import TestClient
+from Backend.main import app
+from Backend.schemas.db import DB_Data
+from Backend.services.monitoring_service import PerformanceMonitor
+from Backend.services.patient_index import PatientIdIndex
+from Backend.services.storage_service import PredictionStore, WriteBehindWriter, WriteQueueFull
+
+client = TestClient(app)
+
+
+def saved_prediction(patient_id: int, probability: float = 0.4) -> dict:
+    row = {name: 0 for name in DB_Data.model_fields}
+    row.update(patient_id=patient_id, ast=35.0, age=58, regimen_atezo_bev=1, probability=probability)
+    return DB_Data(**row).model_dump()
+
+
+def test_upserts_are_idempotent(tmp_path):
+    store = PredictionStore(str(tmp_path / "hcc.sqlite"))
+    try:
+        store.upsert({"predictions": [saved_prediction(1, 0.2), saved_prediction(2)]})
+        store.upsert({"predictions": [saved_prediction(1, 0.9)], "outcomes": [{"patient_id": 1, "outcome": 1}]})
+
+        assert store.get("predictions", 1)["probability"] == 0.9
+        assert store.get("outcomes", 1) == {"patient_id": 1, "outcome": 1}
+        assert store.exists(2) and not store.exists(3)
+        # The pairs replaced, read in the writing transaction
+        previous = store.upsert({"outcomes": [{"patient_id": 1, "outcome": 0}, {"patient_id": 3, "outcome": 1}]},
+                                previous=True)
+        assert previous[1] == (saved_prediction(1, 0.9), 1)
+        assert previous[3] == (None, None)
+        with store.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 2
+    finally:
+        store.close()
+
+
+def test_write_behind_groups_rows_and_flushes_durably(tmp_path):
+    path = str(tmp_path / "hcc.sqlite")
+    store = PredictionStore(path, pool_size=2)
+    writer = WriteBehindWriter(store, max_batch=100, max_delay_ms=50)
+
+    for patient_id in range(250):
+        writer.put("predictions", saved_prediction(patient_id))
+    # Visible before the commit
+    assert writer.exists(249)
+    assert writer.get("predictions", 249)["patient_id"] == 249
+
+    assert writer.flush(timeout=10)
+    stats = writer.stats()
+    assert stats["rows_written"] == 250
+    assert stats["transactions"] < 250
+    assert stats["pending"] == 0
+
+    writer.put("outcomes", {"patient_id": 7, "outcome": 0})
+    assert writer.close(timeout=10)   # shutdown commits what is still queued
+    store.close()
+
+    reopened = sqlite3.connect(path)
+    try:
+        assert reopened.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] == 250
+        assert reopened.execute("SELECT outcome FROM outcomes WHERE patient_id = 7").fetchone() == (0,)
+    finally:
+        reopened.close()
+
+
+def test_failed_commits_are_retried(tmp_path):
+    store = PredictionStore(str(tmp_path / "hcc.sqlite"))
+    original = store.upsert
+    calls = []
+
+    def flaky_upsert(rows_by_table, previous=False):
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return original(rows_by_table, previous)
+
+    store.upsert = flaky_upsert
+    writer = WriteBehindWriter(store, max_delay_ms=0)
+    writer.put("predictions", saved_prediction(5))
+    assert writer.flush(timeout=10)
+    assert store.exists(5)
+    assert writer.stats()["errors"] == 1
+    assert writer.stats()["last_error"] == "database is locked"
+    writer.close()
+    store.close()
+
+
+def test_permanent_errors_dead_letter_only_the_bad_rows(tmp_path):
+    store = PredictionStore(str(tmp_path / "hcc.sqlite"))
+    original = store.upsert
+
+    def strict_upsert(rows_by_table, previous=False):
+        if any(row["patient_id"] == 13 for rows in rows_by_table.values() for row in rows):
+            raise sqlite3.IntegrityError("CHECK constraint failed")
+        return original(rows_by_table, previous)
+
+    store.upsert = strict_upsert
+    dead_letter = tmp_path / "dead_letter.jsonl"
+    committed = []
+    writer = WriteBehindWriter(store, max_delay_ms=50, dead_letter_path=str(dead_letter),
+                               on_commit=lambda rows_by_table, previous: committed.extend(previous))
+    for patient_id in (12, 13, 14):
+        writer.put("predictions", saved_prediction(patient_id))
+    assert writer.flush(timeout=10)
+    writer.put("predictions", saved_prediction(15))
+    assert writer.close(timeout=10)
+
+    assert [store.exists(i) for i in (12, 13, 14, 15)] == [True, False, True, True]
+    assert sorted(committed) == [12, 14, 15]   # the in-memory views never see the bad row
+    stats = writer.stats()
+    assert stats["rows_dead_lettered"] == 1 and stats["pending"] == 0
+    [line] = dead_letter.read_text().splitlines()
+    record = json.loads(line)
+    assert record["table"] == "predictions" and record["row"] == saved_prediction(13)
+    assert record["error"] == "CHECK constraint failed"
+    store.close()
+
+
+def test_locked_database_is_retried_until_shutdown(tmp_path):
+    store = PredictionStore(str(tmp_path / "hcc.sqlite"))
+
+    def locked(rows_by_table, previous=False):
+        raise sqlite3.OperationalError("database is locked")
+
+    store.upsert = locked
+    dead_letter = tmp_path / "dead_letter.jsonl"
+    writer = WriteBehindWriter(store, max_delay_ms=0, dead_letter_path=str(dead_letter))
+    writer.put("predictions", saved_prediction(1))
+    # Still retrying: nothing dropped, the row stays readable
+    assert not writer.flush(timeout=1)
+    assert writer.stats()["errors"] > 2 and writer.stats()["rows_dead_lettered"] == 0
+    assert writer.get("predictions", 1)["patient_id"] == 1
+
+    # Shutdown out of time: the row is kept in the dead-letter file
+    assert writer.close(timeout=0.5)
+    assert writer.stats()["rows_dead_lettered"] == 1 and writer.stats()["pending"] == 0
+    assert json.loads(dead_letter.read_text())["row"]["patient_id"] == 1
+    store.close()
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    store = PredictionStore(str(tmp_path / "hcc.sqlite"))
+    original = store.upsert
+    released = threading.Event()
+
+    def slow_upsert(rows_by_table, previous=False):
+        released.wait(10)
+        return original(rows_by_table, previous)
+
+    store.upsert = slow_upsert
+    writer = WriteBehindWriter(store, max_delay_ms=0, max_queue=2, put_timeout=0.1)
+    writer.put("predictions", saved_prediction(1))
+    writer.put("predictions", saved_prediction(2))
+    with pytest.raises(WriteQueueFull):
+        writer.put("predictions", saved_prediction(3))
+
+    released.set()
+    assert writer.flush(timeout=10)
+    writer.put("predictions", saved_prediction(3))
+    assert writer.close(timeout=10)
+    assert [store.exists(i) for i in (1, 2, 3)] == [True, True, True]
+    store.close()
+
+
+def test_endpoints_save_and_check(monkeypatch):
+    import Backend.routes.predict as predict_routes
+    store = PredictionStore(":memory:")
+    monkeypatch.setattr(predict_routes, "prediction_store", store)
+    monkeypatch.setattr(predict_routes, "db_writer", WriteBehindWriter(store, on_commit=predict_routes.apply_commit))
+    monkeypatch.setattr(predict_routes, "patient_index", PatientIdIndex(store.patient_ids))
+    monkeypatch.setattr(predict_routes, "performance_monitor", PerformanceMonitor({}))
+
+    patient_id = 987654
+    assert client.post("/api/v1/check_data", json={"patient_id": patient_id}).json()["exists"] is False
+
+    response = client.post("/api/v1/insert_data", json=saved_prediction(patient_id))
+    assert response.status_code == 200
+    assert response.json()["success"]
+    assert client.post("/api/v1/check_data", json={"patient_id": patient_id}).json()["exists"] is True
+
+    response = client.post("/api/v1/insert_outcome", json={"patient_id": patient_id, "outcome": 1})
+    assert response.json()["inserted"] == {"patient_id": patient_id, "outcome": 1}
+
+    assert predict_routes.db_writer.flush(timeout=10)
+    assert predict_routes.prediction_store.get("outcomes", patient_id)["outcome"] == 1
+
+    health = client.get("/api/v1/health").json()
+    assert health["database_connected"] is True
+    assert health["db_error"] is None
+    assert health["db_writer"]["rows_written"] == 2
+    predict_routes.db_writer.close()
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from Backend.services.model_service import ORGAN_SYSTEMS, ToxicityModelService
+
+
+def make_service(tmp_path, estimator, scaler=True):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 30)) * rng.uniform(0.5, 50, 30) + rng.uniform(-10, 10, 30)
+    Y = (X[:, :10] + rng.normal(size=(300, 10)) * 10 > X[:, :10].mean(axis=0)).astype(int)
+
+    scaler_path = None
+    if scaler:
+        fitted_scaler = (StandardScaler() if scaler is True else scaler).fit(X)
+        scaler_path = str(tmp_path / "scaler.pkl")
+        joblib.dump(fitted_scaler, scaler_path)
+        X_fit = fitted_scaler.transform(X)
+    else:
+        X_fit = X
+    model_path = str(tmp_path / "model.pkl")
+    joblib.dump(MultiOutputClassifier(estimator).fit(X_fit, Y), model_path)
+    return ToxicityModelService(model_path, scaler_path), X
+
+
+def reference(service, X):
+    return np.column_stack([p[:, 1] for p in service.predict_toxicity(X)])
+
+
+def test_fused_toxicity_matches_sklearn(tmp_path):
+    scalers = (True, False, StandardScaler(with_mean=False), StandardScaler(with_std=False))
+    for scaler in scalers:
+        service, X = make_service(tmp_path, LogisticRegression(max_iter=500), scaler=scaler)
+        assert service.coef.shape == (30, len(ORGAN_SYSTEMS))
+
+        proba = service.predict_toxicity_batch(X)
+        assert proba.shape == (300, len(ORGAN_SYSTEMS))
+        np.testing.assert_allclose(proba, reference(service, X), rtol=1e-10, atol=1e-12)
+        np.testing.assert_allclose(service.predict_toxicity_batch(X[0]), proba[:1], rtol=1e-12)
+
+
+def test_non_linear_models_keep_sklearn_path(tmp_path):
+    service, X = make_service(tmp_path, DecisionTreeClassifier(max_depth=3))
+    assert service.coef is None
+    np.testing.assert_array_equal(service.predict_toxicity_batch(X), reference(service, X))
+
+    # Other scalers are not folded either
+    service, X = make_service(tmp_path, LogisticRegression(max_iter=500), scaler=MinMaxScaler())
+    assert service.coef is None
+    np.testing.assert_array_equal(service.predict_toxicity_batch(X), reference(service, X))
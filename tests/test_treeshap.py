@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import shap
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+from Backend.services.forest_service import CompiledForest
+
+
+def make_data(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6))
+    X[:, 4] = rng.integers(0, 2, n)  # binary feature, like the flags/regimens
+    X[:, 5] = rng.integers(0, 5, n)  # ordinal feature, like the stages
+    y = ((X[:, 0] + X[:, 1] * X[:, 2] + X[:, 4] - 0.3 * X[:, 5]) > 0).astype(int)
+    return X, y
+
+
+def reference_shap(model, X):
+    values = shap.TreeExplainer(model).shap_values(X)
+    if isinstance(values, list):  # older shap: one array per class
+        values = np.stack(values, axis=-1)
+    return np.asarray(values)
+
+
+def test_matches_shap_for_tree_ensembles():
+    X, y = make_data()
+    X_test, _ = make_data(n=50, seed=1)
+    models = [
+        RandomForestClassifier(n_estimators=10, max_depth=8, random_state=0).fit(X, y),
+        ExtraTreesClassifier(n_estimators=5, random_state=0).fit(X, y),  # deep, repeated features
+        DecisionTreeClassifier(max_depth=4, random_state=0).fit(X, y),
+    ]
+
+    for model in models:
+        forest = CompiledForest.from_sklearn(model)
+        native = forest.shap_values(X_test)
+
+        assert native.shape == (50, 6, 2)
+        np.testing.assert_allclose(native, reference_shap(model, X_test), atol=1e-9)
+        np.testing.assert_allclose(forest.expected_value, shap.TreeExplainer(model).expected_value, atol=1e-12)
+
+
+def test_shap_values_are_additive():
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+
+    phi = forest.shap_values(X[:20])
+    np.testing.assert_allclose(phi.sum(axis=1) + forest.expected_value, model.predict_proba(X[:20]), atol=1e-9)
+
+
+def test_chunked_and_single_row_inputs(monkeypatch):
+    X, y = make_data()
+    model = RandomForestClassifier(n_estimators=5, max_depth=5, random_state=0).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+    expected = forest.shap_values(X[:30])
+
+    monkeypatch.setattr("Backend.services.forest_service._SHAP_CHUNK_ELEMENTS", 1)
+    np.testing.assert_allclose(forest.shap_values(X[:30]), expected, atol=1e-12)
+    np.testing.assert_allclose(forest.shap_values(X[0]), expected[:1], atol=1e-12)
+
+
+def test_single_leaf_trees_only_shift_the_baseline():
+    X = np.zeros((10, 3))
+    y = np.array([0, 1] * 5)
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+
+    assert np.all(forest.shap_values(X[:2]) == 0)
+    np.testing.assert_allclose(forest.expected_value, model.predict_proba(X[:1])[0])
+
+
+def test_missing_values_follow_the_compiled_prediction():
+    X, y = make_data()
+    X[::7, 0] = np.nan   # trained with NaNs, so nodes learn a missing-value side
+    X[::11, 1] = np.nan
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    forest = CompiledForest.from_sklearn(model)
+
+    X_test = X[:40].copy()
+    X_test[::3, 0] = np.nan
+    phi = forest.shap_values(X_test)
+    proba = forest.predict_proba(X_test)
+    np.testing.assert_allclose(proba, model.predict_proba(X_test), atol=1e-12)
+    np.testing.assert_allclose(phi.sum(axis=1) + forest.expected_value, proba, atol=1e-9)
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import io
+
+import pandas as pd
+import pytest
+
+from fastapi.testclient import TestClient
+from Backend.main import app
+from Backend import config
+from Backend.services.monitoring_service import PerformanceMonitor
+from Backend.services.patient_index import PatientIdIndex
+from Backend.services.storage_service import PredictionStore, WriteBehindWriter
+from Backend.services.sweep_service import REGIMENS
+from Backend.services.upload_service import validate_chunk
+from test_storage import saved_prediction
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    import Backend.routes.predict as predict_routes
+    store = PredictionStore(":memory:")
+    writer = WriteBehindWriter(store, on_commit=predict_routes.apply_commit)
+    monkeypatch.setattr(predict_routes, "prediction_store", store)
+    monkeypatch.setattr(predict_routes, "db_writer", writer)
+    monkeypatch.setattr(predict_routes, "patient_index", PatientIdIndex(store.patient_ids))
+    monkeypatch.setattr(predict_routes, "performance_monitor", PerformanceMonitor(dict(REGIMENS)))
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_ROWS", 4)
+    yield store
+    writer.close()
+
+
+def test_validation_is_per_row():
+    frame = pd.DataFrame({"patient_id": ["1", "x", "3", "4.5", ""], "outcome": ["1", "0", "2", "1", "0"]})
+    rows, numbers, rejections = validate_chunk("outcomes", frame, first_row=11)
+    assert rows == [{"patient_id": 1, "outcome": 1}]
+    assert numbers == [11]
+    assert [(r["row"], r["errors"]) for r in rejections] == [
+        (12, ["patient_id: missing or not a number"]),
+        (13, ["outcome: must be 0 or 1"]),
+        (14, ["patient_id: not an integer"]),
+        (15, ["patient_id: missing or not a number"]),
+    ]
+
+    with pytest.raises(ValueError, match="outcome"):
+        validate_chunk("outcomes", frame[["patient_id"]], first_row=1)
+
+
+def test_large_ids_are_exact():
+    big = 2 ** 53 + 1
+    frame = pd.DataFrame({"patient_id": [str(big), "9223372036854775808", "1e20"], "outcome": ["1", "0", "1"]})
+    rows, _, rejections = validate_chunk("outcomes", frame, first_row=1)
+    assert rows == [{"patient_id": big, "outcome": 1}]
+    assert [r["errors"] for r in rejections] == [["patient_id: integer out of range"]] * 2
+
+    # Parquet int64 columns too
+    frame = pd.DataFrame({"patient_id": pd.Series([big, 2 ** 62 + 3], dtype="int64"), "outcome": [0, 1]})
+    rows, _, _ = validate_chunk("outcomes", frame, first_row=1)
+    assert [row["patient_id"] for row in rows] == [big, 2 ** 62 + 3]
+
+    # Unsigned and nullable integer columns
+    frame = pd.DataFrame({"patient_id": pd.Series([big, 2 ** 63], dtype="uint64"), "outcome": [0, 1]})
+    rows, _, rejections = validate_chunk("outcomes", frame, first_row=1)
+    assert [row["patient_id"] for row in rows] == [big]
+    assert rejections[0]["errors"] == ["patient_id: integer out of range"]
+    frame = pd.DataFrame({"patient_id": pd.Series([big, None], dtype="Int64"), "outcome": [0, 1]})
+    rows, _, rejections = validate_chunk("outcomes", frame, first_row=1)
+    assert [row["patient_id"] for row in rows] == [big]
+    assert rejections[0]["errors"] == ["patient_id: missing or not a number"]
+
+
+def test_csv_predictions_then_parquet_outcomes(store):
+    predictions = pd.DataFrame([saved_prediction(i, probability=i / 10) for i in range(1, 10)])
+    predictions["age"] = predictions["age"].astype(object)
+    predictions.loc[2, "age"] = "old"                     # row 3
+    response = client.post(
+        "/api/v1/upload/predictions",
+        content=predictions.to_csv(index=False).encode(),
+        headers={"Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["rows"], report["inserted"], report["rejected"], report["chunks"]) == (9, 8, 1, 3)
+    assert report["rejections"] == [{"row": 3, "patient_id": "3", "errors": ["age: missing or not a number"]}]
+    assert store.get("predictions", 9)["probability"] == 0.9
+    assert client.post("/api/v1/check_data", json={"patient_id": 9}).json()["exists"] is True
+
+    outcomes = pd.DataFrame({"patient_id": [1, 2, 3, 9, 42], "outcome": [0, 0, 1, 1, 1]})
+    buffer = io.BytesIO()
+    outcomes.to_parquet(buffer)
+    response = client.post("/api/v1/upload/outcomes", params={"format": "parquet"}, content=buffer.getvalue())
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["rejected"]) == (3, 2)
+    assert [r["patient_id"] for r in report["rejections"]] == ["3", "42"]
+    assert store.get("outcomes", 9)["outcome"] == 1
+
+    performance = client.get("/api/v1/monitor/performance").json()["groups"]["all"]
+    assert performance["n"] == 3
+    assert performance["auc"] == 1.0
+
+
+def test_rejection_report_is_capped(store, monkeypatch):
+    monkeypatch.setattr(config, "UPLOAD_MAX_REJECTIONS", 2)
+    body = "patient_id,outcome\n" + "x,1\n" * 10
+    report = client.post("/api/v1/upload/outcomes", content=body.encode()).json()
+    assert report["rejected"] == 10
+    assert len(report["rejections"]) == 2
+    assert report["rejections_truncated"] is True
+
+
+def test_bad_uploads(store):
+    assert client.post("/api/v1/upload/unknown", content=b"a\n1\n").status_code == 404
+    assert client.post("/api/v1/upload/outcomes", content=b"patient_id\n1\n").status_code == 422
+    assert client.post("/api/v1/upload/outcomes", params={"format": "xlsx"}, content=b"x").status_code == 422